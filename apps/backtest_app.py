@@ -21,9 +21,13 @@ from datetime import datetime, timedelta
 from xtquant import xtdata
 
 from data.data_provider import DataProvider
+from data.market_panel import MarketPanel
+from data.minute_prefetcher import MinuteDataPrefetcher
+from data.minute_cube import MinuteCube
 from core.trade_executor import TradeExecutor
 from strategies.momentum.strategy import MomentumStrategy
-from utils.helpers import get_df_ex, filter_opendate, timetag_to_datetime
+from factors.factor_store import FactorStore
+from utils.helpers import filter_opendate, timetag_to_datetime
 from config.strategy_config import STOCK_POOL
 from config.backtest_config import load_backtest_config
 
@@ -97,7 +101,12 @@ def init(C):
     price_type = BACKTEST_CONFIG.get('backtest', {}).get('price_type', 5)
     quick_trade = BACKTEST_CONFIG.get('backtest', {}).get('quick_trade', 0)
     
-    g.data_provider = DataProvider(batch_size=500)
+    g.data_provider = DataProvider(
+        batch_size=500,
+        cache_dir=os.path.join(project_root, 'cache', 'market_data'),
+        max_workers=4,
+        snapshot_dir=os.path.join(project_root, 'cache', 'instruments')
+    )
     g.trade_executor = TradeExecutor(
         mode='backtest', 
         strategy_name='momentum_strategy', 
@@ -111,12 +120,14 @@ def init(C):
         account=g.account_id, 
         strategy_name='momentum_strategy',
         trade_executor=g.trade_executor,
-        logger=logger
+        logger=logger,
+        factor_store=FactorStore(os.path.join(project_root, 'cache', 'factors'))
     )
     
     g.stock_list = C.get_stock_list_in_sector(g.stock_pool_name)
     
     g.minute_data_cache = {}
+    g.minute_prefetcher = None
     g.current_trading_date = None
     
 
@@ -151,48 +162,65 @@ def after_init(C):
         return
     
 
-    close_df = get_df_ex(data, 'close')
-    open_df = get_df_ex(data, 'open')
-    high_df = get_df_ex(data, 'high')
-    volume_df = get_df_ex(data, 'volume')
-    amount_df = get_df_ex(data, 'amount')
+    panel = MarketPanel.from_market_data(data, ['close', 'open', 'high', 'volume', 'amount'])
     
 
-    listing_filter_df = filter_opendate(g.stock_list, close_df, 120, 'xtdata')
+    instruments = g.data_provider.get_instrument_snapshot(g.stock_list)
+    listing_filter_df = filter_opendate(
+        g.stock_list, panel.to_frame('close'), 120, 'xtdata',
+        opendates=instruments['OpenDate'].to_dict()
+    )
     
     g.strategy.prepare_daily_factors(
-        close_df, open_df, high_df, volume_df, amount_df,
+        panel=panel,
         stock_list=g.stock_list,
         listing_filter_df=listing_filter_df
     )
     
+    # 后台预取分钟数据：模拟第D日时提前加载D+1日
+    trading_dates = g.data_provider.get_trading_dates(start_time, end_time)
+    g.minute_prefetcher = MinuteDataPrefetcher(load_minute_day, trading_dates, lookahead=1)
+    g.minute_prefetcher.start()
+    
 
 
 
-def start_new_trading_day(current_date):
+def load_minute_day(date):
     """
-    交易日切换处理
+    加载并预处理某个交易日的分钟线数据（可在预取线程中调用）
     
     Args:
-        current_date: 当前交易日（字符串格式，如'20240115'）
+        date: 交易日（字符串格式，如'20240115'）
+        
+    Returns:
+        MinuteCube: (分钟×股票×字段) 分钟数据立方体，无数据时为空立方体
     """
-    
     minute_data = g.data_provider.get_minute_data(
         stock_list=g.stock_list,
-        date=current_date,
+        date=date,
         period='1m',
         dividend_type='front_ratio'
     )
     
-    if not minute_data or len(minute_data) == 0:
-        logger.warning(f"日期 {current_date} 没有分钟线数据")
-        g.minute_data_cache[current_date] = pd.DataFrame()
+    return MinuteCube.from_market_data(minute_data)
+
+
+def start_new_trading_day(current_date):
+    """
+    交易日切换处理
+    
+    Args:
+        current_date: 当前交易日（字符串格式，如'20240115'）
+    """
+    
+    if g.minute_prefetcher is not None:
+        minute_cube = g.minute_prefetcher.get(current_date)
     else:
-        minute_data_multi = pd.concat(
-            minute_data,
-            names=['stock_code', 'timestamp']
-        )
-        g.minute_data_cache[current_date] = minute_data_multi
+        minute_cube = load_minute_day(current_date)
+    
+    if minute_cube.is_empty:
+        logger.warning(f"日期 {current_date} 没有分钟线数据")
+    g.minute_data_cache[current_date] = minute_cube
     
     old_dates = sorted([d for d in g.minute_data_cache.keys() if d != current_date])
     if len(old_dates) > 3:
@@ -203,12 +231,14 @@ def start_new_trading_day(current_date):
     current_cash = g.trade_executor.get_cash(g.account_id)
     logger.info(f"[{current_date}] 开盘持仓数: {len(current_holdings)}, 可用资金: {current_cash:.2f}")
     
-    g.strategy.init_minute_cache(current_date, g.stock_list)
+    g.strategy.init_minute_cache(current_date, g.stock_list, holdings=current_holdings.keys())
 
 
-def _extract_open_prices(minute_data):
+def _extract_open_prices(minute_bar):
     """提取当前分钟开盘价（唯一可用的实时价格）"""
-    return {stock: data['open'] for stock, data in minute_data.items()}
+    if minute_bar is None:
+        return {}
+    return minute_bar.to_price_dict('open')
 
 
 def handlebar(C):
@@ -237,9 +267,9 @@ def handlebar(C):
     if current_date not in g.minute_data_cache:
         return
     
-    minute_data_multi = g.minute_data_cache[current_date]
+    minute_cube = g.minute_data_cache[current_date]
     
-    if minute_data_multi.empty:
+    if minute_cube.is_empty:
         return
     
     current_timestamp_dt = datetime.strptime(current_timestamp_str, '%Y%m%d%H%M%S')
@@ -248,38 +278,24 @@ def handlebar(C):
     prev_timestamp_dt = current_timestamp_dt - timedelta(minutes=1)
     prev_timestamp_str = prev_timestamp_dt.strftime('%Y%m%d%H%M%S')
     
-    # 获取上一分钟K线数据（用于因子计算）
-    # 如果上一分钟没有数据（9:30开盘或13:00午盘），会在KeyError处理中return
-    try:
-        prev_minute_data = minute_data_multi.xs(
-            prev_timestamp_str,
-            level='timestamp'
-        ).to_dict('index')
-    except KeyError:
-        # 上一分钟没有数据：9:30(上一分钟9:29)或13:00(上一分钟12:59)
+    # 获取上一分钟K线截面（用于因子计算）
+    # 上一分钟没有数据：9:30(上一分钟9:29)或13:00(上一分钟12:59)
+    prev_minute_bar = minute_cube.bar(prev_timestamp_str)
+    if prev_minute_bar is None:
         return
     
-    if not prev_minute_data:
-        return
-    
-    # 获取当前分钟K线数据（用于买入价格）
-    try:
-        current_minute_data = minute_data_multi.xs(
-            current_timestamp_str,
-            level='timestamp'
-        ).to_dict('index')
-    except KeyError:
-        current_minute_data = {}
+    # 获取当前分钟K线截面（用于买入价格）
+    current_minute_bar = minute_cube.bar(current_timestamp_str)
     
     # 更新分钟级因子（使用上一分钟的完整数据）
     g.strategy.update_minute_factors(
         date=current_date,
         minute_timestamp=prev_timestamp_dt,
-        minute_data=prev_minute_data
+        minute_data=prev_minute_bar
     )
     
     # 买入和卖出时，仅传入当前分钟的开盘价，防止前视现象
-    minute_open_prices = _extract_open_prices(current_minute_data)
+    minute_open_prices = _extract_open_prices(current_minute_bar)
 
     # 处理卖出
     if minute_open_prices:
@@ -298,6 +314,17 @@ def handlebar(C):
     logger.info(f"[{current_date} {current_time}] 持仓数: {len(holdings)}")
 
 
+def stop(C):
+    """
+    策略停止回调，关闭分钟数据预取线程
+    
+    Args:
+        C: contextinfo对象
+    """
+    if g.minute_prefetcher is not None:
+        g.minute_prefetcher.shutdown()
+        g.minute_prefetcher = None
+
 
 if __name__ == '__main__':
     from xtquant.qmttools import run_strategy_file
@@ -87,6 +87,30 @@ DAILY_AVG_VOLUME_WINDOW_10D = 10
 # TRADING_MINUTES_PER_DAY: 每日交易分钟数
 TRADING_MINUTES_PER_DAY = 240
 
+# FACTOR_PRECISION: 日频因子矩阵的存储精度
+#   - 'float64': 原始 DataFrame
+#   - 'float32': 数值因子以 float32 存储（能逐位还原的最高价、涨跌停价按分定点存储），布尔因子按位压缩，
+#     全市场多年回测时日频因子内存约降至 1/2 以下；价格与均线的差小于 1 个 float32 ulp 时
+#     突破判断可能与 'float64' 不同，可用 tools/check_factor_precision.py 统计
+FACTOR_PRECISION = 'float64'
+
+# FACTOR_WORKERS: 日频滚动因子（均线、N日最高价等）并行计算的进程数
+#   - 1: 在当前进程计算
+#   - N > 1: 按股票列分成N片，通过共享内存交给进程池计算
+#   - None: 使用全部CPU核
+FACTOR_WORKERS = 1
+
+# FACTOR_BACKEND: 日频滚动因子的计算后端（见 factors.backends）
+#   - 'pandas': pandas rolling，均线与原实现逐位一致
+#   - 'numpy' / 'numba' / 'auto': 更快，但均线末位可能与 pandas 相差 1ulp，
+#     价格恰好等于均线时“价格 > 均线”的判断可能翻转，回测结果不保证与 'pandas' 完全相同
+FACTOR_BACKEND = 'pandas'
+
+# INTRADAY_UNIVERSE_FILTER: 盘前缩小分钟级计算的股票范围
+#   - True: 只对当日满足买入条件1且通过上市日期过滤的股票、以及当前持仓（卖出判断需要得分）做分钟级计算
+#   - False: 对整个股票池做分钟级计算
+INTRADAY_UNIVERSE_FILTER = True
+
 # ---------- Slippage (Deprecated - now handled by backtest engine) ----------
 # 滑点已统一在 backtest.yaml 中配置 (slippage_type=2, slippage=0.001)
 # 策略层不再手动调整价格，避免重复计算滑点
@@ -6,5 +6,12 @@
 
 from .data_loader import DataLoader
 from .data_provider import DataProvider
+from .disk_cache import MarketDataDiskCache
+from .market_panel import MarketPanel
+from .minute_cube import MinuteCube
+from .rolling_panel import RollingDailyPanel
+from .instrument_snapshot import InstrumentSnapshot
+from .history_downloader import HistoryDownloader
 
-__all__ = ['DataLoader', 'DataProvider']
+__all__ = ['DataLoader', 'DataProvider', 'MarketDataDiskCache', 'MarketPanel', 'MinuteCube', 'RollingDailyPanel',
+           'InstrumentSnapshot', 'HistoryDownloader']
@@ -2,16 +2,22 @@
 import pandas as pd
 import numpy as np
 from xtquant import xtdata
-from utils.helpers import get_df_ex
+from utils.helpers import get_df_ex, get_df_ex_multi
+from .memory_cache import LRUDataCache
 
 
 class DataLoader:
     """数据加载器，封装 xtdata 调用"""
     
-    def __init__(self):
-        """初始化"""
-        self.daily_cache = {}
-        self.minute_cache = {}
+    def __init__(self, cache=None, cache_max_bytes=2 * 1024 ** 3):
+        """
+        初始化
+        
+        Args:
+            cache: 共享的 LRUDataCache 实例（可与 DataProvider 共用一份字节预算），None表示新建
+            cache_max_bytes: 新建内存缓存时的字节预算
+        """
+        self.cache = cache if cache is not None else LRUDataCache(cache_max_bytes)
     
     def load_daily_data(self, stock_list, start_date, end_date, 
                        field_list=None, dividend_type='front', fill_data=True):
@@ -32,10 +38,15 @@ class DataLoader:
         if field_list is None:
             field_list = ['open', 'high', 'low', 'close', 'volume', 'amount']
         
-        cache_key = f"{start_date}_{end_date}_{dividend_type}"
-        if cache_key in self.daily_cache:
+        cache_key = LRUDataCache.make_key(
+            'daily', stock_list, field_list,
+            start=start_date, end=end_date,
+            dividend_type=dividend_type, fill_data=fill_data
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
             print(f"Loading daily data from cache: {cache_key}")
-            return self.daily_cache[cache_key]
+            return cached
         
         print(f"Loading daily data: {len(stock_list)} stocks, {start_date} to {end_date}")
         
@@ -49,7 +60,7 @@ class DataLoader:
             field_list=field_list
         )
         
-        self.daily_cache[cache_key] = data
+        self.cache.put(cache_key, data)
         
         print(f"Daily data loaded: {len(data)} stocks")
         return data
@@ -71,10 +82,14 @@ class DataLoader:
         if field_list is None:
             field_list = ['open', 'high', 'low', 'close', 'volume', 'amount']
         
-        cache_key = f"{date}_{dividend_type}"
-        if cache_key in self.minute_cache:
+        cache_key = LRUDataCache.make_key(
+            'minute', stock_list, field_list,
+            date=date, dividend_type=dividend_type
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
             print(f"Loading minute data from cache: {cache_key}")
-            return self.minute_cache[cache_key]
+            return cached
         
         print(f"Loading minute data: {len(stock_list)} stocks, date {date}")
         
@@ -88,7 +103,7 @@ class DataLoader:
             field_list=field_list
         )
         
-        self.minute_cache[cache_key] = data
+        self.cache.put(cache_key, data)
         
         print(f"Minute data loaded: {len(data)} stocks")
         return data
@@ -106,10 +121,33 @@ class DataLoader:
         """
         return get_df_ex(data_dict, field)
     
-    def clear_cache(self):
-        """清空缓存"""
-        self.daily_cache.clear()
-        self.minute_cache.clear()
+    def convert_to_matrices(self, data_dict, fields=None, dtype=np.float64):
+        """
+        一次性将多个字段转换为矩阵格式（股票×时间）
+        
+        Args:
+            data_dict: get_market_data_ex 返回的字典 {股票代码: DataFrame}
+            fields: 字段列表，默认 ['open', 'high', 'low', 'close', 'volume', 'amount']
+            dtype: 数值类型，np.float64 或 np.float32
+            
+        Returns:
+            dict: {field: DataFrame}
+        """
+        if fields is None:
+            fields = ['open', 'high', 'low', 'close', 'volume', 'amount']
+        return get_df_ex_multi(data_dict, fields, dtype=dtype)
+    
+    def clear_cache(self, kind=None):
+        """
+        清空缓存
+        
+        Args:
+            kind: 'daily' 或 'minute' 只清空对应类型，None表示全部清空
+        """
+        if kind is None:
+            self.cache.clear()
+        else:
+            self.cache.evict_kind(kind)
         print("Cache cleared")
     
     def get_cache_info(self):
@@ -119,9 +157,14 @@ class DataLoader:
         Returns:
             dict: 缓存统计信息
         """
-        return {
-            'daily_cache_size': len(self.daily_cache),
-            'minute_cache_size': len(self.minute_cache),
-            'daily_cache_keys': list(self.daily_cache.keys()),
-            'minute_cache_keys': list(self.minute_cache.keys())
+        keys = self.cache.keys()
+        daily_keys = [k for k in keys if k.startswith('daily|')]
+        minute_keys = [k for k in keys if k.startswith('minute|')]
+        info = {
+            'daily_cache_size': len(daily_keys),
+            'minute_cache_size': len(minute_keys),
+            'daily_cache_keys': daily_keys,
+            'minute_cache_keys': minute_keys
         }
+        info.update(self.cache.stats())
+        return info
@@ -126,24 +126,45 @@ class DataLoader:
             'minute_cache_keys': list(self.minute_cache.keys())
         }
 # coding: utf-8
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 from xtquant import xtdata
-from utils.helpers import get_df_ex, batch_list, print_progress
+from utils.helpers import get_df_ex_multi, batch_list, print_progress, timetag_to_datetime
+from .disk_cache import MarketDataDiskCache
+from .memory_cache import LRUDataCache
+from .rolling_panel import RollingDailyPanel
+from .instrument_snapshot import InstrumentSnapshot
+from .history_downloader import HistoryDownloader
 
 
 class DataProvider:
     """数据提供层，封装xtdata数据获取逻辑"""
     
-    def __init__(self, batch_size=500):
+    def __init__(self, batch_size=500, cache_dir=None, cache=None,
+                 cache_max_bytes=2 * 1024 ** 3, max_workers=1,
+                 max_retries=2, retry_delay=1.0, snapshot_dir=None):
         """
         初始化
         
         Args:
             batch_size: 批量获取数据时每批的股票数量
+            cache_dir: 日线磁盘缓存目录，None表示不启用磁盘缓存
+            cache: 共享的 LRUDataCache 实例，None表示新建
+            cache_max_bytes: 新建内存缓存时的字节预算
+            max_workers: 并发拉取的批次数上限，1表示逐批顺序拉取
+            max_retries: 单批拉取失败后的重试次数
+            retry_delay: 重试间隔（秒），按重试次数线性递增
+            snapshot_dir: 合约基础信息快照目录，None表示仅在内存中保存
         """
         self.batch_size = batch_size
-        self.cache = {}
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache = cache if cache is not None else LRUDataCache(cache_max_bytes)
+        self.disk_cache = MarketDataDiskCache(cache_dir) if cache_dir else None
+        self.instrument_snapshot = InstrumentSnapshot(snapshot_dir)
     
     def get_daily_data(self, stock_list, start_time, end_time, 
                       fields=None, dividend_type='front_ratio', fill_data=True):
@@ -165,47 +186,165 @@ class DataProvider:
         if fields is None:
             fields = []
         
-        cache_key = f"daily_{start_time}_{end_time}_{dividend_type}"
-        if cache_key in self.cache:
+        cache_key = LRUDataCache.make_key(
+            'daily', stock_list, fields,
+            start=start_time, end=end_time,
+            dividend_type=dividend_type, fill_data=fill_data
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
             print("Using cached data...")
-            return self.cache[cache_key]
+            return cached
         
         print(f"Fetching daily data for {len(stock_list)} stocks...")
         
-        if len(stock_list) > self.batch_size:
-            all_data = {}
-            batches = list(batch_list(stock_list, self.batch_size))
+        if self.disk_cache is not None:
+            # 磁盘缓存统一存储全部字段，仅拉取缓存未覆盖的日期区间；
+            # 复权数据先批量核对缓存末行，复权基准变化的股票整段重新拉取
+            data = self.disk_cache.get(
+                stock_list, start_time, end_time,
+                fetch_func=lambda stocks, start, end: self._fetch_market_data(
+                    stocks, '1d', start, end, [], dividend_type, fill_data
+                ),
+                period='1d',
+                dividend_type=dividend_type,
+                fill_data=fill_data,
+                fields=fields
+            )
+        else:
+            data = self._fetch_market_data(
+                stock_list, '1d', start_time, end_time, fields, dividend_type, fill_data
+            )
+        
+        self.cache.put(cache_key, data)
+        return data
+    
+    def _fetch_market_data(self, stock_list, period, start_time, end_time,
+                           fields, dividend_type, fill_data):
+        """
+        调用 get_market_data_ex 获取行情数据，股票数量超过 batch_size 时分批获取
+        
+        max_workers > 1 时使用线程池同时拉取多个批次，结果按批次顺序合并，
+        保证返回字典的股票顺序与 stock_list 一致。
+        
+        Args:
+            stock_list: 股票代码列表
+            period: 周期
+            start_time: 开始时间
+            end_time: 结束时间
+            fields: 字段列表，空列表表示全部字段
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
             
+        Returns:
+            dict: {stock_code: DataFrame}
+        """
+        request = dict(period=period, start_time=start_time, end_time=end_time,
+                       fields=fields, dividend_type=dividend_type, fill_data=fill_data)
+        
+        if len(stock_list) <= self.batch_size:
+            return self._fetch_batch(stock_list, **request)
+        
+        batches = list(batch_list(stock_list, self.batch_size))
+        results = [None] * len(batches)
+        
+        if self.max_workers <= 1:
             for i, batch in enumerate(batches):
                 print_progress(i + 1, len(batches), 
                              prefix=f'Batch {i+1}/{len(batches)}:', 
                              suffix='Complete')
-                
-                batch_data = xtdata.get_market_data_ex(
+                results[i] = self._fetch_batch(batch, **request)
+        else:
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._fetch_batch, batch, **request): i
+                    for i, batch in enumerate(batches)
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    print_progress(done, len(batches), 
+                                 prefix=f'Batch {done}/{len(batches)}:', 
+                                 suffix=f'Complete ({workers} workers)')
+        
+        all_data = {}
+        for batch_data in results:
+            all_data.update(batch_data)
+        
+        return all_data
+    
+    def _fetch_batch(self, batch, period, start_time, end_time,
+                     fields, dividend_type, fill_data):
+        """
+        拉取单个批次，失败时按 max_retries 重试
+        
+        Returns:
+            dict: {stock_code: DataFrame}
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return xtdata.get_market_data_ex(
                     field_list=fields,
                     stock_list=batch,
-                    period='1d',
+                    period=period,
                     start_time=start_time,
                     end_time=end_time,
                     dividend_type=dividend_type,
                     fill_data=fill_data
                 )
-                all_data.update(batch_data)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"\nBatch fetch failed ({batch[0]}..., {len(batch)} stocks): {e}, "
+                      f"retry {attempt + 1}/{self.max_retries}")
+                time.sleep(self.retry_delay * (attempt + 1))
+    
+    def create_rolling_panel(self, stock_list, start_time, end_time, fields=None,
+                             window=None, dividend_type='front_ratio', fill_data=True,
+                             engine_factory=None):
+        """
+        创建并加载滚动日线面板（之后每日调用 update() 只追加新交易日）
+        
+        Args:
+            stock_list: 股票代码列表
+            start_time: 开始日期，如'20230101'
+            end_time: 结束日期，如'20241231'
+            fields: 字段列表，None表示默认行情字段
+            window: 保留的交易日数，None表示首次加载的交易日数
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
+            engine_factory: 增量因子引擎的构造函数（如 IncrementalFactorEngine.from_history），
+                            None表示不挂接引擎
             
-            data = all_data
-        else:
-            data = xtdata.get_market_data_ex(
-                field_list=fields,
-                stock_list=stock_list,
-                period='1d',
-                start_time=start_time,
-                end_time=end_time,
-                dividend_type=dividend_type,
-                fill_data=fill_data
-            )
+        Returns:
+            RollingDailyPanel
+        """
+        rolling = RollingDailyPanel(
+            self, stock_list, fields=fields, window=window,
+            dividend_type=dividend_type, fill_data=fill_data
+        )
+        rolling.load(start_time, end_time)
+        if engine_factory is not None:
+            rolling.attach_factor_engine(engine_factory)
+        return rolling
+    
+    def invalidate_daily_cache(self, stock_list=None, dividend_type='front_ratio', fill_data=True):
+        """
+        复权因子变化后使日线缓存失效
         
-        self.cache[cache_key] = data
-        return data
+        内存缓存的键覆盖整个股票池，无法按股票淘汰，因此清除全部日线条目；
+        磁盘缓存仅删除指定股票。
+        
+        Args:
+            stock_list: 股票代码列表，None表示全部
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
+        """
+        self.cache.evict_kind('daily')
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate(
+                stock_list, period='1d', dividend_type=dividend_type, fill_data=fill_data
+            )
     
     def get_minute_data(self, stock_list, date, period='5m', fields=None, dividend_type='front_ratio'):
         """
@@ -225,17 +364,9 @@ class DataProvider:
         if fields is None:
             fields = []
         
-        data = xtdata.get_market_data_ex(
-            field_list=fields,
-            stock_list=stock_list,
-            period=period,
-            start_time=date,
-            end_time=date,
-            dividend_type=dividend_type,
-            fill_data=True
+        return self._fetch_market_data(
+            stock_list, period, date, date, fields, dividend_type, fill_data=True
         )
-        
-        return data
     
     def get_tick_data(self, stock_list, date, fields=None):
         """
@@ -252,19 +383,15 @@ class DataProvider:
         if fields is None:
             fields = []
         
-        data = xtdata.get_market_data_ex(
-            field_list=fields,
-            stock_list=stock_list,
-            period='tick',
-            start_time=date,
-            end_time=date
+        return self._fetch_market_data(
+            stock_list, 'tick', date, date, fields, dividend_type='none', fill_data=True
         )
-        
-        return data
     
     def get_instrument_info(self, stock_list):
         """
-        批量获取合约基础信息
+        批量获取合约基础信息（完整字段）
+        
+        按 batch_size 分批调用 get_instrument_detail_list，批量请求失败时该批逐只获取
         
         Args:
             stock_list: 股票代码列表
@@ -275,20 +402,37 @@ class DataProvider:
         print(f"Fetching instrument info for {len(stock_list)} stocks...")
         
         info_dict = {}
-        for i, stock in enumerate(stock_list):
-            if (i + 1) % 100 == 0:
-                print_progress(i + 1, len(stock_list), 
-                             prefix='Progress:', suffix='')
-            
+        batches = list(batch_list(stock_list, self.batch_size))
+        for i, batch in enumerate(batches):
+            print_progress(i + 1, len(batches), prefix='Progress:', suffix='')
             try:
-                info = xtdata.get_instrument_detail(stock)
-                info_dict[stock] = info
+                details = xtdata.get_instrument_detail_list(batch) or {}
             except Exception as e:
-                print(f"Error fetching info for {stock}: {e}")
-                info_dict[stock] = None
+                print(f"Error fetching instrument detail list: {e}, falling back to per-stock requests")
+                details = {}
+                for stock in batch:
+                    try:
+                        details[stock] = xtdata.get_instrument_detail(stock)
+                    except Exception as e:
+                        print(f"Error fetching info for {stock}: {e}")
+            for stock in batch:
+                info_dict[stock] = details.get(stock)
         
         return info_dict
     
+    def get_instrument_snapshot(self, stock_list, date=None):
+        """
+        获取合约基础信息快照（上市日期、流通股本、板块、最小变价单位）
+        
+        Args:
+            stock_list: 股票代码列表
+            date: 快照日期，None表示今天
+            
+        Returns:
+            pd.DataFrame: index=股票代码, columns=['OpenDate', 'FloatVolume', 'Board', 'PriceTick']
+        """
+        return self.instrument_snapshot.load(stock_list, date)
+    
     def get_stock_list_in_sector(self, sector_name='沪深A股'):
         """
         获取板块成分股
@@ -311,33 +455,37 @@ class DataProvider:
             market: 市场代码
             
         Returns:
-            list: 交易日列表
+            list: 交易日列表，如 ['20240102', '20240103', ...]
         """
         dates = xtdata.get_trading_dates(market, start_date, end_date)
-        return [str(d) for d in dates]
+        # xtdata 返回毫秒时间戳
+        return [timetag_to_datetime(d, '%Y%m%d') for d in dates]
     
     def download_history_data(self, stock_list, period='1d', 
-                            start_date='', end_date=''):
+                            start_date='', end_date='', checkpoint_path=None,
+                            download_batch_size=200):
         """
-        下载历史数据到本地
+        下载历史数据到本地（批量并发，可断点续传）
         
         Args:
             stock_list: 股票代码列表
-            period: 周期
+            period: 周期或周期列表，如 '1d' 或 ['1d', '1m']
             start_date: 开始日期
             end_date: 结束日期
-        """
-        print(f"Downloading {period} data for {len(stock_list)} stocks...")
-        
-        for i, stock in enumerate(stock_list):
-            if (i + 1) % 50 == 0:
-                print_progress(i + 1, len(stock_list), 
-                             prefix='Downloading:', suffix='')
+            checkpoint_path: 检查点文件路径，None表示不保存进度
+            download_batch_size: 每次 download_history_data2 请求的股票数量
             
-            try:
-                xtdata.download_history_data(stock, period, start_date, end_date)
-            except Exception as e:
-                print(f"Error downloading {stock}: {e}")
+        Returns:
+            dict: 下载汇总，见 HistoryDownloader.run
+        """
+        downloader = HistoryDownloader(
+            checkpoint_path=checkpoint_path,
+            batch_size=download_batch_size,
+            max_workers=self.max_workers,
+            max_retries=self.max_retries,
+            retry_delay=self.retry_delay
+        )
+        return downloader.run(stock_list, period, start_date, end_date)
     
     def convert_to_dataframes(self, data, fields):
         """
@@ -350,12 +498,28 @@ class DataProvider:
         Returns:
             dict: {field: DataFrame}
         """
-        dfs = {}
-        for field in fields:
-            dfs[field] = get_df_ex(data, field)
-        return dfs
+        return get_df_ex_multi(data, fields)
     
-    def clear_cache(self):
-        """清空缓存"""
+    def clear_cache(self, include_disk=False):
+        """
+        清空缓存
+        
+        Args:
+            include_disk: 是否同时清空日线磁盘缓存
+        """
         self.cache.clear()
+        if include_disk and self.disk_cache is not None:
+            self.disk_cache.invalidate(period='1d')
         print("Cache cleared")
+    
+    def get_cache_info(self):
+        """
+        获取缓存信息
+        
+        Returns:
+            dict: 内存缓存统计（命中/未命中/淘汰次数、占用字节）及磁盘缓存股票数
+        """
+        info = self.cache.stats()
+        if self.disk_cache is not None:
+            info['disk_cache'] = self.disk_cache.get_cache_info()
+        return info
@@ -0,0 +1,310 @@
+# coding: utf-8
+import os
+import json
+from datetime import datetime, timedelta
+import pandas as pd
+import numpy as np
+
+
+class MarketDataDiskCache:
+    """
+    行情数据磁盘缓存（按股票存储的 .npy 列式文件，支持内存映射读取）
+
+    目录结构:
+        {root_dir}/{period}_{dividend_type}_{fill|nofill}/
+            manifest.json          # {stock_code: {'start', 'end', 'fields'}}
+            {stock_code}.npy       # float64 矩阵 (行=时间, 第0列=时间键 YYYYMMDD[HHMMSS], 其余列=字段)
+
+    manifest 中的 start/end 记录的是已请求过的日期区间（而不是实际有数据的首末日），
+    因此停牌、节假日不会导致重复拉取。只有区间之外的部分才会再次请求 xtdata。
+
+    复权数据在发生除权除息后历史价格会整体变化，新拉取的区间与缓存中的旧数据不在同一复权基准上。
+    因此复权数据读取前先批量重新拉取各股票缓存中最后一个已覆盖交易日（通常只需一次请求），
+    与缓存中的该行不一致的股票丢弃全部缓存、重新拉取整个请求区间，而不是只补拉缺失区间后拼接。
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+
+    def __init__(self, root_dir):
+        """
+        初始化
+
+        Args:
+            root_dir: 缓存根目录
+        """
+        self.root_dir = root_dir
+        self._manifests = {}
+        # 同一区间内各股票的时间索引基本相同，复用 pd.Index 避免重复构造
+        self._index_pool = {}
+
+    def get(self, stock_list, start_time, end_time, fetch_func, period='1d',
+            dividend_type='front_ratio', fill_data=True, fields=None):
+        """
+        从磁盘缓存读取数据，缺失的区间通过 fetch_func 补齐并写回缓存
+
+        Args:
+            stock_list: 股票代码列表
+            start_time: 开始日期，如'20230101'
+            end_time: 结束日期，如'20241231'
+            fetch_func: 拉取函数 fetch_func(stock_list, start_time, end_time) -> {stock_code: DataFrame}，
+                        需返回全部字段
+            period: 周期
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
+            fields: 返回的字段列表，None或空列表表示全部字段
+
+        Returns:
+            dict: {stock_code: DataFrame}，与 get_market_data_ex 返回格式一致
+        """
+        key_dir = self._key_dir(period, dividend_type, fill_data)
+        manifest = self._load_manifest(key_dir)
+
+        if dividend_type != 'none':
+            stale = self._rebased_stocks(key_dir, manifest, stock_list, fetch_func)
+            if stale:
+                print(f"Disk cache: adjustment factors changed for {len(stale)} stocks, refetching...")
+                self._drop_stocks(key_dir, manifest, stale)
+
+        start_time = str(start_time)[:8]
+        end_time = str(end_time)[:8]
+        covered_end = min(end_time, self._last_complete_date())
+
+        # 按缺失区间分组，同一区间的股票合并为一次请求
+        missing_groups = {}
+        for stock in stock_list:
+            for segment in self._missing_segments(manifest.get(stock), start_time, end_time):
+                missing_groups.setdefault(segment, []).append(stock)
+
+        fetched = {}
+        for (seg_start, seg_end), stocks in missing_groups.items():
+            print(f"Disk cache miss: {len(stocks)} stocks, {seg_start} to {seg_end}")
+            batch_data = fetch_func(stocks, seg_start, seg_end)
+            for stock in stocks:
+                parts = fetched.setdefault(stock, [])
+                df = batch_data.get(stock)
+                if df is not None and not df.empty:
+                    parts.append(df)
+
+        data = {}
+        for stock in stock_list:
+            entry = manifest.get(stock)
+            new_parts = fetched.get(stock)
+            # 需要回写的股票不使用内存映射，避免 Windows 下替换已映射文件失败
+            mmap_mode = None if new_parts else 'r'
+            cached = self._read_stock(key_dir, stock, mmap_mode) if entry else None
+
+            if new_parts:
+                parts = new_parts
+                if cached is not None:
+                    parts = [pd.DataFrame(cached[1], index=cached[0].astype(str),
+                                          columns=entry['fields'])] + parts
+                merged = pd.concat(parts)
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                cached = self._write_stock(key_dir, stock, merged)
+                stock_fields = merged.columns.tolist()
+            else:
+                stock_fields = entry['fields'] if entry else []
+
+            # 无数据的股票（未上市、已退市）同样记录覆盖区间，避免每次重复请求
+            if new_parts is not None:
+                manifest[stock] = {
+                    'start': min(start_time, entry['start']) if entry else start_time,
+                    'end': max(covered_end, entry['end']) if entry else covered_end,
+                    'fields': stock_fields
+                }
+
+            if cached is None:
+                continue
+
+            data[stock] = self._slice(cached, stock_fields, start_time, end_time, fields)
+
+        if fetched:
+            self._save_manifest(key_dir, manifest)
+
+        return data
+
+    def invalidate(self, stock_list=None, period='1d', dividend_type='front_ratio', fill_data=True):
+        """
+        使指定股票的缓存失效（如发生除权除息后前复权数据需重新拉取）
+
+        Args:
+            stock_list: 股票代码列表，None表示该周期/复权类型下全部股票
+            period: 周期
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
+        """
+        key_dir = self._key_dir(period, dividend_type, fill_data)
+        manifest = self._load_manifest(key_dir)
+
+        targets = list(manifest.keys()) if stock_list is None else stock_list
+        self._drop_stocks(key_dir, manifest, targets)
+        self._save_manifest(key_dir, manifest)
+
+    def get_cache_info(self):
+        """
+        获取磁盘缓存信息
+
+        Returns:
+            dict: {缓存目录名: 股票数量}
+        """
+        info = {}
+        if not os.path.isdir(self.root_dir):
+            return info
+        for name in sorted(os.listdir(self.root_dir)):
+            key_dir = os.path.join(self.root_dir, name)
+            if os.path.isdir(key_dir):
+                info[name] = len(self._load_manifest(key_dir))
+        return info
+
+    def _key_dir(self, period, dividend_type, fill_data):
+        fill_tag = 'fill' if fill_data else 'nofill'
+        return os.path.join(self.root_dir, f"{period}_{dividend_type}_{fill_tag}")
+
+    def _data_path(self, key_dir, stock):
+        return os.path.join(key_dir, f"{stock}.npy")
+
+    def _rebased_stocks(self, key_dir, manifest, stock_list, fetch_func):
+        """
+        找出复权基准已变化的股票
+
+        按各股票缓存中最后一个已覆盖日期分组，每组调用一次 fetch_func 重新拉取该日，
+        与缓存中的同一行比较；新数据中缺失（NaN）或没有该行的股票不判为变化。
+
+        Returns:
+            list: 股票代码列表
+        """
+        probes = {}
+        for stock in stock_list:
+            entry = manifest.get(stock)
+            cached = self._read_stock(key_dir, stock) if entry else None
+            if cached is None or not len(cached[0]):
+                continue
+            index, values = cached
+            # 只比较已覆盖区间内的行（最后一行可能是写入时当天未收盘的数据）
+            index_date = index // 1000000 if index[0] > 99999999 else index
+            pos = np.searchsorted(index_date, int(entry['end']), side='right') - 1
+            if pos < 0:
+                continue
+            probe_date = str(index_date[pos])
+            probes.setdefault(probe_date, []).append(
+                (stock, str(index[pos]), dict(zip(entry['fields'], values[pos].tolist())))
+            )
+
+        stale = []
+        for probe_date, items in probes.items():
+            fresh = fetch_func([stock for stock, _, _ in items], probe_date, probe_date)
+            for stock, key, stored in items:
+                df = fresh.get(stock)
+                if df is None or df.empty:
+                    continue
+                df = df[df.index.astype(str) == key]
+                if df.empty:
+                    continue
+                row = df.iloc[0]
+                for field, old_value in stored.items():
+                    if field not in row.index:
+                        continue
+                    new_value = float(row[field])
+                    if not np.isnan(new_value) and new_value != old_value:
+                        stale.append(stock)
+                        break
+        return stale
+
+    def _drop_stocks(self, key_dir, manifest, stock_list):
+        """从 manifest 中移除股票并删除其数据文件（不保存 manifest）"""
+        for stock in stock_list:
+            if manifest.pop(stock, None) is None:
+                continue
+            path = self._data_path(key_dir, stock)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load_manifest(self, key_dir):
+        if key_dir in self._manifests:
+            return self._manifests[key_dir]
+
+        manifest = {}
+        path = os.path.join(key_dir, self.MANIFEST_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        self._manifests[key_dir] = manifest
+        return manifest
+
+    def _save_manifest(self, key_dir, manifest):
+        os.makedirs(key_dir, exist_ok=True)
+        path = os.path.join(key_dir, self.MANIFEST_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _missing_segments(self, entry, start_time, end_time):
+        """计算请求区间中未被缓存覆盖的部分，返回 [(start, end), ...]"""
+        if not entry:
+            return [(start_time, end_time)]
+
+        segments = []
+        if start_time < entry['start']:
+            segments.append((start_time, entry['start']))
+        if end_time > entry['end']:
+            segments.append((entry['end'], end_time))
+        return segments
+
+    def _last_complete_date(self):
+        """最近一个收盘完整的日期（当天数据可能不完整，不计入已覆盖区间）"""
+        return (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+
+    def _read_stock(self, key_dir, stock, mmap_mode='r'):
+        """读取单只股票缓存，返回 (int64时间索引, float64数值矩阵)"""
+        path = self._data_path(key_dir, stock)
+        if not os.path.exists(path):
+            return None
+
+        # 时间键与字段存于同一文件，每只股票只需一次文件读取
+        block = np.load(path, mmap_mode=mmap_mode)
+        return block[:, 0].astype(np.int64), block[:, 1:]
+
+    def _write_stock(self, key_dir, stock, df):
+        os.makedirs(key_dir, exist_ok=True)
+        index = df.index.astype(np.int64).to_numpy()
+        block = np.empty((len(df), len(df.columns) + 1), dtype=np.float64)
+        block[:, 0] = index
+        block[:, 1:] = df.to_numpy(dtype=np.float64)
+
+        path = self._data_path(key_dir, stock)
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, block)
+        os.replace(tmp_path, path)
+
+        return index, block[:, 1:]
+
+    def _slice(self, cached, stock_fields, start_time, end_time, fields):
+        """在原始数组上按日期区间和字段切片，最后才构造 DataFrame"""
+        index, values = cached
+
+        # 分钟/分笔周期的索引为 YYYYMMDDHHMMSS，统一按日期部分比较
+        index_date = index // 1000000 if len(index) and index[0] > 99999999 else index
+        lo = np.searchsorted(index_date, int(start_time), side='left')
+        hi = np.searchsorted(index_date, int(end_time), side='right')
+
+        columns = stock_fields
+        block = values[lo:hi]
+        if fields:
+            col_pos = {f: i for i, f in enumerate(stock_fields)}
+            columns = list(fields)
+            block = np.column_stack([
+                block[:, col_pos[f]] if f in col_pos else np.full(hi - lo, np.nan)
+                for f in fields
+            ]) if hi > lo else np.empty((0, len(fields)))
+
+        return pd.DataFrame(block, index=self._shared_index(index[lo:hi]), columns=columns)
+
+    def _shared_index(self, index_values):
+        key = index_values.tobytes()
+        shared = self._index_pool.get(key)
+        if shared is None:
+            shared = pd.Index(index_values.astype(str))
+            self._index_pool[key] = shared
+        return shared
@@ -0,0 +1,228 @@
+# coding: utf-8
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from xtquant import xtdata
+from utils.helpers import batch_list, print_progress
+
+
+class HistoryDownloader:
+    """
+    历史行情批量下载器（基于 xtdata.download_history_data2）
+
+    - 按 (周期, 股票批次) 拆分任务，多个批次并发下载
+    - 通过进度回调逐只股票记录完成状态，定期写入检查点文件，
+      中断后重新运行会跳过已完成的股票
+    - 汇总下载速度（只/秒）和预计剩余时间
+    """
+
+    def __init__(self, checkpoint_path=None, batch_size=200, max_workers=2,
+                 max_retries=2, retry_delay=5.0, flush_every=50):
+        """
+        初始化
+
+        Args:
+            checkpoint_path: 检查点文件路径（json），None表示不保存进度
+            batch_size: 每次 download_history_data2 请求的股票数量
+            max_workers: 并发下载的批次数
+            max_retries: 单批下载失败后的重试次数
+            retry_delay: 重试间隔（秒），按重试次数线性递增
+            flush_every: 每完成多少只股票写一次检查点
+        """
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.flush_every = max(1, flush_every)
+
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        self._unflushed = 0
+        self._done = 0
+        self._total = 0
+        self._start_ts = None
+
+    def run(self, stock_list, periods='1d', start_date='', end_date=''):
+        """
+        下载历史数据
+
+        Args:
+            stock_list: 股票代码列表
+            periods: 周期或周期列表，如 '1d' 或 ['1d', '1m']
+            start_date: 开始日期，空字符串表示增量下载
+            end_date: 结束日期，空字符串表示至今
+
+        Returns:
+            dict: {'total', 'skipped', 'downloaded', 'failed', 'elapsed', 'throughput'}
+                  failed 为 {period: [stock_code, ...]}
+        """
+        if isinstance(periods, str):
+            periods = [periods]
+
+        jobs = []
+        skipped = 0
+        for period in periods:
+            task_key = self._task_key(period, start_date, end_date)
+            with self._lock:
+                completed = set(self._manifest.setdefault(task_key, []))
+            pending = [s for s in stock_list if s not in completed]
+            skipped += len(stock_list) - len(pending)
+            for batch in batch_list(pending, self.batch_size):
+                jobs.append((task_key, period, batch))
+
+        self._total = sum(len(batch) for _, _, batch in jobs)
+        self._done = 0
+        self._start_ts = time.time()
+
+        print(f"Downloading {'/'.join(periods)} history for {len(stock_list)} stocks: "
+              f"{self._total} pending, {skipped} already completed")
+
+        failed = {}
+        try:
+            if jobs:
+                workers = min(self.max_workers, len(jobs))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(
+                            self._download_batch, task_key, period, batch, start_date, end_date
+                        ): (task_key, period, batch)
+                        for task_key, period, batch in jobs
+                    }
+                    for future in as_completed(futures):
+                        task_key, period, batch = futures[future]
+                        try:
+                            unfinished = future.result()
+                        except Exception as e:
+                            print(f"\nDownload failed ({period}, {batch[0]}..., {len(batch)} stocks): {e}")
+                            with self._lock:
+                                completed = set(self._manifest[task_key])
+                            unfinished = [s for s in batch if s not in completed]
+                        if unfinished:
+                            failed.setdefault(period, []).extend(unfinished)
+        finally:
+            # 中断（如 Ctrl+C）时也保存已完成的进度
+            self._flush(force=True)
+
+        elapsed = time.time() - self._start_ts
+        downloaded = self._total - sum(len(v) for v in failed.values())
+        throughput = downloaded / elapsed if elapsed > 0 else 0.0
+        print(f"\nDownload finished: {downloaded}/{self._total} stocks in {elapsed:.1f}s "
+              f"({throughput:.1f} stocks/s), {skipped} skipped")
+
+        return {
+            'total': self._total + skipped,
+            'skipped': skipped,
+            'downloaded': downloaded,
+            'failed': failed,
+            'elapsed': elapsed,
+            'throughput': throughput
+        }
+
+    def reset(self, period=None, start_date='', end_date=''):
+        """
+        清除检查点记录
+
+        Args:
+            period: 周期，None表示清除全部任务
+            start_date: 开始日期
+            end_date: 结束日期
+        """
+        with self._lock:
+            if period is None:
+                self._manifest = {}
+            else:
+                self._manifest.pop(self._task_key(period, start_date, end_date), None)
+        self._flush(force=True)
+
+    def _download_batch(self, task_key, period, batch, start_date, end_date):
+        """
+        下载单个批次，返回未完成的股票列表
+        """
+        remaining = set(batch)
+        reported = [False]
+
+        def on_progress(data):
+            stock = data.get('stockcode')
+            if stock:
+                reported[0] = True
+            if data.get('message'):
+                # 回调携带错误信息时该股票未下载成功，留在 remaining 中等待重试
+                print(f"\nDownload error ({period}, {stock}): {data['message']}")
+                return
+            if stock in remaining:
+                remaining.discard(stock)
+                self._mark_done(task_key, [stock])
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                xtdata.download_history_data2(
+                    [s for s in batch if s in remaining], period,
+                    start_date, end_date, callback=on_progress
+                )
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"\nDownload batch failed ({period}, {batch[0]}...): {e}, "
+                      f"retry {attempt + 1}/{self.max_retries}")
+                time.sleep(self.retry_delay * (attempt + 1))
+                continue
+
+            if not reported[0]:
+                # 回调未携带股票代码时，以整批返回作为完成标志
+                self._mark_done(task_key, [s for s in batch if s in remaining])
+                remaining.clear()
+            if not remaining:
+                break
+
+        return [s for s in batch if s in remaining]
+
+    def _mark_done(self, task_key, stocks):
+        with self._lock:
+            self._manifest[task_key].extend(stocks)
+            self._unflushed += len(stocks)
+            self._done += len(stocks)
+            done = self._done
+        self._flush()
+
+        elapsed = time.time() - self._start_ts
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self._total - done) / rate if rate > 0 else 0.0
+        print_progress(done, self._total, prefix='Downloading:',
+                       suffix=f'{rate:.1f} stocks/s, ETA {eta:.0f}s')
+
+    @staticmethod
+    def _task_key(period, start_date, end_date):
+        # 下载至今的任务按运行日期区分，避免次日续传时误跳过新增数据
+        end = end_date or f"now@{datetime.now().strftime('%Y%m%d')}"
+        return f"{period}|{start_date or 'incremental'}|{end}"
+
+    def _load_manifest(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read download checkpoint {self.checkpoint_path}: {e}")
+            return {}
+
+    def _flush(self, force=False):
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            if not force and self._unflushed < self.flush_every:
+                return
+            self._unflushed = 0
+            content = json.dumps(self._manifest)
+
+            directory = os.path.dirname(self.checkpoint_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.checkpoint_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.checkpoint_path)
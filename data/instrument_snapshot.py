@@ -0,0 +1,160 @@
+# coding: utf-8
+import os
+import json
+import glob
+from datetime import datetime
+import pandas as pd
+from xtquant import xtdata
+
+
+SNAPSHOT_FIELDS = ['OpenDate', 'FloatVolume', 'Board', 'PriceTick']
+
+
+def classify_board(stock_code):
+    """
+    按代码前缀判断所属板块（与 utils.market_rules 的涨跌幅规则一致）
+
+    Args:
+        stock_code: 股票代码，如 '300750.SZ'
+
+    Returns:
+        str: 'main' 主板, 'gem' 创业板, 'star' 科创板, 'bse' 北交所
+    """
+    if stock_code.startswith(('300', '301')):
+        return 'gem'
+    if stock_code.startswith('688'):
+        return 'star'
+    if stock_code.startswith(('8', '4')) or stock_code.endswith('.BJ'):
+        return 'bse'
+    return 'main'
+
+
+class InstrumentSnapshot:
+    """
+    合约基础信息快照（上市日期、流通股本、板块、最小变价单位）
+
+    通过 xtdata.get_instrument_detail_list 批量获取，按日期保存为
+    {root_dir}/instruments_YYYYMMDD.json，同一交易日内再次启动时一次读盘即可，
+    不再逐只股票调用 get_instrument_detail。
+    """
+
+    def __init__(self, root_dir=None, batch_size=2000, keep=3):
+        """
+        初始化
+
+        Args:
+            root_dir: 快照目录，None表示仅在内存中保存
+            batch_size: 每次 get_instrument_detail_list 请求的股票数量
+            keep: 保留的历史快照文件数
+        """
+        self.root_dir = root_dir
+        self.batch_size = batch_size
+        self.keep = keep
+        self._date = None
+        self._records = {}
+
+        if self.root_dir:
+            os.makedirs(self.root_dir, exist_ok=True)
+
+    def load(self, stock_list, date=None):
+        """
+        获取股票基础信息，快照缺失的股票批量拉取后写回
+
+        Args:
+            stock_list: 股票代码列表
+            date: 快照日期，如'20240102'，None表示今天
+
+        Returns:
+            pd.DataFrame: index=股票代码, columns=SNAPSHOT_FIELDS
+        """
+        date = date or datetime.now().strftime('%Y%m%d')
+        if self._date != date:
+            self._records = self._read_snapshot(date)
+            self._date = date
+
+        missing = [s for s in stock_list if s not in self._records]
+        if missing:
+            print(f"Fetching instrument snapshot for {len(missing)} stocks...")
+            fetched = self._fetch(missing)
+            if fetched:
+                self._records.update(fetched)
+                self._write_snapshot(date)
+
+        # 仍未取到基础信息的股票使用默认值返回，但不写入快照，下次调用时重新拉取
+        records = [self._records.get(s) or self._to_record(s, None) for s in stock_list]
+        return pd.DataFrame(records, index=pd.Index(stock_list), columns=SNAPSHOT_FIELDS)
+
+    def get_opendates(self, stock_list, date=None):
+        """
+        获取上市日期
+
+        Returns:
+            dict: {stock_code: 'YYYYMMDD'}，未知上市日期为 '19700101'
+        """
+        return self.load(stock_list, date)['OpenDate'].to_dict()
+
+    def _fetch(self, stock_list):
+        """
+        批量拉取基础信息，批量请求失败时该批逐只获取
+
+        Returns:
+            dict: {stock_code: record}，只包含取到基础信息的股票
+        """
+        records = {}
+        for i in range(0, len(stock_list), self.batch_size):
+            batch = stock_list[i:i + self.batch_size]
+            try:
+                details = xtdata.get_instrument_detail_list(batch) or {}
+            except Exception as e:
+                print(f"Error fetching instrument detail list: {e}, falling back to per-stock requests")
+                details = {}
+                for stock in batch:
+                    try:
+                        details[stock] = xtdata.get_instrument_detail(stock)
+                    except Exception as e:
+                        print(f"Error fetching instrument detail for {stock}: {e}")
+            for stock in batch:
+                detail = details.get(stock)
+                if detail:
+                    records[stock] = self._to_record(stock, detail)
+        return records
+
+    @staticmethod
+    def _to_record(stock, detail):
+        detail = detail or {}
+        opendate = detail.get('OpenDate') or '19700101'
+        return {
+            'OpenDate': str(opendate),
+            'FloatVolume': float(detail.get('FloatVolume') or 0.0),
+            'Board': classify_board(stock),
+            'PriceTick': float(detail.get('PriceTick') or 0.01)
+        }
+
+    def _snapshot_path(self, date):
+        return os.path.join(self.root_dir, f'instruments_{date}.json')
+
+    def _read_snapshot(self, date):
+        if not self.root_dir:
+            return {}
+        path = self._snapshot_path(date)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read instrument snapshot {path}: {e}")
+            return {}
+
+    def _write_snapshot(self, date):
+        if not self.root_dir:
+            return
+        path = self._snapshot_path(date)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._records, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        snapshots = sorted(glob.glob(os.path.join(self.root_dir, 'instruments_*.json')))
+        for old in snapshots[:-self.keep]:
+            os.remove(old)
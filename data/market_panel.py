@@ -0,0 +1,194 @@
+# coding: utf-8
+import pandas as pd
+import numpy as np
+from utils.helpers import stack_market_data
+
+
+DEFAULT_PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class MarketPanel:
+    """
+    日线行情面板：单个连续的 (字段×日期×股票) ndarray
+
+    - 字段视图 field() 返回底层数组的二维切片，不复制数据
+    - 股票和日期使用整数下标（stock_id / date_id），便于与 numpy 因子计算对齐
+    - 需要 pandas 时通过 to_frame() / to_frames() 按需导出（共享底层内存）
+    """
+
+    def __init__(self, values, fields, dates, stocks):
+        """
+        初始化
+
+        Args:
+            values: np.ndarray, shape=(字段数, 日期数, 股票数)
+            fields: 字段名列表，与 values 第0维对应
+            dates: 日期序列（如 '20240101'），与 values 第1维对应
+            stocks: 股票代码序列，与 values 第2维对应
+        """
+        values = np.asarray(values)
+        if values.ndim != 3:
+            raise ValueError(f"MarketPanel values must be 3-D, got shape {values.shape}")
+        if values.shape != (len(fields), len(dates), len(stocks)):
+            raise ValueError(
+                f"MarketPanel shape {values.shape} does not match "
+                f"fields={len(fields)}, dates={len(dates)}, stocks={len(stocks)}"
+            )
+
+        self.values = values
+        self.fields = list(fields)
+        self.dates = pd.Index(dates)
+        self.stocks = pd.Index(stocks)
+
+        self.field_ids = {field: i for i, field in enumerate(self.fields)}
+        self.date_ids = {date: i for i, date in enumerate(self.dates)}
+        self.stock_ids = {stock: i for i, stock in enumerate(self.stocks)}
+
+    @classmethod
+    def from_market_data(cls, data, fields=None, dtype=np.float64):
+        """
+        从 get_market_data_ex 返回的 dict 构建面板
+
+        Args:
+            data: {stock_code: DataFrame}
+            fields: 字段列表，默认 DEFAULT_PANEL_FIELDS
+            dtype: 数值类型，np.float64 或 np.float32
+
+        Returns:
+            MarketPanel
+        """
+        if fields is None:
+            fields = DEFAULT_PANEL_FIELDS
+        values, dates, stocks = stack_market_data(data, fields, dtype=dtype)
+        return cls(values, fields, dates, stocks)
+
+    @classmethod
+    def from_frames(cls, frames, dtype=np.float64):
+        """
+        从宽表 DataFrame 字典构建面板（各DataFrame按第一个的 index/columns 对齐）
+
+        Args:
+            frames: {field: DataFrame(index=date, columns=stock_code)}
+            dtype: 数值类型
+
+        Returns:
+            MarketPanel
+        """
+        fields = list(frames.keys())
+        first = frames[fields[0]]
+        values = np.empty((len(fields), len(first.index), len(first.columns)), dtype=dtype)
+        for k, field in enumerate(fields):
+            values[k] = frames[field].reindex(index=first.index, columns=first.columns).to_numpy(dtype=dtype)
+        return cls(values, fields, first.index, first.columns)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    def __contains__(self, field):
+        return field in self.field_ids
+
+    def __repr__(self):
+        return (f"MarketPanel(fields={self.fields}, dates={len(self.dates)}, "
+                f"stocks={len(self.stocks)}, dtype={self.values.dtype})")
+
+    def field(self, name):
+        """
+        获取字段矩阵视图（不复制）
+
+        Args:
+            name: 字段名
+
+        Returns:
+            np.ndarray: shape=(日期数, 股票数)
+        """
+        if name not in self.field_ids:
+            raise KeyError(f"Field '{name}' not in panel, available: {self.fields}")
+        return self.values[self.field_ids[name]]
+
+    def stock_id(self, stock_code):
+        """股票代码 -> 列下标，不存在返回 -1"""
+        return self.stock_ids.get(stock_code, -1)
+
+    def date_id(self, date):
+        """日期 -> 行下标，不存在返回 -1"""
+        return self.date_ids.get(date, -1)
+
+    def get_row(self, name, date):
+        """
+        获取某字段某日全部股票的取值（视图）
+
+        Args:
+            name: 字段名
+            date: 日期字符串
+
+        Returns:
+            np.ndarray: shape=(股票数,)，日期不存在时返回 None
+        """
+        idx = self.date_id(date)
+        if idx < 0:
+            return None
+        return self.field(name)[idx]
+
+    def slice_dates(self, start=None, end=None):
+        """
+        按日期区间切片（返回共享内存的新面板）
+
+        Args:
+            start: 开始日期（含），None表示不限
+            end: 结束日期（含），None表示不限
+
+        Returns:
+            MarketPanel
+        """
+        lo = 0 if start is None else self.dates.searchsorted(start, side='left')
+        hi = len(self.dates) if end is None else self.dates.searchsorted(end, side='right')
+        return MarketPanel(self.values[:, lo:hi, :], self.fields, self.dates[lo:hi], self.stocks)
+
+    def to_frame(self, name):
+        """
+        导出单个字段为 DataFrame（与面板共享内存）
+
+        Args:
+            name: 字段名
+
+        Returns:
+            pd.DataFrame: index=日期, columns=股票代码
+        """
+        return pd.DataFrame(self.field(name), index=self.dates, columns=self.stocks, copy=False)
+
+    def to_frames(self, fields=None):
+        """
+        导出多个字段为 DataFrame 字典
+
+        Args:
+            fields: 字段列表，None表示全部字段
+
+        Returns:
+            dict: {field: DataFrame}
+        """
+        return {name: self.to_frame(name) for name in (fields or self.fields)}
+
+
+def as_frame(data, field):
+    """
+    将 MarketPanel 或 DataFrame 统一为 DataFrame
+
+    Args:
+        data: MarketPanel 或 DataFrame
+        field: data 为 MarketPanel 时要导出的字段
+
+    Returns:
+        pd.DataFrame
+    """
+    if isinstance(data, MarketPanel):
+        return data.to_frame(field)
+    return data
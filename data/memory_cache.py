@@ -0,0 +1,240 @@
+# coding: utf-8
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+
+
+def estimate_nbytes(value):
+    """
+    估算缓存对象占用的内存字节数
+
+    Args:
+        value: DataFrame / Series / ndarray / dict / list，或带 nbytes 属性的对象
+
+    Returns:
+        int: 估算字节数
+    """
+    if isinstance(value, pd.DataFrame):
+        # 字符串索引/列名（股票代码、日期）及 object 列按元素统计，数值部分只计缓冲区大小
+        deep = _has_object_data([value.index, value.columns], value.dtypes)
+        return int(value.memory_usage(index=True, deep=deep).sum()
+                   + value.columns.memory_usage(deep=deep))
+    if isinstance(value, pd.Series):
+        deep = _has_object_data([value.index], [value.dtype])
+        return int(value.memory_usage(index=True, deep=deep))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in value)
+    return int(getattr(value, 'nbytes', 64))
+
+
+def _has_object_data(axes, dtypes):
+    """轴或列中是否有按元素存储的 object/字符串类型（浅统计只计指针大小）"""
+    return any(pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+               for dtype in [axis.dtype for axis in axes] + list(dtypes))
+
+
+def fingerprint_frame(df, sample=64):
+    """
+    计算宽表数据的廉价指纹（形状、索引首尾、列首尾、抽样取值的哈希）
+
+    只抽样 sample×sample 个位置及最后一行全部取值，不遍历全部数据；
+    用于因子缓存判断输入是否为同一份数据（原地改写未抽样的历史位置不会改变指纹）。
+
+    Args:
+        df: DataFrame 或 ndarray
+        sample: 每个维度的抽样数
+
+    Returns:
+        str: 指纹字符串
+    """
+    if isinstance(df, pd.DataFrame):
+        values = df.to_numpy()
+        bounds = (df.index[:1].tolist(), df.index[-1:].tolist(),
+                  df.columns[:1].tolist(), df.columns[-1:].tolist())
+    else:
+        values = np.asarray(df)
+        bounds = ()
+
+    digest = hashlib.sha1(repr((values.shape, str(values.dtype), bounds)).encode('utf-8'))
+    if values.size:
+        picks = [np.unique(np.linspace(0, n - 1, min(n, sample)).astype(np.int64)) for n in values.shape]
+        sampled = values[np.ix_(*picks)] if values.ndim > 1 else values[picks[0]]
+        digest.update(np.ascontiguousarray(sampled).tobytes())
+        digest.update(np.ascontiguousarray(values[-1]).tobytes())
+    return digest.hexdigest()[:20]
+
+
+class LRUDataCache:
+    """
+    内容寻址的内存缓存（按字节预算做LRU淘汰）
+
+    缓存键由数据类型、股票集合、字段投影及其他请求参数共同决定，
+    避免不同股票池或字段组合的请求命中同一条缓存。
+    """
+
+    def __init__(self, max_bytes=2 * 1024 ** 3):
+        """
+        初始化
+
+        Args:
+            max_bytes: 缓存字节预算，超出后按最近最少使用顺序淘汰
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(kind, stock_list=None, fields=None, **params):
+        """
+        生成缓存键
+
+        Args:
+            kind: 数据类型，如 'daily', 'minute'
+            stock_list: 股票代码列表（按集合计算摘要，与顺序无关）
+            fields: 字段列表，None或空列表表示全部字段
+            **params: 其他影响结果的请求参数，如日期、复权类型
+
+        Returns:
+            str: 缓存键，如 'daily|dividend_type=front|end=20241231|start=20240101|stocks=3f2a...x5000|fields=*'
+        """
+        parts = [kind]
+        for name in sorted(params):
+            parts.append(f"{name}={params[name]}")
+
+        stocks = sorted(set(stock_list or []))
+        digest = hashlib.sha1('\n'.join(stocks).encode('utf-8')).hexdigest()[:16]
+        parts.append(f"stocks={digest}x{len(stocks)}")
+        parts.append(f"fields={','.join(fields) if fields else '*'}")
+        return '|'.join(parts)
+
+    def get(self, key, default=None):
+        """
+        读取缓存，命中时将条目移到最近使用位置
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值或default
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, nbytes=None):
+        """
+        写入缓存，超出字节预算时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            nbytes: 占用字节数，None表示自动估算
+
+        Returns:
+            bool: 是否写入成功（单个对象超过预算时不缓存）
+        """
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+
+        with self._lock:
+            self.evict(key)
+            if nbytes > self.max_bytes:
+                return False
+
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+            return True
+
+    def evict(self, key):
+        """
+        显式淘汰指定条目
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            bool: 条目是否存在
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def evict_kind(self, kind):
+        """
+        淘汰某一数据类型的全部条目
+
+        Args:
+            kind: 数据类型，如 'minute'
+
+        Returns:
+            int: 淘汰条目数
+        """
+        with self._lock:
+            prefix = f"{kind}|"
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """清空缓存（不重置命中统计）"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: {'entries', 'bytes', 'max_bytes', 'hits', 'misses', 'evictions', 'hit_rate'}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
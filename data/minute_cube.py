@@ -0,0 +1,163 @@
+# coding: utf-8
+import pandas as pd
+import numpy as np
+from utils.helpers import stack_market_data
+
+
+DEFAULT_MINUTE_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class MinuteBar:
+    """
+    单个分钟的全市场截面：MinuteCube 中一行 (股票×字段) 的视图
+    """
+
+    __slots__ = ('timestamp', 'values', 'stocks', 'field_ids')
+
+    def __init__(self, timestamp, values, stocks, field_ids):
+        self.timestamp = timestamp
+        self.values = values
+        self.stocks = stocks
+        self.field_ids = field_ids
+
+    def __len__(self):
+        return len(self.stocks)
+
+    def field(self, name):
+        """
+        获取某字段全部股票的取值（视图，缺失为NaN）
+
+        Args:
+            name: 字段名
+
+        Returns:
+            np.ndarray: shape=(股票数,)
+        """
+        return self.values[:, self.field_ids[name]]
+
+    def to_price_dict(self, name='open'):
+        """
+        导出有效价格字典（过滤NaN和非正价格）
+
+        Args:
+            name: 价格字段名
+
+        Returns:
+            dict: {stock_code: price}
+        """
+        prices = self.field(name)
+        valid = prices > 0
+        return dict(zip(self.stocks[valid].tolist(), prices[valid].tolist()))
+
+    def to_dict(self):
+        """
+        导出为 {stock_code: {field: value}}（兼容旧接口，仅包含当分钟有数据的股票）
+
+        Returns:
+            dict
+        """
+        fields = list(self.field_ids.keys())
+        has_data = ~np.isnan(self.values).all(axis=1)
+        return {
+            stock: dict(zip(fields, row))
+            for stock, row in zip(self.stocks[has_data].tolist(), self.values[has_data].tolist())
+        }
+
+
+class MinuteCube:
+    """
+    单日分钟数据立方体：连续的 (分钟×股票×字段) ndarray
+
+    通过时间戳 -> 行号字典定位分钟，bar() 返回该分钟全市场截面的视图，
+    取代逐分钟在双层索引 DataFrame 上做 xs().to_dict() 的开销。
+    """
+
+    def __init__(self, values, timestamps, stocks, fields):
+        """
+        初始化
+
+        Args:
+            values: np.ndarray, shape=(分钟数, 股票数, 字段数)
+            timestamps: 时间戳序列（'YYYYMMDDHHMMSS' 字符串），与 values 第0维对应
+            stocks: 股票代码序列，与 values 第1维对应
+            fields: 字段名列表，与 values 第2维对应
+        """
+        self.values = values
+        self.timestamps = list(timestamps)
+        self.stocks = np.asarray(list(stocks), dtype=object)
+        self.fields = list(fields)
+
+        self.row_ids = {ts: i for i, ts in enumerate(self.timestamps)}
+        self.stock_ids = {stock: i for i, stock in enumerate(self.stocks)}
+        self.field_ids = {field: i for i, field in enumerate(self.fields)}
+
+    @classmethod
+    def from_market_data(cls, data, fields=None, dtype=np.float64):
+        """
+        从 get_market_data_ex 返回的分钟数据 dict 构建
+
+        Args:
+            data: {stock_code: DataFrame(index=时间戳)}
+            fields: 字段列表，默认 DEFAULT_MINUTE_FIELDS
+            dtype: 数值类型
+
+        Returns:
+            MinuteCube
+        """
+        if fields is None:
+            fields = DEFAULT_MINUTE_FIELDS
+        if not data:
+            return cls.empty(fields)
+
+        values, timestamps, stocks = stack_market_data(data, fields, dtype=dtype)
+        cube = np.ascontiguousarray(values.transpose(1, 2, 0))
+        return cls(cube, [str(ts) for ts in timestamps], stocks, fields)
+
+    @classmethod
+    def empty(cls, fields=None):
+        """构建空立方体（无分钟数据的交易日）"""
+        fields = fields or DEFAULT_MINUTE_FIELDS
+        return cls(np.empty((0, 0, len(fields))), [], [], fields)
+
+    @property
+    def is_empty(self):
+        return len(self.timestamps) == 0 or len(self.stocks) == 0
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def row(self, timestamp):
+        """时间戳 -> 行号，不存在返回 -1"""
+        return self.row_ids.get(timestamp, -1)
+
+    def bar(self, timestamp):
+        """
+        获取某分钟全市场截面
+
+        Args:
+            timestamp: 'YYYYMMDDHHMMSS'
+
+        Returns:
+            MinuteBar，时间戳不存在时返回 None
+        """
+        idx = self.row_ids.get(timestamp, -1)
+        if idx < 0:
+            return None
+        return MinuteBar(timestamp, self.values[idx], self.stocks, self.field_ids)
+
+    def field(self, name):
+        """
+        获取某字段的 (分钟×股票) 矩阵视图
+
+        Args:
+            name: 字段名
+
+        Returns:
+            np.ndarray
+        """
+        return self.values[:, :, self.field_ids[name]]
+
+    def to_frame(self, name):
+        """导出某字段为 DataFrame（index=时间戳, columns=股票代码）"""
+        return pd.DataFrame(self.field(name), index=self.timestamps, columns=self.stocks)
@@ -0,0 +1,140 @@
+# coding: utf-8
+import queue
+import threading
+
+
+class MinuteDataPrefetcher:
+    """
+    分钟数据预取器：在后台线程中按交易日顺序提前加载并预处理分钟数据
+
+    主线程模拟第D日时，工作线程已在准备D+1日（及之后最多 lookahead 个交易日）的数据，
+    换日时 get() 直接取走已准备好的结果。队列有界，工作线程领先过多时会阻塞等待。
+    """
+
+    _SENTINEL = object()
+
+    def __init__(self, load_func, dates, lookahead=1):
+        """
+        初始化
+
+        Args:
+            load_func: 加载函数 load_func(date) -> 预处理后的当日数据，在工作线程中调用
+            dates: 需要预取的交易日列表（升序，如 ['20240102', '20240103', ...]）
+            lookahead: 已完成但尚未被取走的交易日数量上限
+        """
+        self.load_func = load_func
+        self.dates = sorted(dates)
+        self.lookahead = max(1, lookahead)
+
+        self._date_set = set(self.dates)
+        self._queue = queue.Queue(maxsize=self.lookahead)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pending = None
+        self._exhausted = False
+
+    def start(self, from_date=None):
+        """
+        启动后台预取线程
+
+        Args:
+            from_date: 从该日期（含）开始预取，None表示从第一个交易日开始
+        """
+        if self._thread is not None:
+            return
+
+        dates = [d for d in self.dates if from_date is None or d >= from_date]
+        self._thread = threading.Thread(
+            target=self._run, args=(dates,), name='minute-prefetcher', daemon=True
+        )
+        self._thread.start()
+
+    def get(self, date):
+        """
+        获取某个交易日的数据
+
+        预取结果按日期顺序消费：早于 date 的结果会被丢弃（跳过的交易日），
+        date 不在预取计划中、预取线程已结束或加载失败时在当前线程同步加载。
+
+        Args:
+            date: 交易日，如 '20240102'
+
+        Returns:
+            load_func(date) 的返回值
+        """
+        if self._thread is None or date not in self._date_set:
+            return self.load_func(date)
+
+        while True:
+            item = self._next_item()
+            if item is None:
+                return self.load_func(date)
+
+            item_date, value, error = item
+            if item_date < date:
+                continue
+            if item_date > date:
+                # 请求了比预取进度更早的日期，保留该结果供后续使用
+                self._pending = item
+                return self.load_func(date)
+            if error is not None:
+                print(f"Minute prefetch failed for {date}: {error}, loading synchronously")
+                return self.load_func(date)
+            return value
+
+    def shutdown(self, timeout=5.0):
+        """
+        停止后台线程并释放已预取的数据
+
+        Args:
+            timeout: 等待线程退出的最长秒数
+        """
+        self._stop_event.set()
+        self._drain()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain()
+        self._pending = None
+
+    def _next_item(self):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        if self._exhausted:
+            return None
+
+        item = self._queue.get()
+        if item is self._SENTINEL:
+            self._exhausted = True
+            return None
+        return item
+
+    def _run(self, dates):
+        for date in dates:
+            if self._stop_event.is_set():
+                break
+            try:
+                item = (date, self.load_func(date), None)
+            except Exception as e:
+                item = (date, None, e)
+            if not self._put(item):
+                return
+        self._put(self._SENTINEL)
+
+    def _put(self, item):
+        """阻塞写入队列，收到停止信号时放弃写入"""
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
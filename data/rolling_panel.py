@@ -0,0 +1,278 @@
+# coding: utf-8
+import pandas as pd
+import numpy as np
+from utils.helpers import stack_market_data
+from .market_panel import MarketPanel, DEFAULT_PANEL_FIELDS
+
+
+class RollingDailyPanel:
+    """
+    滚动日线面板：固定股票池、固定窗口长度的日线数据
+
+    首次 load() 拉取完整窗口，之后每个交易日 update() 只拉取新增交易日并丢弃最旧的行。
+    update() 从 last_date 当日起拉取（多拉一行），某只股票当日的取值与面板中已有的不一致时，
+    说明其复权基准已变化（除权除息后前复权历史价格整体改变），才重新拉取该股票的完整窗口；
+    不需要逐只股票查询除权因子。
+
+    attach_factor_engine() 挂接增量因子引擎（如 factors.incremental.IncrementalFactorEngine）后，
+    每次 update() 追加的交易日逐行推给引擎；有股票重新拉取历史时，按当前窗口重建引擎。
+
+    底层使用预留余量的 (字段×日期×股票) 缓冲区，追加时写入尾部，
+    余量用尽才整体前移一次；panel 返回的 MarketPanel 与缓冲区共享内存，
+    下一次 update() 后应重新获取。
+    """
+
+    def __init__(self, provider, stock_list, fields=None, window=None,
+                 dividend_type='front_ratio', fill_data=True, slack=20):
+        """
+        初始化
+
+        Args:
+            provider: DataProvider 实例
+            stock_list: 股票代码列表
+            fields: 字段列表，默认 DEFAULT_PANEL_FIELDS
+            window: 保留的交易日数，None表示以 load() 拉取到的交易日数为窗口
+            dividend_type: 复权类型
+            fill_data: 是否填充停牌数据
+            slack: 缓冲区预留的追加行数
+        """
+        self.provider = provider
+        self.stocks = pd.Index(stock_list)
+        self.fields = list(fields) if fields else list(DEFAULT_PANEL_FIELDS)
+        self.window = window
+        self.dividend_type = dividend_type
+        self.fill_data = fill_data
+        self.slack = max(1, slack)
+
+        self._values = None
+        self._dates = None
+        self._lo = 0
+        self._hi = 0
+        self._panel = None
+        self._engine_factory = None
+        self.factor_engine = None
+
+    @property
+    def panel(self):
+        """当前窗口的 MarketPanel（共享内存视图）"""
+        if self._panel is None:
+            if self._values is None:
+                return None
+            self._panel = MarketPanel(
+                self._values[:, self._lo:self._hi, :],
+                self.fields,
+                self._dates[self._lo:self._hi],
+                self.stocks
+            )
+        return self._panel
+
+    @property
+    def first_date(self):
+        return self._dates[self._lo] if self._hi > self._lo else None
+
+    @property
+    def last_date(self):
+        return self._dates[self._hi - 1] if self._hi > self._lo else None
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def load(self, start_time, end_time):
+        """
+        拉取完整窗口（走 DataProvider 的磁盘/内存缓存，磁盘缓存按除权因子摘要校验复权基准）
+
+        Args:
+            start_time: 开始日期，如'20230101'
+            end_time: 结束日期，如'20241231'
+
+        Returns:
+            MarketPanel
+        """
+        data = self.provider.get_daily_data(
+            stock_list=list(self.stocks),
+            start_time=start_time,
+            end_time=end_time,
+            fields=self.fields,
+            dividend_type=self.dividend_type,
+            fill_data=self.fill_data
+        )
+        values, dates = self._stack_aligned(data)
+
+        if self.window is None:
+            self.window = max(1, len(dates))
+        values = values[:, -self.window:, :]
+        dates = dates[-self.window:]
+
+        capacity = self.window + self.slack
+        self._values = np.full((len(self.fields), capacity, len(self.stocks)), np.nan)
+        self._dates = np.empty(capacity, dtype=object)
+        self._lo, self._hi = 0, len(dates)
+        self._values[:, :self._hi, :] = values
+        self._dates[:self._hi] = dates
+        self._panel = None
+
+        print(f"Rolling panel loaded: {len(self)} days x {len(self.stocks)} stocks "
+              f"({self.first_date} - {self.last_date})")
+        return self.panel
+
+    def attach_factor_engine(self, engine_factory):
+        """
+        挂接增量因子引擎，并用当前窗口预热
+
+        Args:
+            engine_factory: engine_factory(MarketPanel) -> 引擎，引擎需提供
+                            update(date, close, high, volume)，
+                            如 IncrementalFactorEngine.from_history
+
+        Returns:
+            引擎实例
+        """
+        self._engine_factory = engine_factory
+        self.factor_engine = engine_factory(self.panel) if self._values is not None else None
+        return self.factor_engine
+
+    def update(self, end_time):
+        """
+        追加 last_date 之后到 end_time 的交易日，并按窗口长度丢弃最旧的行
+
+        Args:
+            end_time: 结束日期，如'20250102'
+
+        Returns:
+            dict: {'appended': 新增交易日数, 'dropped': 丢弃交易日数, 'refetched': 重新拉取历史的股票列表}
+        """
+        if self._values is None:
+            raise RuntimeError("RollingDailyPanel.update() called before load()")
+
+        summary = {'appended': 0, 'dropped': 0, 'refetched': []}
+
+        # 从 last_date 当日起拉取：重叠的一行用于检查复权基准是否变化
+        start_time = str(self.last_date)[:8]
+        if start_time <= end_time:
+            data = self.provider._fetch_market_data(
+                list(self.stocks), '1d', start_time, end_time,
+                self.fields, self.dividend_type, self.fill_data
+            )
+            values, dates = self._stack_aligned(data)
+            changed = self._adjustment_changed(values, dates) if self.dividend_type != 'none' else []
+
+            keep = np.asarray([d > self.last_date for d in dates], dtype=bool)
+            if keep.any():
+                summary['dropped'] = self._append(values[:, keep, :], dates[keep])
+                summary['appended'] = int(keep.sum())
+
+            if changed:
+                self._refetch_history(changed)
+                summary['refetched'] = changed
+
+            if self._engine_factory is not None:
+                if changed or self.factor_engine is None:
+                    # 复权基准变化后旧的增量状态不再有效，按当前窗口重建
+                    self.factor_engine = self._engine_factory(self.panel)
+                else:
+                    self._feed_engine(values[:, keep, :], dates[keep])
+
+        if summary['appended'] or summary['refetched']:
+            print(f"Rolling panel updated to {self.last_date}: +{summary['appended']} days, "
+                  f"-{summary['dropped']} days, {len(summary['refetched'])} stocks refetched")
+        return summary
+
+    def _feed_engine(self, values, dates):
+        """将新追加的交易日逐行推给因子引擎"""
+        field_idx = {field: i for i, field in enumerate(self.fields)}
+        for k, date in enumerate(dates):
+            self.factor_engine.update(
+                date,
+                values[field_idx['close'], k],
+                values[field_idx['high'], k],
+                values[field_idx['volume'], k]
+            )
+
+    def _append(self, values, dates):
+        """
+        追加新行，返回丢弃的旧行数
+        """
+        n = len(dates)
+        if n > self.window:
+            values, dates, n = values[:, -self.window:, :], dates[-self.window:], self.window
+
+        size = self._hi - self._lo
+        keep_old = min(size, self.window - n)
+        dropped = size - keep_old
+        self._lo = self._hi - keep_old
+
+        if self._hi + n > self._values.shape[1]:
+            # 余量用尽，将保留的旧行整体移到缓冲区头部
+            self._values[:, :keep_old, :] = self._values[:, self._lo:self._hi, :]
+            self._dates[:keep_old] = self._dates[self._lo:self._hi]
+            self._lo, self._hi = 0, keep_old
+
+        self._values[:, self._hi:self._hi + n, :] = values
+        self._dates[self._hi:self._hi + n] = dates
+        self._hi += n
+        self._panel = None
+        return dropped
+
+    def _refetch_history(self, stock_list):
+        """
+        复权因子变化的股票：清除其日线缓存并重新拉取整个窗口
+        """
+        print(f"Adjustment factors changed for {len(stock_list)} stocks, refetching history...")
+        self.provider.invalidate_daily_cache(stock_list, self.dividend_type, self.fill_data)
+
+        data = self.provider._fetch_market_data(
+            stock_list, '1d', self.first_date, self.last_date,
+            self.fields, self.dividend_type, self.fill_data
+        )
+        if not data:
+            return
+
+        values, dates, stocks = stack_market_data(data, self.fields)
+        rows = pd.Index(self._dates[self._lo:self._hi]).get_indexer(dates)
+        cols = self.stocks.get_indexer(stocks)
+        row_mask = rows >= 0
+        col_mask = cols >= 0
+
+        window = self._values[:, self._lo:self._hi, :]
+        target_cols = cols[col_mask]
+        window[:, :, target_cols] = np.nan
+        window[np.ix_(np.arange(len(self.fields)), rows[row_mask], target_cols)] = \
+            values[np.ix_(np.arange(len(self.fields)), np.flatnonzero(row_mask), np.flatnonzero(col_mask))]
+        self._panel = None
+
+    def _stack_aligned(self, data):
+        """
+        将 {stock: DataFrame} 堆叠为按 self.stocks 对齐的 (字段×日期×股票) 数组
+
+        Returns:
+            tuple: (values, dates)，dates 为 object ndarray
+        """
+        if not data:
+            return np.empty((len(self.fields), 0, len(self.stocks))), np.empty(0, dtype=object)
+
+        values, dates, stocks = stack_market_data(data, self.fields)
+        cols = self.stocks.get_indexer(stocks)
+        aligned = np.full((len(self.fields), len(dates), len(self.stocks)), np.nan)
+        aligned[:, :, cols[cols >= 0]] = values[:, :, cols >= 0]
+        return aligned, np.asarray([str(d) for d in dates], dtype=object)
+
+    def _adjustment_changed(self, values, dates):
+        """
+        比较新拉取数据中 last_date 当日的取值与面板最后一行，返回取值不一致的股票
+
+        新数据中缺失（NaN）的位置不参与比较，避免拉取失败的股票被误判。
+
+        Args:
+            values: _stack_aligned 返回的 (字段×日期×股票) 数组
+            dates: 对应的日期数组
+
+        Returns:
+            list: 股票代码列表
+        """
+        pos = np.flatnonzero(dates == self.last_date)
+        if not len(pos):
+            return []
+        fresh = values[:, pos[0], :]
+        stored = self._values[:, self._hi - 1, :]
+        differs = ~np.isnan(fresh) & (fresh != stored)
+        return self.stocks[differs.any(axis=0)].tolist()
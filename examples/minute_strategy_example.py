@@ -39,11 +39,14 @@ def minute_backtest_example():
         end_date=end_date
     )
     
-    close_df = data_loader.convert_to_matrix_format(daily_data, 'close')
-    open_df = data_loader.convert_to_matrix_format(daily_data, 'open')
-    high_df = data_loader.convert_to_matrix_format(daily_data, 'high')
-    volume_df = data_loader.convert_to_matrix_format(daily_data, 'volume')
-    amount_df = data_loader.convert_to_matrix_format(daily_data, 'amount')
+    field_dfs = data_loader.convert_to_matrices(
+        daily_data, ['close', 'open', 'high', 'volume', 'amount']
+    )
+    close_df = field_dfs['close']
+    open_df = field_dfs['open']
+    high_df = field_dfs['high']
+    volume_df = field_dfs['volume']
+    amount_df = field_dfs['amount']
     
     strategy.prepare_daily_factors(
         close_df=close_df,
@@ -135,7 +138,8 @@ def minute_backtest_example():
     print("=" * 60)
     
     print(f"\n累计成交量缓存 (前3个股票):")
-    for i, (stock_code, cache) in enumerate(list(strategy.minute_cache.items())[:3]):
+    for stock_code in strategy.minute_cache.stocks[:3]:
+        cache = strategy.minute_cache.get(stock_code)
         print(f"  {stock_code}:")
         print(f"    累计成交量: {cache['cum_volume']:,.0f}")
         print(f"    累计成交额: {cache['cum_amount']:,.0f}")
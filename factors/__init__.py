@@ -5,5 +5,6 @@
 """
 
 from .factor_calculator import FactorCalculator
+from .incremental import IncrementalFactorEngine
 
-__all__ = ['FactorCalculator']
+__all__ = ['FactorCalculator', 'IncrementalFactorEngine']
@@ -0,0 +1,236 @@
+# coding: utf-8
+"""
+滚动因子计算后端
+
+- PandasBackend: pandas rolling，结果与原 DataFrame.rolling 逐位一致（默认后端）
+- NumpyBackend: 纯 numpy 实现（sliding_window_view / 倍增表），始终可用
+- NumbaBackend: numba 编译的按列并行循环，安装 numba 时可用
+
+各后端的输入输出均为按 (日期×股票) 排列的二维 float64 ndarray，
+NaN 语义与 pandas rolling(window, min_periods=window) 一致：窗口内有任一NaN或不足N日时结果为NaN。
+
+滚动最大值和连续上涨天数在各后端间完全一致；numpy/numba 的滚动均值与 pandas 的求和顺序不同，
+末位可能相差 1ulp（如 5.569999999999999 与 5.57），会翻转“价格 > 均线”这类严格比较，
+因此 exact = False，只在明确接受这种差异时使用。
+"""
+import numpy as np
+import pandas as pd
+from .kernels import rolling_max as np_rolling_max, rolling_mean as np_rolling_mean
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+class NumpyBackend:
+    """纯 numpy 后端"""
+
+    name = 'numpy'
+    # 滚动均值是否与 pandas 逐位一致
+    exact = False
+
+    def rolling_max(self, values, window):
+        """
+        N日滚动最大值
+
+        Args:
+            values: (日期, 股票) 数组
+            window: 窗口长度
+
+        Returns:
+            np.ndarray
+        """
+        return np_rolling_max(values, window)
+
+    def rolling_mean(self, values, window):
+        """
+        N日滚动均值
+
+        Args:
+            values: (日期, 股票) 数组
+            window: 窗口长度
+
+        Returns:
+            np.ndarray
+        """
+        return np_rolling_mean(values, window)
+
+    def up_streak(self, values):
+        """
+        截至每日的连续上涨天数（当日收盘价高于前一日记为上涨，NaN参与比较视为未上涨）
+
+        Args:
+            values: (日期, 股票) 收盘价数组
+
+        Returns:
+            np.ndarray(int32)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        is_up = np.zeros(values.shape, dtype=bool)
+        is_up[1:] = values[1:] > values[:-1]
+        rows = np.arange(values.shape[0], dtype=np.int32)[:, None]
+        last_down = np.maximum.accumulate(np.where(is_up, -1, rows), axis=0)
+        return (rows - last_down).astype(np.int32)
+
+
+class PandasBackend(NumpyBackend):
+    """pandas rolling 后端（连续上涨天数沿用 numpy 实现，为整数结果，与 pandas 一致）"""
+
+    name = 'pandas'
+    exact = True
+
+    def rolling_max(self, values, window):
+        if window <= 0:
+            return np.full(np.shape(values), np.nan)
+        return self._rolling(values, window).max().to_numpy()
+
+    def rolling_mean(self, values, window):
+        if window <= 0:
+            return np.full(np.shape(values), np.nan)
+        return self._rolling(values, window).mean().to_numpy()
+
+    @staticmethod
+    def _rolling(values, window):
+        return pd.DataFrame(np.asarray(values, dtype=np.float64), copy=False).rolling(
+            window=window, min_periods=window)
+
+
+if NUMBA_AVAILABLE:
+    # 以下内核的输入为 (股票, 日期) 的C连续数组，每只股票的时间序列在内存中连续
+    @njit(parallel=True, cache=True)
+    def _nb_rolling_max(values, window):
+        m, n = values.shape
+        out = np.full((m, n), np.nan)
+        for j in prange(m):
+            # 单调递减队列（存行号），队首为窗口最大值；每个行号最多入队一次，按序列长度分配免取模
+            queue = np.empty(n, dtype=np.int64)
+            head = 0
+            tail = 0
+            last_nan = -1
+            for i in range(n):
+                if tail > head and queue[head] <= i - window:
+                    head += 1
+                x = values[j, i]
+                if np.isnan(x):
+                    last_nan = i
+                else:
+                    while tail > head and values[j, queue[tail - 1]] <= x:
+                        tail -= 1
+                    queue[tail] = i
+                    tail += 1
+                if i >= window - 1 and last_nan <= i - window and tail > head:
+                    out[j, i] = values[j, queue[head]]
+        return out
+
+    @njit(parallel=True, cache=True)
+    def _nb_rolling_mean(values, window):
+        m, n = values.shape
+        out = np.full((m, n), np.nan)
+        for j in prange(m):
+            # Kahan 补偿求和，抑制长序列滑动加减的浮点累积误差
+            total = 0.0
+            comp = 0.0
+            nan_count = 0
+            for i in range(n):
+                x = values[j, i]
+                if np.isnan(x):
+                    nan_count += 1
+                else:
+                    y = x - comp
+                    t = total + y
+                    comp = (t - total) - y
+                    total = t
+                if i >= window:
+                    old = values[j, i - window]
+                    if np.isnan(old):
+                        nan_count -= 1
+                    else:
+                        y = -old - comp
+                        t = total + y
+                        comp = (t - total) - y
+                        total = t
+                if i >= window - 1 and nan_count == 0:
+                    out[j, i] = total / window
+        return out
+
+    @njit(parallel=True, cache=True)
+    def _nb_up_streak(values):
+        m, n = values.shape
+        out = np.zeros((m, n), dtype=np.int32)
+        for j in prange(m):
+            streak = 0
+            for i in range(1, n):
+                if values[j, i] > values[j, i - 1]:
+                    streak += 1
+                else:
+                    streak = 0
+                out[j, i] = streak
+        return out
+
+
+class NumbaBackend:
+    """
+    numba 编译后端（按股票并行），首次调用时编译
+
+    内部转置为按股票连续的布局计算，返回 (日期, 股票) 的 F 连续数组（转置视图，不额外复制）
+    """
+
+    name = 'numba'
+    exact = False
+
+    def __init__(self):
+        if not NUMBA_AVAILABLE:
+            raise ImportError("numba is not installed, use the 'numpy' backend instead")
+
+    def rolling_max(self, values, window):
+        if window <= 0:
+            return np.full(np.shape(values), np.nan)
+        return _nb_rolling_max(self._by_stock(values), window).T
+
+    def rolling_mean(self, values, window):
+        if window <= 0:
+            return np.full(np.shape(values), np.nan)
+        return _nb_rolling_mean(self._by_stock(values), window).T
+
+    def up_streak(self, values):
+        return _nb_up_streak(self._by_stock(values)).T
+
+    @staticmethod
+    def _by_stock(values):
+        # (日期, 股票) -> C连续的 (股票, 日期)；输入本身为F连续时只是视图
+        return np.ascontiguousarray(np.asarray(values, dtype=np.float64).T)
+
+
+_BACKENDS = {'pandas': PandasBackend, 'numpy': NumpyBackend, 'numba': NumbaBackend}
+
+
+def available_backends():
+    """
+    当前环境可用的后端名称
+
+    Returns:
+        list: 如 ['pandas', 'numpy', 'numba']
+    """
+    return ['pandas', 'numpy', 'numba'] if NUMBA_AVAILABLE else ['pandas', 'numpy']
+
+
+def get_backend(name='pandas'):
+    """
+    获取计算后端
+
+    Args:
+        name: 'pandas'（默认，与 pandas 逐位一致）、'numpy'、'numba'、
+              'auto'（有 numba 时用 numba，否则 numpy；均线末位可能与 pandas 不同），或后端实例
+
+    Returns:
+        PandasBackend、NumpyBackend 或 NumbaBackend
+    """
+    if not isinstance(name, str):
+        return name
+    if name == 'auto':
+        name = 'numba' if NUMBA_AVAILABLE else 'numpy'
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown factor backend: {name}, expected one of {list(_BACKENDS)}")
+    return _BACKENDS[name]()
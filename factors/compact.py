@@ -0,0 +1,227 @@
+# coding: utf-8
+"""
+日频因子矩阵的紧凑存储
+
+- CompactFrame: 4字节存储的数值宽表，按行读取时还原为 float64
+  - 定点（scale）：存储 round(x*scale) 为 uint32，读取时除以 scale；仅当每个取值的 code/scale
+    与原 float64 逐位相等时才采用，否则退回 float32。适用于取值落在整数刻度上的因子
+    （未复权价格的最高价、涨跌停价，以及能逐位还原的成交量均值）
+  - float32：其余数值因子（均线、复权价格等）使用，取不小于原值的最近 float32，
+    因此策略中 "x > 因子" 形式的比较在恰好相等时仍为 False；但 x 落在 (因子, 还原值] 区间时
+    结果会由 True 变为 False。例如 MA 为 9.809999999999999、价格为 9.81 时，
+    float64 下 9.81 > MA 成立，还原值为 9.81 时不成立
+- PackedBoolFrame: 按股票维度 np.packbits 位压缩的布尔宽表，每个标记只占 1 bit
+
+两者都提供策略用到的 DataFrame 子集接口：index / columns / loc[date] / loc[date, stock]，
+可直接替换 prepare_daily_factors 产出的 DataFrame。
+"""
+import numpy as np
+import pandas as pd
+
+
+FACTOR_PRECISIONS = ('float64', 'float32')
+
+
+class _RowLocator:
+    """支持 frame.loc[date] 与 frame.loc[date, stock]"""
+
+    def __init__(self, frame):
+        self._frame = frame
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row, column = key
+            return self._frame.get_value(row, column)
+        return self._frame.row(key)
+
+
+class CompactFrame:
+    """4字节数值宽表（只读）"""
+
+    # 定点存储时表示NaN的取值
+    NAN_CODE = np.iinfo(np.uint32).max
+
+    def __init__(self, df, scale=None):
+        """
+        初始化
+
+        Args:
+            df: 宽表DataFrame (index=日期, columns=股票代码)
+            scale: 定点存储的倍数，None表示以 float32 存储；
+                还原结果与原值不能逐位相等时同样以 float32 存储
+        """
+        values = df.to_numpy(dtype=np.float64)
+        self.index = df.index
+        self.columns = df.columns
+        self.scale = None
+
+        if scale is not None:
+            codes = self._to_fixed_point(values, scale)
+            if codes is not None:
+                self.values = codes
+                self.scale = scale
+                return
+        self.values = self._to_float32_ceil(values)
+
+    @classmethod
+    def _to_fixed_point(cls, values, scale):
+        nan = np.isnan(values)
+        scaled = np.where(nan, 0.0, values * scale)
+        codes = np.rint(scaled)
+        if codes.min(initial=0) < 0 or codes.max(initial=0) >= cls.NAN_CODE:
+            return None
+        if not np.array_equal(codes[~nan] / scale, values[~nan]):
+            return None
+        codes = codes.astype(np.uint32)
+        codes[nan] = cls.NAN_CODE
+        return codes
+
+    @staticmethod
+    def _to_float32_ceil(values):
+        compact = values.astype(np.float32)
+        below = compact.astype(np.float64) < values
+        compact[below] = np.nextafter(compact[below], np.float32(np.inf))
+        return compact
+
+    @property
+    def loc(self):
+        return _RowLocator(self)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _decode(self, values):
+        if self.scale is not None:
+            decoded = values / self.scale
+            decoded[values == self.NAN_CODE] = np.nan
+            return decoded
+        return values.astype(np.float64)
+
+    def row(self, label):
+        """
+        读取一个交易日的截面
+
+        Args:
+            label: 日期
+
+        Returns:
+            pd.Series: float64，index为股票代码
+        """
+        return pd.Series(self._decode(self.values[self.index.get_loc(label)]), index=self.columns)
+
+    def get_value(self, label, column):
+        i, j = self.index.get_loc(label), self.columns.get_loc(column)
+        return float(self._decode(self.values[i, j:j + 1])[0])
+
+    def to_frame(self):
+        """还原为 float64 DataFrame"""
+        return pd.DataFrame(self._decode(self.values), index=self.index, columns=self.columns)
+
+
+class PackedBoolFrame:
+    """按股票维度位压缩的布尔宽表（只读），NaN 视为 False"""
+
+    def __init__(self, df):
+        """
+        初始化
+
+        Args:
+            df: 布尔宽表DataFrame (index=日期, columns=股票代码)
+        """
+        flags = df.notna().to_numpy() & df.fillna(0).to_numpy(dtype=bool)
+        self.bits = np.packbits(flags, axis=1)
+        self.index = df.index
+        self.columns = df.columns
+
+    @property
+    def loc(self):
+        return _RowLocator(self)
+
+    @property
+    def shape(self):
+        return (len(self.index), len(self.columns))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def row(self, label):
+        """
+        读取一个交易日的截面
+
+        Args:
+            label: 日期
+
+        Returns:
+            pd.Series: bool，index为股票代码
+        """
+        flags = np.unpackbits(self.bits[self.index.get_loc(label)], count=len(self.columns))
+        return pd.Series(flags.astype(bool), index=self.columns)
+
+    def get_value(self, label, column):
+        j = self.columns.get_loc(column)
+        byte = self.bits[self.index.get_loc(label), j >> 3]
+        return bool(byte >> (7 - (j & 7)) & 1)
+
+    def to_frame(self):
+        """还原为布尔 DataFrame"""
+        flags = np.unpackbits(self.bits, axis=1, count=len(self.columns))
+        return pd.DataFrame(flags.astype(bool), index=self.index, columns=self.columns)
+
+
+def compact_values(df, precision, scale=None):
+    """
+    按精度模式压缩数值宽表
+
+    Args:
+        df: 宽表DataFrame
+        precision: 'float64'（原样返回）或 'float32'
+        scale: 定点存储倍数（见 CompactFrame），None表示直接以 float32 存储
+
+    Returns:
+        pd.DataFrame 或 CompactFrame
+    """
+    if df is None or precision == 'float64':
+        return df
+    if precision not in FACTOR_PRECISIONS:
+        raise ValueError(f"Unknown factor precision: {precision}, expected one of {FACTOR_PRECISIONS}")
+    return CompactFrame(df, scale=scale)
+
+
+def compact_flags(df, precision):
+    """
+    按精度模式压缩布尔宽表
+
+    Args:
+        df: 布尔宽表DataFrame
+        precision: 'float64'（原样返回）或 'float32'
+
+    Returns:
+        pd.DataFrame 或 PackedBoolFrame
+    """
+    if df is None or precision == 'float64':
+        return df
+    if precision not in FACTOR_PRECISIONS:
+        raise ValueError(f"Unknown factor precision: {precision}, expected one of {FACTOR_PRECISIONS}")
+    return PackedBoolFrame(df)
+
+
+def factor_nbytes(obj):
+    """
+    因子矩阵占用的字节数（DataFrame / CompactFrame / PackedBoolFrame / 字典）
+
+    Returns:
+        int
+    """
+    if obj is None:
+        return 0
+    if isinstance(obj, dict):
+        return sum(factor_nbytes(v) for v in obj.values())
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=False, deep=False).sum())
+    return int(obj.nbytes)
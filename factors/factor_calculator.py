@@ -2,14 +2,123 @@
 import pandas as pd
 import numpy as np
 from utils.helpers import safe_divide
+from data.market_panel import as_frame
+from data.memory_cache import LRUDataCache, fingerprint_frame
+from .backends import get_backend
+from .parallel import ShardedFactorRunner
+from .kernels import (
+    uptrend_score, minute_score, MINUTE_MA_PERIODS,
+    UPTREND_MA_PERIODS, UPTREND_HIGH_PERIODS, UPTREND_MA_PAIRS, UPTREND_VOLUME_MULTIPLES,
+    MA_BREAK_SHIFT, NEW_HIGH_SHIFT, ARRANGEMENT_SHIFT, VOLUME_SHIFT
+)
+
+
+def _aligned_values(df, like):
+    """按 like 的 index/columns 对齐后取 float64 ndarray（已对齐时不复制）"""
+    if not (df.index.equals(like.index) and df.columns.equals(like.columns)):
+        df = df.reindex(index=like.index, columns=like.columns)
+    return df.to_numpy(dtype=np.float64)
 
 
 class FactorCalculator:
-    """因子计算层，批量计算技术指标和因子"""
+    """
+    因子计算层，批量计算技术指标和因子
+    
+    所有 *_df 参数既可以是宽表DataFrame，也可以直接传入 MarketPanel（按参数语义取对应字段）
+    
+    滚动均值/滚动最大值按 (输入数据指纹, 窗口) 缓存，重复计算同一份数据时直接复用结果；
+    缓存返回的 DataFrame 为共享对象，调用方不应原地修改。
+    
+    滚动计算由 factors.backends 中的后端完成（默认 pandas 后端，结果与 DataFrame.rolling 逐位一致）；
+    n_workers > 1 时按股票列分片交给 factors.parallel 的进程池并行计算。
+    """
+    
+    def __init__(self, cache=None, cache_max_bytes=512 * 1024 ** 2, backend='pandas', n_workers=1):
+        """
+        初始化
+        
+        Args:
+            cache: 共享的 LRUDataCache 实例，None表示新建
+            cache_max_bytes: 新建因子缓存时的字节预算，0表示不缓存
+            backend: 滚动计算后端 'pandas'/'numpy'/'numba'/'auto'，见 factors.backends
+            n_workers: 滚动因子并行计算的进程数，1表示在当前进程计算，None表示CPU核数
+        """
+        self.cache = cache if cache is not None else LRUDataCache(cache_max_bytes)
+        self.backend = get_backend(backend)
+        self.runner = None
+        if n_workers is None or n_workers > 1:
+            self.runner = ShardedFactorRunner(n_workers, backend=self.backend)
     
-    def __init__(self):
-        """初始化"""
-        self.ma_cache = {}
+    def _rolling(self, kind, df, window):
+        """
+        带缓存的滚动计算
+        
+        Args:
+            kind: 'mean' 或 'max'
+            df: 宽表DataFrame
+            window: 窗口长度
+            
+        Returns:
+            pd.DataFrame
+        """
+        return self._rolling_many(kind, df, [window])[window]
+    
+    def _rolling_many(self, kind, df, windows):
+        """
+        带缓存的多窗口滚动计算，未命中缓存的窗口一次性计算（并行模式下共用一次分片调度）
+        
+        Args:
+            kind: 'mean' 或 'max'
+            df: 宽表DataFrame
+            windows: 窗口长度列表
+            
+        Returns:
+            dict: {window: pd.DataFrame}
+        """
+        use_cache = self.cache.max_bytes > 0
+        fingerprint = fingerprint_frame(df) if use_cache else None
+        
+        result = {}
+        missing = []
+        for window in windows:
+            cached = self.cache.get(f"factor|{kind}|w={window}|{fingerprint}") if use_cache else None
+            if cached is None:
+                missing.append(window)
+            else:
+                result[window] = cached
+        
+        if missing:
+            for window, values in self._compute_rolling(kind, df, missing).items():
+                frame = pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+                if use_cache:
+                    self.cache.put(f"factor|{kind}|w={window}|{fingerprint}", frame)
+                result[window] = frame
+        return {window: result[window] for window in windows}
+    
+    def _compute_rolling(self, kind, df, windows):
+        values = df.to_numpy(dtype=np.float64)
+        if self.runner is not None:
+            return self.runner.rolling(kind, values, windows)
+        compute = self.backend.rolling_mean if kind == 'mean' else self.backend.rolling_max
+        return {window: compute(values, window) for window in windows}
+    
+    def close(self):
+        """释放并行计算的进程池"""
+        if self.runner is not None:
+            self.runner.close()
+    
+    def get_cache_info(self):
+        """
+        获取因子缓存统计
+        
+        Returns:
+            dict: {'entries', 'bytes', 'max_bytes', 'hits', 'misses', 'evictions', 'hit_rate'}
+        """
+        return self.cache.stats()
+    
+    def clear_cache(self):
+        """清空因子缓存"""
+        self.cache.evict_kind('factor')
     
     def calc_ma(self, close_df, periods):
         """
@@ -22,10 +131,21 @@ class FactorCalculator:
         Returns:
             dict: {period: ma_df}
         """
-        ma_dict = {}
-        for period in periods:
-            ma_dict[period] = close_df.rolling(window=period, min_periods=period).mean()
-        return ma_dict
+        close_df = as_frame(close_df, 'close')
+        return self._rolling_many('mean', close_df, periods)
+    
+    def calc_rolling_mean(self, df, window):
+        """
+        计算N日滚动均值（如成交量均值）
+        
+        Args:
+            df: 宽表DataFrame
+            window: 窗口长度
+            
+        Returns:
+            pd.DataFrame
+        """
+        return self._rolling('mean', df, window)
     
     def calc_rolling_max(self, high_df, periods):
         """
@@ -38,10 +158,8 @@ class FactorCalculator:
         Returns:
             dict: {period: rolling_max_df}
         """
-        max_dict = {}
-        for period in periods:
-            max_dict[period] = high_df.rolling(window=period, min_periods=period).max()
-        return max_dict
+        high_df = as_frame(high_df, 'high')
+        return self._rolling_many('max', high_df, periods)
     
     def calc_volume_ratio(self, volume_df, window=5):
         """
@@ -54,7 +172,8 @@ class FactorCalculator:
         Returns:
             pd.DataFrame: 量比DataFrame
         """
-        avg_volume = volume_df.rolling(window=window, min_periods=window).mean()
+        volume_df = as_frame(volume_df, 'volume')
+        avg_volume = self._rolling('mean', volume_df, window)
         volume_ratio = safe_divide(volume_df, avg_volume)
         return volume_ratio
     
@@ -69,9 +188,9 @@ class FactorCalculator:
         Returns:
             pd.DataFrame: 布尔DataFrame
         """
-        is_up = (close_df > close_df.shift(1)).astype(int)
-        consecutive_up = is_up.rolling(window=days, min_periods=days).sum() == days
-        return consecutive_up
+        close_df = as_frame(close_df, 'close')
+        streak = self.backend.up_streak(close_df.to_numpy(dtype=np.float64))
+        return pd.DataFrame(streak >= days, index=close_df.index, columns=close_df.columns)
     
     def calc_pct_change(self, close_df, days=3):
         """
@@ -84,6 +203,7 @@ class FactorCalculator:
         Returns:
             pd.DataFrame: 涨跌幅DataFrame (百分比)
         """
+        close_df = as_frame(close_df, 'close')
         return (close_df / close_df.shift(days) - 1) * 100
     
     def check_price_break_ma(self, close_df, ma_dict):
@@ -97,6 +217,7 @@ class FactorCalculator:
         Returns:
             dict: {period: break_df}，布尔DataFrame
         """
+        close_df = as_frame(close_df, 'close')
         break_dict = {}
         for period, ma_df in ma_dict.items():
             break_dict[period] = close_df > ma_df
@@ -114,10 +235,11 @@ class FactorCalculator:
         Returns:
             dict: {period: new_high_df}，布尔DataFrame
         """
+        close_df = as_frame(close_df, 'close')
+        high_df = as_frame(high_df, 'high')
         new_high_dict = {}
-        for period in periods:
-            rolling_max = high_df.shift(1).rolling(window=period, min_periods=period).max()
-            new_high_dict[period] = close_df > rolling_max
+        for period, rolling_max in self._rolling_many('max', high_df, periods).items():
+            new_high_dict[period] = close_df > rolling_max.shift(1)
         return new_high_dict
     
     def check_ma_arrangement(self, ma_dict, pairs):
@@ -148,14 +270,15 @@ class FactorCalculator:
         Returns:
             dict: {multiple: expansion_df}，布尔DataFrame
         """
-        avg_volume_10 = volume_df.rolling(window=10, min_periods=10).mean()
+        volume_df = as_frame(volume_df, 'volume')
+        avg_volume_10 = self._rolling('mean', volume_df, 10)
         expansion_dict = {}
         for multiple in multiples:
             expansion_dict[multiple] = volume_df > (avg_volume_10 * multiple)
         return expansion_dict
     
     def calc_uptrend_score(self, close_df, high_df, volume_df, 
-                          ma_dict, max_dict=None):
+                          ma_dict, max_dict=None, return_detail=False):
         """
         计算上涨趋势确定性得分（0-20分）
         
@@ -165,41 +288,43 @@ class FactorCalculator:
         3. 均线排列：5项，每项1分
         4. 成交量放大（>10日均量3/4/5/6/7倍）：5项，每项1分
         
+        在对齐后的 ndarray 上由 factors.kernels.uptrend_score 一次完成计算
+        
         Args:
             close_df: 收盘价DataFrame
             high_df: 最高价DataFrame
             volume_df: 成交量DataFrame
             ma_dict: 均线字典
-            max_dict: 最高价字典（可选，会自动计算）
+            max_dict: N日最高价字典（可选，即 calc_rolling_max 的结果，未提供时在内核中计算）
+            return_detail: 是否同时返回分项得分
             
         Returns:
-            pd.DataFrame: 得分DataFrame (0-20分)
+            pd.DataFrame: 得分DataFrame (int8, 0-20分)；
+            return_detail=True 时返回 (得分DataFrame, {分项名: DataFrame})，
+            分项名为 'ma_points', 'max_points', 'arrangement_points', 'volume_points'
         """
-        score_df = pd.DataFrame(0, index=close_df.index, columns=close_df.columns)
-        
-        break_ma_dict = self.check_price_break_ma(close_df, ma_dict)
-        for period in [5, 10, 20, 30, 60]:
-            if period in break_ma_dict:
-                score_df += break_ma_dict[period].astype(int)
-        
-        if max_dict is None:
-            max_dict = self.calc_rolling_max(high_df, [20, 40, 60, 80, 100])
-        
-        new_high_dict = self.check_new_high(close_df, high_df, [20, 40, 60, 80, 100])
-        for period in [20, 40, 60, 80, 100]:
-            if period in new_high_dict:
-                score_df += new_high_dict[period].astype(int)
-        
-        ma_pairs = [(5, 10), (10, 20), (20, 30), (30, 60), (60, 120)]
-        arrangement_dict = self.check_ma_arrangement(ma_dict, ma_pairs)
-        for pair, arrangement_df in arrangement_dict.items():
-            score_df += arrangement_df.astype(int)
-        
-        volume_expansion_dict = self.check_volume_expansion(volume_df, [3, 4, 5, 6, 7])
-        for multiple, expansion_df in volume_expansion_dict.items():
-            score_df += expansion_df.astype(int)
-        
-        return score_df
+        close_df = as_frame(close_df, 'close')
+        high_df = as_frame(high_df, 'high')
+        volume_df = as_frame(volume_df, 'volume')
+        
+        result = uptrend_score(
+            _aligned_values(close_df, close_df),
+            _aligned_values(high_df, close_df),
+            _aligned_values(volume_df, close_df),
+            {period: _aligned_values(ma_df, close_df) for period, ma_df in ma_dict.items()},
+            high_max=None if max_dict is None else {
+                period: _aligned_values(max_df, close_df) for period, max_df in max_dict.items()
+            },
+            return_detail=return_detail
+        )
+        
+        def to_frame(values):
+            return pd.DataFrame(values, index=close_df.index, columns=close_df.columns, copy=False)
+        
+        if not return_detail:
+            return to_frame(result)
+        score, detail = result
+        return to_frame(score), {name: to_frame(values) for name, values in detail.items()}
     
     def calc_buy_condition_1(self, close_df, consecutive_days=5, 
                             or_days=3, or_pct_change=6.0):
@@ -215,6 +340,7 @@ class FactorCalculator:
         Returns:
             pd.DataFrame: 布尔DataFrame
         """
+        close_df = as_frame(close_df, 'close')
         cond_consecutive = self.check_consecutive_up_days(close_df, consecutive_days)
         
         pct_change = self.calc_pct_change(close_df, or_days)
@@ -239,6 +365,7 @@ class FactorCalculator:
         Returns:
             pd.DataFrame: 布尔DataFrame
         """
+        amount_df = as_frame(amount_df, 'amount')
         volume_ratio = self.calc_volume_ratio(volume_df, window=5)
         
         cond_volume = volume_ratio > volume_ratio_threshold
@@ -254,12 +381,12 @@ class FactorCalculator:
         量比 = (累计成交量 / 累计分钟数) / 过去5日平均每分钟成交量
         
         Args:
-            cumulative_volume: 当日截至当前分钟的累计成交量（标量或Series）
+            cumulative_volume: 当日截至当前分钟的累计成交量（标量、Series或ndarray）
             minutes_since_open: 累计开市时间（分钟数，标量）
-            daily_avg_vol_per_min: 过去5日平均每分钟成交量（标量或Series）
+            daily_avg_vol_per_min: 过去5日平均每分钟成交量（标量、Series或ndarray）
             
         Returns:
-            float或Series: 量比
+            float、Series或ndarray: 量比
         """
         if minutes_since_open <= 0:
             return 0
@@ -280,8 +407,8 @@ class FactorCalculator:
         开盘后期：量比>late_volume_ratio 且 累计成交额>late_amount
         
         Args:
-            volume_ratio: 量比（标量或Series）
-            cumulative_amount: 累计成交额（标量或Series）
+            volume_ratio: 量比（标量、Series或ndarray）
+            cumulative_amount: 累计成交额（标量、Series或ndarray）
             minutes_since_open: 累计开市时间（分钟数）
             early_minutes: 早期时间阈值（分钟）
             early_volume_ratio: 早期量比阈值
@@ -290,7 +417,7 @@ class FactorCalculator:
             late_amount: 后期成交额阈值
             
         Returns:
-            bool或Series: 是否满足买入条件2
+            bool、Series或ndarray: 是否满足买入条件2
         """
         if minutes_since_open <= early_minutes:
             cond = (volume_ratio > early_volume_ratio) & (cumulative_amount > early_amount)
@@ -319,65 +446,61 @@ class FactorCalculator:
             past_10d_avg_daily_volume: 过去10日平均日成交量（标量或Series）
             
         Returns:
-            tuple: (得分, 得分明细字典)
+            tuple: (得分, 子条件位掩码)
                 - 得分: int或Series（0-20）
-                - 得分明细: {'ma_points': X, 'max_points': Y, 'arrangement_points': Z, 'volume_points': W}
+                - 子条件位掩码: int或Series(uint32)，每项子条件占一位，
+                  位定义及解码见 factors.score_mask
         """
         score = 0
-        ma_points = 0
-        max_points = 0
-        arrangement_points = 0
-        volume_points = 0
+        score_mask = 0
         
-        for period in [5, 10, 20, 30, 60]:
+        def add(cond, bit):
+            nonlocal score, score_mask
+            if isinstance(cond, (bool, np.bool_)):
+                score += int(cond)
+                score_mask |= int(cond) << bit
+            else:
+                score = score + cond.astype(int)
+                score_mask = score_mask | (cond.astype(np.uint32) * np.uint32(1 << bit))
+        
+        for offset, period in enumerate(UPTREND_MA_PERIODS):
             if period in daily_ma_dict:
-                if isinstance(current_price, (int, float)):
-                    points = 1 if current_price > daily_ma_dict[period] else 0
-                    ma_points += points
-                    score += points
-                else:
-                    points = (current_price > daily_ma_dict[period]).astype(int)
-                    ma_points += points
-                    score += points
-        
-        for period in [20, 40, 60, 80, 100]:
+                add(current_price > daily_ma_dict[period], MA_BREAK_SHIFT + offset)
+        
+        for offset, period in enumerate(UPTREND_HIGH_PERIODS):
             if period in daily_rolling_max_dict:
-                if isinstance(current_price, (int, float)):
-                    points = 1 if current_price > daily_rolling_max_dict[period] else 0
-                    max_points += points
-                    score += points
-                else:
-                    points = (current_price > daily_rolling_max_dict[period]).astype(int)
-                    max_points += points
-                    score += points
-        
-        ma_pairs = [(5, 10), (10, 20), (20, 30), (30, 60), (60, 120)]
-        for short, long in ma_pairs:
+                add(current_price > daily_rolling_max_dict[period], NEW_HIGH_SHIFT + offset)
+        
+        for offset, (short, long) in enumerate(UPTREND_MA_PAIRS):
             if short in daily_ma_dict and long in daily_ma_dict:
-                if isinstance(daily_ma_dict[short], (int, float)):
-                    points = 1 if daily_ma_dict[short] > daily_ma_dict[long] else 0
-                    arrangement_points += points
-                    score += points
-                else:
-                    points = (daily_ma_dict[short] > daily_ma_dict[long]).astype(int)
-                    arrangement_points += points
-                    score += points
-        
-        for multiple in [3, 4, 5, 6, 7]:
-            if isinstance(cumulative_volume, (int, float)):
-                points = 1 if cumulative_volume > (past_10d_avg_daily_volume * multiple) else 0
-                volume_points += points
-                score += points
-            else:
-                points = (cumulative_volume > (past_10d_avg_daily_volume * multiple)).astype(int)
-                volume_points += points
-                score += points
-        
-        detail = {
-            'ma_points': ma_points,
-            'max_points': max_points,
-            'arrangement_points': arrangement_points,
-            'volume_points': volume_points
-        }
-        
-        return score, detail
+                add(daily_ma_dict[short] > daily_ma_dict[long], ARRANGEMENT_SHIFT + offset)
+        
+        for offset, multiple in enumerate(UPTREND_VOLUME_MULTIPLES):
+            add(cumulative_volume > (past_10d_avg_daily_volume * multiple), VOLUME_SHIFT + offset)
+        
+        return score, score_mask
+    
+    def calc_minute_score_array(self, current_price, cumulative_volume,
+                                ma_matrix, rolling_max_matrix, past_10d_avg_daily_volume,
+                                ma_periods=MINUTE_MA_PERIODS, max_periods=UPTREND_HIGH_PERIODS):
+        """
+        计算分钟级上涨趋势得分（全市场向量化版本，规则同 calc_minute_score）
+        
+        所有输入按同一股票顺序对齐，一次调用返回全部股票的得分和子条件位掩码
+        
+        Args:
+            current_price: 当前分钟价格 ndarray (股票,)
+            cumulative_volume: 截止前一分钟的累积成交量 ndarray (股票,)
+            ma_matrix: 日线MA矩阵 ndarray (len(ma_periods), 股票)
+            rolling_max_matrix: 日线N日最高价矩阵 ndarray (len(max_periods), 股票)
+            past_10d_avg_daily_volume: 过去10日平均日成交量 ndarray (股票,)
+            ma_periods: ma_matrix 各行对应的周期
+            max_periods: rolling_max_matrix 各行对应的周期
+            
+        Returns:
+            tuple: (得分 ndarray(int8), 子条件位掩码 ndarray(uint32))
+        """
+        return minute_score(
+            current_price, cumulative_volume, ma_matrix, rolling_max_matrix,
+            past_10d_avg_daily_volume, ma_periods=ma_periods, max_periods=max_periods
+        )
@@ -0,0 +1,260 @@
+# coding: utf-8
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+class FactorStore:
+    """
+    预计算因子的磁盘存储（每个因子矩阵一个 .npy 列式文件，按内存映射读取）
+
+    目录结构:
+        {root_dir}/{key}/
+            manifest.json      # {'config', 'data_version', 'created', 'axes', 'factors'(含各因子 dtype)}
+            {factor}.npy       # 单个宽表因子，如 buy_cond1.npy
+            {factor}@{k}.npy   # 字典因子的各项，如 ma_prev@5.npy
+
+    key 由因子配置（周期、阈值、计算后端、因子代码版本等）和数据版本共同哈希得到：任一变化都会落到新的目录，
+    仅修改仓位等组合参数时重跑回测可直接复用。超过 keep 个条目时删除最早的条目。
+    含NaN的布尔因子（object 类型）以 float64 的 1/0/NaN 存储，manifest 中记录原 dtype，
+    读取时还原为 True/False/NaN 的 object 宽表；其余因子按原 dtype 存储。
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    # 存储格式版本，格式变化时递增以使旧条目失效
+    FORMAT_VERSION = 2
+
+    def __init__(self, root_dir, keep=5):
+        """
+        初始化
+
+        Args:
+            root_dir: 存储根目录
+            keep: 保留的条目数
+        """
+        self.root_dir = root_dir
+        self.keep = keep
+
+    @staticmethod
+    def make_key(config, data_version):
+        """
+        计算存储键
+
+        Args:
+            config: 因子配置（可JSON序列化的dict）
+            data_version: 数据版本标识字符串
+
+        Returns:
+            str
+        """
+        payload = json.dumps({'format': FactorStore.FORMAT_VERSION, 'config': config,
+                              'data_version': data_version}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def data_version(frames, labels=None):
+        """
+        计算输入数据的版本标识（全部取值及行列索引的哈希）
+
+        与 fingerprint_frame 的抽样指纹不同，这里遍历全部数据：
+        前复权价格在除权后会整体改写历史，抽样可能漏掉被改写的股票。
+
+        Args:
+            frames: DataFrame 列表（None 会被跳过）
+            labels: 其他影响计算结果的取值（如股票列表），需可JSON序列化
+
+        Returns:
+            str
+        """
+        digest = hashlib.sha1(json.dumps(labels, default=str).encode('utf-8'))
+        for df in frames:
+            if df is None:
+                continue
+            values = np.ascontiguousarray(df.to_numpy())
+            digest.update(repr((values.shape, str(values.dtype))).encode('utf-8'))
+            digest.update(json.dumps([df.index.tolist(), df.columns.tolist()], default=str).encode('utf-8'))
+            digest.update(values.tobytes())
+        return digest.hexdigest()[:20]
+
+    def load(self, key, mmap=True):
+        """
+        读取因子
+
+        Args:
+            key: 存储键
+            mmap: 是否以只读内存映射方式打开（不立即读入内存）
+
+        Returns:
+            dict: {因子名: DataFrame 或 {k: DataFrame}}，不存在时返回None
+        """
+        key_dir = os.path.join(self.root_dir, key)
+        manifest = self._load_manifest(key_dir)
+        if manifest is None:
+            return None
+
+        axes = [(self._decode_index(axis['index']), self._decode_index(axis['columns']))
+                for axis in manifest['axes']]
+        mmap_mode = 'r' if mmap else None
+        factors = {}
+        try:
+            for name, meta in manifest['factors'].items():
+                if meta['type'] == 'dict':
+                    factors[name] = {
+                        item_key: self._read_frame(key_dir, f"{name}@{item_key}", axes[axis_id], dtype, mmap_mode)
+                        for item_key, axis_id, dtype in zip(meta['keys'], meta['axes'], meta['dtypes'])
+                    }
+                else:
+                    factors[name] = self._read_frame(key_dir, name, axes[meta['axis']], meta['dtype'], mmap_mode)
+        except (OSError, ValueError) as e:
+            print(f"Failed to load factor store entry {key}: {e}")
+            return None
+        return factors
+
+    def save(self, key, factors, config=None, data_version=''):
+        """
+        保存因子
+
+        Args:
+            key: 存储键
+            factors: {因子名: DataFrame 或 {k: DataFrame}}，数值宽表或含NaN的布尔（object）宽表
+            config: 因子配置（写入 manifest 便于排查）
+            data_version: 数据版本标识
+        """
+        key_dir = os.path.join(self.root_dir, key)
+        tmp_dir = key_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        axes = []
+
+        def axis_id(df):
+            for i, (index, columns) in enumerate(axes):
+                if index.equals(df.index) and columns.equals(df.columns):
+                    return i
+            axes.append((df.index, df.columns))
+            return len(axes) - 1
+
+        meta = {}
+        for name, value in factors.items():
+            if isinstance(value, dict):
+                keys = list(value.keys())
+                meta[name] = {
+                    'type': 'dict', 'keys': keys, 'axes': [axis_id(value[k]) for k in keys],
+                    'dtypes': [self._write_frame(tmp_dir, f"{name}@{k}", value[k]) for k in keys]
+                }
+            else:
+                meta[name] = {'type': 'frame', 'axis': axis_id(value),
+                              'dtype': self._write_frame(tmp_dir, name, value)}
+
+        manifest = {
+            'config': config,
+            'data_version': data_version,
+            'created': datetime.now().strftime('%Y%m%d %H:%M:%S'),
+            'axes': [{'index': self._encode_index(index), 'columns': self._encode_index(columns)}
+                     for index, columns in axes],
+            'factors': meta
+        }
+        with open(os.path.join(tmp_dir, self.MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, default=str)
+
+        shutil.rmtree(key_dir, ignore_errors=True)
+        os.replace(tmp_dir, key_dir)
+        self._cleanup(exclude=key)
+
+    def invalidate(self, key=None):
+        """
+        删除存储条目
+
+        Args:
+            key: 存储键，None表示全部
+        """
+        if key is not None:
+            shutil.rmtree(os.path.join(self.root_dir, key), ignore_errors=True)
+            return
+        for name in self._entries():
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+
+    def get_store_info(self):
+        """
+        获取存储信息
+
+        Returns:
+            dict: {key: {'created', 'data_version', 'factors'}}
+        """
+        info = {}
+        for name in self._entries():
+            manifest = self._load_manifest(os.path.join(self.root_dir, name))
+            if manifest is not None:
+                info[name] = {
+                    'created': manifest['created'],
+                    'data_version': manifest['data_version'],
+                    'factors': list(manifest['factors'].keys())
+                }
+        return info
+
+    def _entries(self):
+        if not os.path.isdir(self.root_dir):
+            return []
+        return [name for name in os.listdir(self.root_dir)
+                if os.path.isfile(os.path.join(self.root_dir, name, self.MANIFEST_FILE))]
+
+    def _cleanup(self, exclude=None):
+        entries = [name for name in self._entries() if name != exclude]
+        if len(entries) < self.keep:
+            return
+        entries.sort(key=lambda name: os.path.getmtime(os.path.join(self.root_dir, name, self.MANIFEST_FILE)))
+        for name in entries[:len(entries) - self.keep + 1]:
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+
+    def _load_manifest(self, key_dir):
+        path = os.path.join(key_dir, self.MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read factor store manifest {path}: {e}")
+            return None
+        # JSON 的键均为字符串，字典因子的键（如均线周期）按原类型还原
+        for meta in manifest['factors'].values():
+            if meta['type'] == 'dict':
+                meta['keys'] = [int(k) if isinstance(k, str) and k.isdigit() else k for k in meta['keys']]
+        return manifest
+
+    @staticmethod
+    def _encode_index(index):
+        if isinstance(index, pd.DatetimeIndex):
+            return {'datetime': True, 'values': index.strftime('%Y-%m-%d %H:%M:%S').tolist()}
+        return {'datetime': False, 'values': index.tolist()}
+
+    @staticmethod
+    def _decode_index(encoded):
+        if encoded['datetime']:
+            return pd.DatetimeIndex(pd.to_datetime(encoded['values']))
+        return pd.Index(encoded['values'])
+
+    @staticmethod
+    def _write_frame(directory, name, df):
+        """写入单个宽表，返回原 dtype 名（读取时据此还原）"""
+        values = df.to_numpy()
+        dtype = str(values.dtype)
+        if values.dtype == object:
+            values = values.astype(np.float64)
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+        return dtype
+
+    @staticmethod
+    def _read_frame(directory, name, axis, dtype, mmap_mode):
+        values = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        if dtype == 'object':
+            # 1/0/NaN 还原为 True/False/NaN
+            flags = (values != 0).astype(object)
+            flags[np.isnan(values)] = np.nan
+            values = flags
+        index, columns = axis
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)
@@ -0,0 +1,198 @@
+# coding: utf-8
+"""
+声明式因子依赖图
+
+每个节点有名称、依赖列表和计算函数，按需惰性求值并缓存结果：
+只有被请求的节点及其上游节点会被计算，同一节点在图的生命周期内只计算一次。
+"""
+
+
+class FactorNode:
+    """因子节点"""
+
+    def __init__(self, name, deps, func, description=''):
+        """
+        初始化
+
+        Args:
+            name: 节点名称
+            deps: 依赖的节点名称列表，计算时按顺序作为位置参数传给 func
+            func: 计算函数
+            description: 说明
+        """
+        self.name = name
+        self.deps = tuple(deps)
+        self.func = func
+        self.description = description
+
+
+class FactorGraph:
+    """
+    因子依赖图
+
+    Example:
+        graph = FactorGraph()
+        graph.add_input('close', loader=lambda: panel.to_frame('close'))
+        graph.add('ma', ['close'], lambda close: calc.calc_ma(close, [5, 10]))
+        ma = graph.get('ma')
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._values = {}
+
+    def add(self, name, deps, func, description=''):
+        """
+        注册计算节点（同名节点会被替换，并清除其及下游的缓存结果）
+
+        Args:
+            name: 节点名称
+            deps: 依赖的节点名称列表
+            func: 计算函数 func(*依赖节点取值)
+            description: 说明
+
+        Returns:
+            FactorNode
+        """
+        if name in self._nodes:
+            self.invalidate(name)
+        node = FactorNode(name, deps, func, description)
+        self._nodes[name] = node
+        return node
+
+    def add_input(self, name, value=None, loader=None, description=''):
+        """
+        注册输入节点
+
+        Args:
+            name: 节点名称
+            value: 输入值（已就绪的数据）
+            loader: 无参加载函数，首次被依赖时才调用（value 为None时使用）
+            description: 说明
+        """
+        if value is None and loader is not None:
+            self.add(name, [], loader, description)
+        else:
+            self.add(name, [], lambda: value, description)
+
+    def node(self, name, deps=(), description=''):
+        """
+        装饰器形式注册节点
+
+        Example:
+            @graph.node('ma', ['close'])
+            def ma(close):
+                ...
+        """
+        def decorator(func):
+            self.add(name, deps, func, description)
+            return func
+        return decorator
+
+    def get(self, name):
+        """
+        获取节点取值（未计算时连同上游节点一起计算）
+
+        Args:
+            name: 节点名称
+
+        Returns:
+            节点取值
+        """
+        if name in self._values:
+            return self._values[name]
+        for node_name in self.resolve([name]):
+            if node_name not in self._values:
+                node = self._nodes[node_name]
+                self._values[node_name] = node.func(*(self._values[dep] for dep in node.deps))
+        return self._values[name]
+
+    def require(self, names):
+        """
+        批量获取节点取值
+
+        Args:
+            names: 节点名称列表
+
+        Returns:
+            dict: {name: 取值}
+        """
+        return {name: self.get(name) for name in names}
+
+    def resolve(self, names):
+        """
+        计算 names 所需的全部节点（含自身），按拓扑顺序排列
+
+        Args:
+            names: 节点名称列表
+
+        Returns:
+            list: 节点名称
+        """
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self._nodes:
+                raise KeyError(f"Unknown factor node: {name}" + (f" (required by {path[-1]})" if path else ''))
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Factor graph cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self._nodes[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in names:
+            visit(name, [])
+        return order
+
+    def invalidate(self, name=None):
+        """
+        清除缓存结果
+
+        Args:
+            name: 节点名称，其下游节点一并清除；None表示清除全部
+        """
+        if name is None:
+            self._values.clear()
+            return
+        stale = {name}
+        changed = True
+        while changed:
+            changed = False
+            for node in self._nodes.values():
+                if node.name not in stale and stale.intersection(node.deps):
+                    stale.add(node.name)
+                    changed = True
+        for node_name in stale:
+            self._values.pop(node_name, None)
+
+    def release(self, keep=()):
+        """
+        释放已缓存的结果以节省内存（不影响节点定义，之后再次请求时重新计算）
+
+        Args:
+            keep: 保留结果的节点名称
+        """
+        keep = set(keep)
+        for name in list(self._values):
+            if name not in keep:
+                del self._values[name]
+
+    def is_computed(self, name):
+        return name in self._values
+
+    @property
+    def computed(self):
+        """已计算的节点名称（按计算顺序）"""
+        return list(self._values.keys())
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    @property
+    def names(self):
+        return list(self._nodes.keys())
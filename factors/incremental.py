@@ -0,0 +1,272 @@
+# coding: utf-8
+import pandas as pd
+import numpy as np
+from data.market_panel import MarketPanel
+
+
+class RollingMean:
+    """
+    N日滚动均值（按股票向量化），与 pandas rolling(N, min_periods=N).mean() 逐位一致
+
+    按 pandas roll_mean 的顺序维护状态：每日先移出窗口外的旧值、再加入新值，
+    加入和移出各自使用 Kahan 补偿求和；连续相同取值、全正/全负时的修正也与 pandas 相同。
+    因此结果等于对“引擎开始以来的全部历史”做 pandas rolling 的最后一行。
+    """
+
+    def __init__(self, window, n_stocks):
+        """
+        初始化
+
+        Args:
+            window: 窗口长度
+            n_stocks: 股票数
+        """
+        self.window = window
+        self.sum = np.zeros(n_stocks)
+        self.comp_add = np.zeros(n_stocks)
+        self.comp_remove = np.zeros(n_stocks)
+        self.nobs = np.zeros(n_stocks, dtype=np.int64)
+        self.neg_count = np.zeros(n_stocks, dtype=np.int64)
+        self.same_count = np.zeros(n_stocks, dtype=np.int64)
+        self.prev_value = np.full(n_stocks, np.nan)
+
+    def update(self, new, old=None):
+        """
+        移出窗口外的旧值、加入新值
+
+        Args:
+            new: 当日取值 shape=(股票数,)
+            old: 移出窗口的取值，窗口未满时为None
+        """
+        if old is not None:
+            valid = ~np.isnan(old)
+            y = np.where(valid, -old - self.comp_remove, 0.0)
+            t = self.sum + y
+            self.comp_remove = np.where(valid, (t - self.sum) - y, self.comp_remove)
+            self.sum = np.where(valid, t, self.sum)
+            self.nobs -= valid
+            self.neg_count -= valid & np.signbit(old)
+
+        valid = ~np.isnan(new)
+        y = np.where(valid, new - self.comp_add, 0.0)
+        t = self.sum + y
+        self.comp_add = np.where(valid, (t - self.sum) - y, self.comp_add)
+        self.sum = np.where(valid, t, self.sum)
+        self.nobs += valid
+        self.neg_count += valid & np.signbit(new)
+        self.same_count = np.where(valid, np.where(new == self.prev_value, self.same_count + 1, 1),
+                                   self.same_count)
+        self.prev_value = np.where(valid, new, self.prev_value)
+
+    def mean(self):
+        nobs = self.nobs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = self.sum / nobs
+        out = np.where(self.same_count >= nobs, self.prev_value, out)
+        out[(self.neg_count == 0) & (self.same_count < nobs) & (out < 0)] = 0.0
+        out[(self.neg_count == nobs) & (self.same_count < nobs) & (out > 0)] = 0.0
+        out[(nobs < self.window) | (nobs == 0)] = np.nan
+        return out
+
+
+class RollingMax:
+    """
+    N日滚动最大值：每只股票一个单调递减队列，以 (N, 股票数) 环形数组向量化实现
+
+    队首即窗口最大值；新值入队前从队尾弹出所有不大于它的元素，
+    每个元素最多入队、出队各一次，单日更新均摊 O(股票数)。
+    """
+
+    def __init__(self, window, n_stocks):
+        self.window = window
+        self.values = np.full((window, n_stocks), np.nan)
+        self.steps = np.zeros((window, n_stocks), dtype=np.int64)
+        self.head = np.zeros(n_stocks, dtype=np.int64)
+        self.size = np.zeros(n_stocks, dtype=np.int64)
+        self.nan_count = np.zeros(n_stocks, dtype=np.int64)
+        self._cols = np.arange(n_stocks)
+        self.count = 0
+
+    def update(self, new, old=None):
+        """
+        Args:
+            new: 当日取值 shape=(股票数,)
+            old: 移出窗口的取值，窗口未满时为None（仅用于NaN计数）
+        """
+        step = self.count
+        cols = self._cols
+
+        # 队首元素滑出窗口（每日最多一个）
+        expired = (self.size > 0) & (self.steps[self.head, cols] <= step - self.window)
+        self.head[expired] = (self.head[expired] + 1) % self.window
+        self.size[expired] -= 1
+
+        # 从队尾弹出不大于新值的元素
+        valid = ~np.isnan(new)
+        while True:
+            tail = (self.head + self.size - 1) % self.window
+            pop = valid & (self.size > 0) & (self.values[tail, cols] <= new)
+            if not pop.any():
+                break
+            self.size[pop] -= 1
+
+        pos = (self.head + self.size) % self.window
+        self.values[pos[valid], cols[valid]] = new[valid]
+        self.steps[pos[valid], cols[valid]] = step
+        self.size[valid] += 1
+
+        self.nan_count += ~valid
+        if old is not None:
+            self.nan_count -= np.isnan(old)
+        self.count += 1
+
+    def max(self):
+        out = self.values[self.head, self._cols].copy()
+        out[(self.size == 0) | (self.nan_count > 0) | (self.count < self.window)] = np.nan
+        return out
+
+
+class IncrementalFactorEngine:
+    """
+    增量日频因子引擎
+
+    维护均线的补偿求和状态、N日最高价的单调队列和连续上涨天数计数器，
+    每追加一个交易日的 (收盘价, 最高价, 成交量) 只做 O(股票数) 的更新，
+    无需对整段历史重跑 pandas rolling。
+
+    引擎状态对应"截至最近一次 update 的交易日"的因子取值，与 FactorCalculator
+    （pandas 后端）对引擎回放过的全部交易日做全量计算结果的最后一行逐位一致；
+    策略中使用 shift(1) 的因子即为盘前引擎的当前取值。
+    """
+
+    def __init__(self, stocks, ma_periods=(5, 10, 20, 30, 60, 120),
+                 max_periods=(20, 40, 60, 80, 100), volume_windows=(5, 10),
+                 pct_change_days=(3,)):
+        """
+        初始化
+
+        Args:
+            stocks: 股票代码序列（列顺序）
+            ma_periods: 收盘价均线周期
+            max_periods: 最高价滚动最大值周期
+            volume_windows: 成交量均值窗口
+            pct_change_days: 需要计算N日涨跌幅的天数
+        """
+        self.stocks = pd.Index(stocks)
+        n = len(self.stocks)
+
+        self.ma_periods = list(ma_periods)
+        self.max_periods = list(max_periods)
+        self.volume_windows = list(volume_windows)
+        self.pct_change_days = list(pct_change_days)
+
+        self.capacity = max(self.ma_periods + self.max_periods + self.volume_windows
+                            + [d + 1 for d in self.pct_change_days]) + 1
+        self._close = np.full((self.capacity, n), np.nan)
+        self._high = np.full((self.capacity, n), np.nan)
+        self._volume = np.full((self.capacity, n), np.nan)
+
+        self._ma = {p: RollingMean(p, n) for p in self.ma_periods}
+        self._volume_mean = {w: RollingMean(w, n) for w in self.volume_windows}
+        self._max = {p: RollingMax(p, n) for p in self.max_periods}
+        self.up_streak = np.zeros(n, dtype=np.int64)
+
+        self.count = 0
+        self.last_date = None
+
+    @classmethod
+    def from_history(cls, close_df, high_df=None, volume_df=None, **kwargs):
+        """
+        用历史数据预热引擎（回放全部交易日，均线与对同一段历史做 pandas rolling 逐位一致）
+
+        Args:
+            close_df: 收盘价DataFrame或 MarketPanel
+            high_df: 最高价DataFrame（close_df 为 MarketPanel 时可省略）
+            volume_df: 成交量DataFrame（close_df 为 MarketPanel 时可省略）
+            **kwargs: 传给构造函数的周期参数
+
+        Returns:
+            IncrementalFactorEngine
+        """
+        if isinstance(close_df, MarketPanel):
+            panel = close_df
+            close, high, volume = panel.field('close'), panel.field('high'), panel.field('volume')
+            dates, stocks = panel.dates, panel.stocks
+        else:
+            close = close_df.to_numpy(dtype=np.float64)
+            high = high_df.reindex_like(close_df).to_numpy(dtype=np.float64)
+            volume = volume_df.reindex_like(close_df).to_numpy(dtype=np.float64)
+            dates, stocks = close_df.index, close_df.columns
+
+        engine = cls(stocks, **kwargs)
+        for i in range(len(dates)):
+            engine.update(dates[i], close[i], high[i], volume[i])
+        return engine
+
+    def update(self, date, close, high, volume):
+        """
+        追加一个交易日
+
+        Args:
+            date: 交易日
+            close: 收盘价 shape=(股票数,)
+            high: 最高价 shape=(股票数,)
+            volume: 成交量 shape=(股票数,)
+        """
+        close = np.asarray(close, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+
+        prev_close = self._row(self._close, 1)
+        pos = self.count % self.capacity
+        self._close[pos] = close
+        self._high[pos] = high
+        self._volume[pos] = volume
+        self.count += 1
+
+        for p, rolling in self._ma.items():
+            rolling.update(close, self._row(self._close, p + 1))
+        for w, rolling in self._volume_mean.items():
+            rolling.update(volume, self._row(self._volume, w + 1))
+        for p, rolling in self._max.items():
+            rolling.update(high, self._row(self._high, p + 1))
+
+        # NaN参与比较结果为False，与 (close > close.shift(1)) 一致
+        is_up = close > prev_close if prev_close is not None else np.zeros(len(close), dtype=bool)
+        self.up_streak = np.where(is_up, self.up_streak + 1, 0)
+
+        self.last_date = date
+
+    def ma(self, period):
+        """当前 N 日均线 shape=(股票数,)"""
+        return self._ma[period].mean()
+
+    def rolling_max(self, period):
+        """当前 N 日最高价 shape=(股票数,)"""
+        return self._max[period].max()
+
+    def volume_mean(self, window):
+        """当前 N 日平均成交量 shape=(股票数,)"""
+        return self._volume_mean[window].mean()
+
+    def consecutive_up(self, days):
+        """近 N 日是否连续上涨 shape=(股票数,)"""
+        return self.up_streak >= days
+
+    def pct_change(self, days):
+        """N 日涨跌幅（百分比） shape=(股票数,)"""
+        base = self._row(self._close, days + 1)
+        if base is None:
+            return np.full(len(self.stocks), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self._row(self._close, 1) / base - 1) * 100
+
+    def buy_condition_1(self, consecutive_days=5, or_days=3, or_pct_change=6.0):
+        """买入条件1：近N日连续上涨 或 近M日累计涨幅超过阈值"""
+        return self.consecutive_up(consecutive_days) | (self.pct_change(or_days) > or_pct_change)
+
+    def _row(self, buffer, lag):
+        """lag=1 为最近一日，超出已有数据时返回None"""
+        if lag > self.count or lag > self.capacity:
+            return None
+        return buffer[(self.count - lag) % self.capacity]
@@ -0,0 +1,216 @@
+# coding: utf-8
+"""
+基于 numpy 的因子计算内核
+
+输入输出均为按 (日期×股票) 排列的二维 ndarray，不做索引对齐；
+NaN 语义与 pandas rolling(window, min_periods=window) 一致。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+UPTREND_MA_PERIODS = (5, 10, 20, 30, 60)
+UPTREND_HIGH_PERIODS = (20, 40, 60, 80, 100)
+UPTREND_MA_PAIRS = ((5, 10), (10, 20), (20, 30), (30, 60), (60, 120))
+UPTREND_VOLUME_MULTIPLES = (3, 4, 5, 6, 7)
+UPTREND_VOLUME_WINDOW = 10
+
+UPTREND_COMPONENTS = ('ma_points', 'max_points', 'arrangement_points', 'volume_points')
+
+# 分钟级评分使用的日线均线周期（含仅用于均线排列的120日）
+MINUTE_MA_PERIODS = (5, 10, 20, 30, 60, 120)
+
+# 子条件位掩码中各类条件的起始位，见 factors.score_mask
+MA_BREAK_SHIFT = 0
+NEW_HIGH_SHIFT = 5
+ARRANGEMENT_SHIFT = 10
+VOLUME_SHIFT = 15
+
+
+def rolling_max(values, window):
+    """
+    N日滚动最大值，窗口内含NaN时结果为NaN，前 window-1 行为NaN
+
+    Args:
+        values: (日期, 股票) 浮点数组
+        window: 窗口长度
+
+    Returns:
+        np.ndarray
+    """
+    return rolling_max_multi(values, [window])[window]
+
+
+def rolling_max_multi(values, windows):
+    """
+    多个窗口的滚动最大值（倍增表，O(日期×股票×log窗口)）
+
+    先构建 2^k 日窗口最大值表，每个窗口按二进制拆分后由若干张表平移取最大值拼成，
+    多个窗口共享同一张倍增表。np.maximum 遇到NaN结果为NaN，窗口内任一NaN都会传播到结果。
+
+    Args:
+        values: (日期, 股票) 浮点数组
+        windows: 窗口长度列表
+
+    Returns:
+        dict: {window: np.ndarray}
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+
+    # table[k]: 以 t 结尾、长度 2^k 的窗口最大值
+    table = [values]
+    max_window = max(windows) if windows else 0
+    while (1 << len(table)) <= max_window:
+        prev, span = table[-1], 1 << (len(table) - 1)
+        cur = np.full(values.shape, np.nan)
+        if n > span:
+            np.maximum(prev[span:], prev[:-span], out=cur[span:])
+        table.append(cur)
+
+    result = {}
+    for window in windows:
+        if window <= 0 or n < window:
+            result[window] = np.full(values.shape, np.nan)
+            continue
+        out = None
+        covered = 0
+        for k in range(len(table)):
+            if not window & (1 << k):
+                continue
+            if out is None:
+                out = table[k].copy()
+            elif covered < n:
+                # 已覆盖 [t-covered+1, t]，再拼接以 t-covered 结尾的 2^k 日窗口
+                merged = np.full(values.shape, np.nan)
+                np.maximum(out[covered:], table[k][:-covered], out=merged[covered:])
+                out = merged
+            covered += 1 << k
+        result[window] = out
+    return result
+
+
+def rolling_sum(values, window):
+    """
+    N日滚动求和（逐窗口直接求和，避免累积和的浮点误差）
+
+    Args:
+        values: (日期, 股票) 浮点数组
+        window: 窗口长度
+
+    Returns:
+        np.ndarray
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if window <= 0 or values.shape[0] < window:
+        return out
+    out[window - 1:] = sliding_window_view(values, window, axis=0).sum(axis=-1)
+    return out
+
+
+def rolling_mean(values, window):
+    """N日滚动均值，语义同 rolling_sum"""
+    return rolling_sum(values, window) / window
+
+
+def uptrend_score(close, high, volume, ma, high_max=None, return_detail=False):
+    """
+    上涨趋势确定性得分内核（0-20分）
+
+    一次遍历完成四类共20项子条件的比较和累加，中间结果全部为 ndarray。
+
+    Args:
+        close: 收盘价 (日期, 股票)
+        high: 最高价 (日期, 股票)
+        volume: 成交量 (日期, 股票)
+        ma: 均线字典 {period: (日期, 股票)}，缺失的周期对应子条件不计分
+        high_max: 最高价N日滚动最大值 {period: (日期, 股票)}（未平移），None表示在内核中计算
+        return_detail: 是否返回分项得分
+
+    Returns:
+        np.ndarray(int8)，或 (score, {component: np.ndarray(int8)})
+    """
+    close = np.asarray(close, dtype=np.float64)
+    shape = close.shape
+    ma_points = np.zeros(shape, dtype=np.int8)
+    max_points = np.zeros(shape, dtype=np.int8)
+    arrangement_points = np.zeros(shape, dtype=np.int8)
+    volume_points = np.zeros(shape, dtype=np.int8)
+
+    for period in UPTREND_MA_PERIODS:
+        if period in ma:
+            ma_points += close > ma[period]
+
+    high_max = dict(high_max or {})
+    missing = [p for p in UPTREND_HIGH_PERIODS if p not in high_max]
+    if missing:
+        high_max.update(rolling_max_multi(high, missing))
+    for period in UPTREND_HIGH_PERIODS:
+        # 创新高：收盘价高于截至前一日的N日最高价
+        max_points[1:] += close[1:] > high_max[period][:-1]
+
+    for short, long in UPTREND_MA_PAIRS:
+        if short in ma and long in ma:
+            arrangement_points += ma[short] > ma[long]
+
+    volume = np.asarray(volume, dtype=np.float64)
+    avg_volume = rolling_mean(volume, UPTREND_VOLUME_WINDOW)
+    for multiple in UPTREND_VOLUME_MULTIPLES:
+        volume_points += volume > avg_volume * multiple
+
+    score = ma_points + max_points + arrangement_points + volume_points
+    if not return_detail:
+        return score
+    return score, dict(zip(
+        UPTREND_COMPONENTS, (ma_points, max_points, arrangement_points, volume_points)
+    ))
+
+
+def minute_score(price, cum_volume, ma, high_max, avg_volume_10d,
+                 ma_periods=MINUTE_MA_PERIODS, max_periods=UPTREND_HIGH_PERIODS):
+    """
+    分钟级上涨趋势得分内核（全市场一次计算）
+
+    Args:
+        price: 当前价格 (股票,)
+        cum_volume: 截止前一分钟的累积成交量 (股票,)
+        ma: 日线均线矩阵 (len(ma_periods), 股票)
+        high_max: 日线N日最高价矩阵 (len(max_periods), 股票)
+        avg_volume_10d: 过去10日平均日成交量 (股票,)
+        ma_periods: ma 各行对应的均线周期
+        max_periods: high_max 各行对应的周期
+
+    Returns:
+        tuple: (score: np.ndarray(int8), score_mask: np.ndarray(uint32))
+        NaN 参与的比较均视为不满足。
+    """
+    price = np.asarray(price, dtype=np.float64)
+    cum_volume = np.asarray(cum_volume, dtype=np.float64)
+    avg_volume_10d = np.asarray(avg_volume_10d, dtype=np.float64)
+    ma_rows = {period: i for i, period in enumerate(ma_periods)}
+    max_rows = {period: i for i, period in enumerate(max_periods)}
+
+    score = np.zeros(price.shape, dtype=np.int8)
+    score_mask = np.zeros(price.shape, dtype=np.uint32)
+
+    def add(cond, bit):
+        score[...] += cond
+        score_mask[...] |= cond.astype(np.uint32) << np.uint32(bit)
+
+    for offset, period in enumerate(UPTREND_MA_PERIODS):
+        if period in ma_rows:
+            add(price > ma[ma_rows[period]], MA_BREAK_SHIFT + offset)
+
+    for offset, period in enumerate(UPTREND_HIGH_PERIODS):
+        if period in max_rows:
+            add(price > high_max[max_rows[period]], NEW_HIGH_SHIFT + offset)
+
+    for offset, (short, long) in enumerate(UPTREND_MA_PAIRS):
+        if short in ma_rows and long in ma_rows:
+            add(ma[ma_rows[short]] > ma[ma_rows[long]], ARRANGEMENT_SHIFT + offset)
+
+    for offset, multiple in enumerate(UPTREND_VOLUME_MULTIPLES):
+        add(cum_volume > avg_volume_10d * multiple, VOLUME_SHIFT + offset)
+
+    return score, score_mask
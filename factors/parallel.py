@@ -0,0 +1,165 @@
+# coding: utf-8
+"""
+按股票列分片的多进程因子计算
+
+日频因子只依赖各股票自身的时间序列，因此可以把 (日期×股票) 矩阵按列切成若干片，
+交给进程池并行计算：
+- 输入矩阵和结果矩阵都放在 multiprocessing.shared_memory 中，
+  子进程按名称挂载后直接读写各自的列区间，任务参数只包含名称、形状和列范围，不序列化数据
+- 结果矩阵由父进程一次性复制出共享内存后释放
+- 进程池统一以 spawn 方式启动（与 Windows 一致），避免 fork 继承 numba/BLAS 线程池导致死锁
+"""
+import os
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .backends import get_backend
+
+try:
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+
+
+def _run_shard(task):
+    """
+    子进程任务：计算一个列区间的全部窗口
+
+    Args:
+        task: (kind, backend_name, input_name, shape, outputs, col_start, col_stop)
+              outputs 为 [(window, output_name), ...]
+    """
+    kind, backend_name, input_name, shape, outputs, col_start, col_stop = task
+    backend = get_backend(backend_name)
+
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=input_shm.buf)[:, col_start:col_stop]
+        for window, output_name in outputs:
+            output_shm = shared_memory.SharedMemory(name=output_name)
+            try:
+                out = np.ndarray(shape, dtype=np.float64, buffer=output_shm.buf)
+                if kind == 'mean':
+                    out[:, col_start:col_stop] = backend.rolling_mean(values, window)
+                else:
+                    out[:, col_start:col_stop] = backend.rolling_max(values, window)
+                del out
+            finally:
+                output_shm.close()
+        del values
+    finally:
+        input_shm.close()
+    return col_stop - col_start
+
+
+class ShardedFactorRunner:
+    """
+    多进程滚动因子计算器
+
+    进程池在首次使用时创建并复用，用完调用 close()（或使用 with 语句）。
+    子进程以 spawn 方式启动，调用方脚本需要 if __name__ == '__main__' 保护。
+    """
+
+    def __init__(self, n_workers=None, backend='pandas', min_columns_per_shard=256):
+        """
+        初始化
+
+        Args:
+            n_workers: 进程数，None表示CPU核数
+            backend: 子进程中使用的计算后端名称（'pandas' / 'numpy' / 'numba'）
+            min_columns_per_shard: 每片最少股票数，股票数较少时减少分片以摊薄调度开销
+        """
+        self.n_workers = max(1, n_workers or os.cpu_count() or 1)
+        self.backend = backend if isinstance(backend, str) else backend.name
+        self.min_columns_per_shard = max(1, min_columns_per_shard)
+        self._executor = None
+        self._broken = False
+
+    @property
+    def available(self):
+        return SHARED_MEMORY_AVAILABLE and self.n_workers > 1 and not self._broken
+
+    def shards(self, n_columns):
+        """
+        列区间划分
+
+        Returns:
+            list: [(col_start, col_stop), ...]
+        """
+        n_shards = min(self.n_workers, max(1, n_columns // self.min_columns_per_shard))
+        bounds = np.linspace(0, n_columns, n_shards + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def rolling(self, kind, values, windows):
+        """
+        并行计算多个窗口的滚动均值/最大值
+
+        Args:
+            kind: 'mean' 或 'max'
+            values: (日期, 股票) 数组
+            windows: 窗口长度列表
+
+        Returns:
+            dict: {window: np.ndarray}
+        """
+        values = np.asarray(values, dtype=np.float64)
+        windows = list(dict.fromkeys(windows))
+        shards = self.shards(values.shape[1])
+        if not self.available or len(shards) <= 1 or values.size == 0:
+            return self._rolling_serial(kind, values, windows)
+
+        input_shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        output_shms = {}
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=input_shm.buf)[:] = values
+            for window in windows:
+                output_shms[window] = shared_memory.SharedMemory(create=True, size=values.nbytes)
+            outputs = [(window, shm.name) for window, shm in output_shms.items()]
+
+            tasks = [
+                (kind, self.backend, input_shm.name, values.shape, outputs, start, stop)
+                for start, stop in shards
+            ]
+            try:
+                list(self._get_executor().map(_run_shard, tasks))
+            except (BrokenProcessPool, OSError) as e:
+                # 嵌入式解释器等环境无法启动子进程时退回单进程计算
+                print(f"Parallel factor computation unavailable ({e}), falling back to a single process")
+                self._broken = True
+                self.close()
+                return self._rolling_serial(kind, values, windows)
+
+            return {
+                window: np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf).copy()
+                for window, shm in output_shms.items()
+            }
+        finally:
+            for shm in [input_shm] + list(output_shms.values()):
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _rolling_serial(self, kind, values, windows):
+        backend = get_backend(self.backend)
+        compute = backend.rolling_mean if kind == 'mean' else backend.rolling_max
+        return {window: compute(values, window) for window in windows}
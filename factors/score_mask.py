@@ -0,0 +1,96 @@
+# coding: utf-8
+"""
+评分子条件位掩码
+
+上涨趋势评分的20项子条件各占 uint32 的一位，得分即置位数：
+    bit 0-4   价格突破 MA5/10/20/30/60
+    bit 5-9   创 20/40/60/80/100 日新高
+    bit 10-14 均线排列 5>10, 10>20, 20>30, 30>60, 60>120
+    bit 15-19 成交量放大 3/4/5/6/7 倍
+"""
+import numpy as np
+from .kernels import (
+    UPTREND_MA_PERIODS, UPTREND_HIGH_PERIODS, UPTREND_MA_PAIRS,
+    UPTREND_VOLUME_MULTIPLES, UPTREND_COMPONENTS,
+    MA_BREAK_SHIFT, NEW_HIGH_SHIFT, ARRANGEMENT_SHIFT, VOLUME_SHIFT
+)
+
+
+SCORE_BIT_NAMES = (
+    [f'MA{p}' for p in UPTREND_MA_PERIODS]
+    + [f'MAX{p}' for p in UPTREND_HIGH_PERIODS]
+    + [f'MA{s}>MA{l}' for s, l in UPTREND_MA_PAIRS]
+    + [f'VOL{m}x' for m in UPTREND_VOLUME_MULTIPLES]
+)
+
+COMPONENT_MASKS = {
+    'ma_points': 0x1F << MA_BREAK_SHIFT,
+    'max_points': 0x1F << NEW_HIGH_SHIFT,
+    'arrangement_points': 0x1F << ARRANGEMENT_SHIFT,
+    'volume_points': 0x1F << VOLUME_SHIFT,
+}
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(mask):
+    """
+    统计置位数（即得分）
+
+    Args:
+        mask: int 或 uint32 ndarray
+
+    Returns:
+        int 或 np.ndarray(int8)
+    """
+    if isinstance(mask, (int, np.integer)):
+        return bin(int(mask)).count('1')
+    mask = np.asarray(mask, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(mask).astype(np.int8)
+    counts = _POPCOUNT_TABLE[mask.view(np.uint8)].reshape(mask.shape + (4,))
+    return counts.sum(axis=-1, dtype=np.int8)
+
+
+def component_points(mask, component):
+    """
+    某一类子条件的得分
+
+    Args:
+        mask: int 或 uint32 ndarray
+        component: 'ma_points', 'max_points', 'arrangement_points', 'volume_points'
+
+    Returns:
+        int 或 np.ndarray(int8)
+    """
+    if isinstance(mask, (int, np.integer)):
+        return popcount(int(mask) & COMPONENT_MASKS[component])
+    return popcount(np.asarray(mask, dtype=np.uint32) & np.uint32(COMPONENT_MASKS[component]))
+
+
+def decode_score_mask(mask):
+    """
+    解码为分项得分字典（与旧版评分明细格式一致）
+
+    Args:
+        mask: int
+
+    Returns:
+        dict: {'ma_points': X, 'max_points': Y, 'arrangement_points': Z, 'volume_points': W}
+    """
+    return {component: component_points(mask, component) for component in UPTREND_COMPONENTS}
+
+
+def describe_score_mask(mask):
+    """
+    列出满足的子条件名称
+
+    Args:
+        mask: int
+
+    Returns:
+        list: 如 ['MA5', 'MA10', 'MAX20', 'VOL3x']
+    """
+    mask = int(mask)
+    return [name for bit, name in enumerate(SCORE_BIT_NAMES) if mask >> bit & 1]
+
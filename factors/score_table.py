@@ -0,0 +1,193 @@
+# coding: utf-8
+"""
+分钟级评分的阈值表
+
+一个交易日内，分钟级评分的日线输入（均线、N日最高价、10日平均成交量）都是常数，
+得分只是当前价格和累计成交量的阶梯函数：
+- 价格项：价格高于多少个价格断点（5条均线、5个N日最高价）
+- 成交量项：累计成交量高于多少个成交量断点（10日平均成交量的3~7倍）
+- 均线排列项：与分钟数据无关的常数
+
+开盘时按股票把两组断点各自排序，并预先算好“超过前 k 个断点”对应的子条件位掩码；
+盘中每分钟只需对两张表各做一次逐行二分查找，得分和位掩码与 minute_score 完全一致。
+"""
+import numpy as np
+from .kernels import (
+    UPTREND_MA_PERIODS, UPTREND_HIGH_PERIODS, UPTREND_MA_PAIRS, UPTREND_VOLUME_MULTIPLES,
+    MINUTE_MA_PERIODS, MA_BREAK_SHIFT, NEW_HIGH_SHIFT, ARRANGEMENT_SHIFT, VOLUME_SHIFT
+)
+
+
+class _BreakpointTable:
+    """
+    逐行有序的断点表
+
+    每行断点升序排列（NaN 视为 +inf，永远不会被超过），宽度补齐到2的幂以便无分支二分查找；
+    cum_mask[i, k] 为第 i 行超过前 k 个断点时置位的子条件位。
+    """
+
+    def __init__(self, values, bits):
+        """
+        Args:
+            values: (断点, 股票) 矩阵
+            bits: 各断点对应的子条件位序号
+        """
+        n_points, n_stocks = values.shape
+        width = 1
+        while width < n_points:
+            width *= 2
+
+        table = np.full((n_stocks, width), np.inf)
+        table[:, :n_points] = np.where(np.isnan(values), np.inf, values).T
+        order = np.argsort(table, axis=1, kind='stable')
+        self.table = np.ascontiguousarray(np.take_along_axis(table, order, axis=1))
+
+        bit_values = np.zeros(width, dtype=np.uint32)
+        bit_values[:n_points] = [np.uint32(1) << np.uint32(bit) for bit in bits]
+        cum_mask = np.zeros((n_stocks, width + 1), dtype=np.uint32)
+        cum_mask[:, 1:] = np.bitwise_or.accumulate(bit_values[order], axis=1)
+        self.cum_mask = cum_mask
+        self.n_finite = np.isfinite(self.table).sum(axis=1).astype(np.int8)
+
+    def count_below(self, idx, values):
+        """
+        逐行二分查找：第 idx[j] 行中严格小于 values[j] 的断点个数（NaN 返回0）
+
+        Args:
+            idx: 行号数组
+            values: 查找值数组
+
+        Returns:
+            np.ndarray: int64
+        """
+        table = self.table
+        width = table.shape[1]
+        pos = np.zeros(len(idx), dtype=np.int64)
+        step = width // 2
+        while step >= 1:
+            pos += np.where(table[idx, pos + step - 1] < values, step, 0)
+            step //= 2
+        pos += table[idx, pos] < values
+        return pos
+
+    def take(self, keep):
+        """
+        按序号或布尔掩码取出部分行（各行已排好序，直接切片）
+
+        Returns:
+            _BreakpointTable
+        """
+        table = object.__new__(_BreakpointTable)
+        table.table = self.table[keep]
+        table.cum_mask = self.cum_mask[keep]
+        table.n_finite = self.n_finite[keep]
+        return table
+
+
+class MinuteScoreTable:
+    """
+    单日分钟级评分阈值表（按股票序号对齐）
+
+    Example:
+        table = MinuteScoreTable(ma, rolling_max, avg_volume_10d)
+        score, score_mask = table.score(idx, price, cum_volume)
+    """
+
+    def __init__(self, ma, rolling_max, avg_volume_10d,
+                 ma_periods=MINUTE_MA_PERIODS, max_periods=UPTREND_HIGH_PERIODS):
+        """
+        初始化（参数含义同 kernels.minute_score）
+
+        Args:
+            ma: 日线均线矩阵 (len(ma_periods), 股票)
+            rolling_max: 日线N日最高价矩阵 (len(max_periods), 股票)
+            avg_volume_10d: 过去10日平均日成交量 (股票,)
+            ma_periods: ma 各行对应的均线周期
+            max_periods: rolling_max 各行对应的周期
+        """
+        ma = np.asarray(ma, dtype=np.float64)
+        rolling_max = np.asarray(rolling_max, dtype=np.float64)
+        avg_volume_10d = np.asarray(avg_volume_10d, dtype=np.float64)
+        ma_rows = {period: i for i, period in enumerate(ma_periods)}
+        max_rows = {period: i for i, period in enumerate(max_periods)}
+        n_stocks = len(avg_volume_10d)
+
+        price_rows, price_bits = [], []
+        for offset, period in enumerate(UPTREND_MA_PERIODS):
+            if period in ma_rows:
+                price_rows.append(ma[ma_rows[period]])
+                price_bits.append(MA_BREAK_SHIFT + offset)
+        for offset, period in enumerate(UPTREND_HIGH_PERIODS):
+            if period in max_rows:
+                price_rows.append(rolling_max[max_rows[period]])
+                price_bits.append(NEW_HIGH_SHIFT + offset)
+        self.price = _BreakpointTable(np.array(price_rows).reshape(len(price_rows), n_stocks), price_bits)
+
+        self.volume = _BreakpointTable(
+            np.array([avg_volume_10d * multiple for multiple in UPTREND_VOLUME_MULTIPLES]),
+            [VOLUME_SHIFT + offset for offset in range(len(UPTREND_VOLUME_MULTIPLES))]
+        )
+
+        # 均线排列项在当日内为常数
+        self.base_score = np.zeros(n_stocks, dtype=np.int8)
+        self.base_mask = np.zeros(n_stocks, dtype=np.uint32)
+        for offset, (short, long) in enumerate(UPTREND_MA_PAIRS):
+            if short in ma_rows and long in ma_rows:
+                cond = ma[ma_rows[short]] > ma[ma_rows[long]]
+                self.base_score += cond
+                self.base_mask |= cond.astype(np.uint32) << np.uint32(ARRANGEMENT_SHIFT + offset)
+
+    def __len__(self):
+        return len(self.base_score)
+
+    def score(self, idx, price, cum_volume):
+        """
+        计算分钟级得分
+
+        Args:
+            idx: 股票序号数组
+            price: 当前价格 (len(idx),)
+            cum_volume: 截止前一分钟的累积成交量 (len(idx),)
+
+        Returns:
+            tuple: (得分 ndarray(int8), 子条件位掩码 ndarray(uint32))
+        """
+        price_count = self.price.count_below(idx, np.asarray(price, dtype=np.float64))
+        volume_count = self.volume.count_below(idx, np.asarray(cum_volume, dtype=np.float64))
+        score = (self.base_score[idx] + price_count + volume_count).astype(np.int8)
+        score_mask = (self.base_mask[idx]
+                      | self.price.cum_mask[idx, price_count]
+                      | self.volume.cum_mask[idx, volume_count])
+        return score, score_mask
+
+    def max_score(self, price_cap=None):
+        """
+        当日可能达到的最高得分（成交量项不设上限）
+
+        Args:
+            price_cap: 当日价格上限 (股票,)，如涨停价；NaN或None表示不设上限
+
+        Returns:
+            np.ndarray: int8
+        """
+        if price_cap is None:
+            price_points = self.price.n_finite
+        else:
+            cap = np.asarray(price_cap, dtype=np.float64)
+            cap = np.where(np.isnan(cap), np.inf, cap)
+            price_points = self.price.count_below(np.arange(len(self)), cap)
+        return (self.base_score + price_points + self.volume.n_finite).astype(np.int8)
+
+    def take(self, keep):
+        """
+        按序号或布尔掩码取出部分股票的阈值表
+
+        Returns:
+            MinuteScoreTable
+        """
+        table = object.__new__(MinuteScoreTable)
+        table.price = self.price.take(keep)
+        table.volume = self.volume.take(keep)
+        table.base_score = self.base_score[keep]
+        table.base_mask = self.base_mask[keep]
+        return table
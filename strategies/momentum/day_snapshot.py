@@ -0,0 +1,186 @@
+# coding: utf-8
+"""
+分钟级评分使用的单日因子快照
+
+日频因子在一个交易日内不变，每日开盘时从各因子宽表中取出当日截面一次，
+按统一的股票顺序存成连续数组，分钟循环只按股票序号读取，不再每分钟对宽表做 .loc。
+"""
+import numpy as np
+from factors.kernels import MINUTE_MA_PERIODS, UPTREND_HIGH_PERIODS
+from factors.score_table import MinuteScoreTable
+
+
+class DayFactorSnapshot:
+    """
+    单日因子快照（按 stocks 顺序对齐）
+
+    Attributes:
+        date: 日期字符串
+        stocks: 股票代码列表
+        stock_idx: {股票代码: 序号}
+        avg_vol_per_min_5d: 5日平均每分钟成交量，缺失为NaN
+        avg_volume_10d: 10日平均日成交量，缺失、NaN或非正值已替换为1
+        limit_up / limit_down: 涨跌停价，缺失为NaN
+        ma: (均线周期, 股票) 矩阵，行顺序同 ma_periods
+        rolling_max: (最高价周期, 股票) 矩阵，行顺序同 max_periods
+        has_daily: 股票在均线和N日最高价宽表中均存在（不存在的股票不评分）
+        buy_cond1: 买入条件1（股票不在宽表中为False）
+        listing: 上市日期过滤（无过滤器、当日或股票不在过滤器中为True）
+        score_table: 分钟级评分阈值表（MinuteScoreTable）
+    """
+
+    def __init__(self, date, stocks, avg_vol_per_min_5d, avg_volume_10d, limit_up, limit_down,
+                 ma, rolling_max, has_daily, ma_periods, max_periods, buy_cond1=None, listing=None,
+                 score_table=None):
+        self.date = date
+        self.stocks = list(stocks)
+        self.stock_idx = {stock: i for i, stock in enumerate(self.stocks)}
+        self.avg_vol_per_min_5d = avg_vol_per_min_5d
+        self.avg_volume_10d = avg_volume_10d
+        self.limit_up = limit_up
+        self.limit_down = limit_down
+        self.ma = ma
+        self.rolling_max = rolling_max
+        self.has_daily = has_daily
+        self.ma_periods = tuple(ma_periods)
+        self.max_periods = tuple(max_periods)
+        n = len(self.stocks)
+        self.buy_cond1 = buy_cond1 if buy_cond1 is not None else np.zeros(n, dtype=bool)
+        self.listing = listing if listing is not None else np.ones(n, dtype=bool)
+        if score_table is None:
+            score_table = MinuteScoreTable(ma, rolling_max, avg_volume_10d, ma_periods, max_periods)
+        self.score_table = score_table
+
+    @classmethod
+    def build(cls, date, stocks, ma_dict, rolling_max_dict, avg_vol_per_min_5d, avg_volume_10d,
+              limit_up_df, limit_down_df, buy_cond1_df=None, listing_filter_df=None):
+        """
+        从日频因子宽表构建快照
+
+        Args:
+            date: 日期字符串
+            stocks: 股票代码列表
+            ma_dict: {周期: 均线宽表}（DataFrame 或 CompactFrame，下同）
+            rolling_max_dict: {周期: N日最高价宽表}
+            avg_vol_per_min_5d: 5日平均每分钟成交量宽表
+            avg_volume_10d: 10日平均日成交量宽表
+            limit_up_df / limit_down_df: 涨跌停价宽表
+            buy_cond1_df: 买入条件1宽表（可选）
+            listing_filter_df: 上市日期过滤宽表（可选）
+
+        Returns:
+            DayFactorSnapshot，date 不在因子日期范围内时返回None
+        """
+        if date not in avg_vol_per_min_5d.index:
+            return None
+        stocks = list(stocks)
+
+        ma_periods = [p for p in MINUTE_MA_PERIODS if p in ma_dict and date in ma_dict[p].index]
+        max_periods = [p for p in UPTREND_HIGH_PERIODS
+                       if p in rolling_max_dict and date in rolling_max_dict[p].index]
+
+        ma, ma_present = cls._stack_rows([ma_dict[p] for p in ma_periods], date, stocks)
+        rolling_max, max_present = cls._stack_rows([rolling_max_dict[p] for p in max_periods], date, stocks)
+
+        avg_volume_10d_row = _day_row(avg_volume_10d, date, stocks)[0]
+        avg_volume_10d_row[~(avg_volume_10d_row > 0)] = 1
+
+        return cls(
+            date, stocks,
+            avg_vol_per_min_5d=_day_row(avg_vol_per_min_5d, date, stocks)[0],
+            avg_volume_10d=avg_volume_10d_row,
+            limit_up=_day_row(limit_up_df, date, stocks)[0],
+            limit_down=_day_row(limit_down_df, date, stocks)[0],
+            ma=ma,
+            rolling_max=rolling_max,
+            has_daily=ma_present & max_present,
+            ma_periods=ma_periods,
+            max_periods=max_periods,
+            buy_cond1=day_flags(buy_cond1_df, date, stocks, default=False),
+            listing=day_flags(listing_filter_df, date, stocks, default=True)
+        )
+
+    @staticmethod
+    def _stack_rows(frames, date, stocks):
+        """多个宽表的当日截面拼成 (宽表, 股票) 矩阵，并返回股票是否在任一宽表中存在"""
+        matrix = np.full((len(frames), len(stocks)), np.nan)
+        present = np.zeros(len(stocks), dtype=bool)
+        for j, frame in enumerate(frames):
+            values, found = _day_row(frame, date, stocks)
+            matrix[j] = values
+            present |= found
+        return matrix, present
+
+    def __len__(self):
+        return len(self.stocks)
+
+    def take(self, keep):
+        """
+        按布尔掩码取出部分股票的快照（阈值表按行取出，不重新排序断点）
+
+        Returns:
+            DayFactorSnapshot
+        """
+        keep = np.asarray(keep, dtype=bool)
+        return DayFactorSnapshot(
+            self.date, [stock for stock, flag in zip(self.stocks, keep.tolist()) if flag],
+            avg_vol_per_min_5d=self.avg_vol_per_min_5d[keep],
+            avg_volume_10d=self.avg_volume_10d[keep],
+            limit_up=self.limit_up[keep],
+            limit_down=self.limit_down[keep],
+            ma=self.ma[:, keep],
+            rolling_max=self.rolling_max[:, keep],
+            has_daily=self.has_daily[keep],
+            ma_periods=self.ma_periods,
+            max_periods=self.max_periods,
+            buy_cond1=self.buy_cond1[keep],
+            listing=self.listing[keep],
+            score_table=self.score_table.take(keep)
+        )
+
+    def daily_ma(self, i):
+        """第 i 只股票的均线 {周期: 值}"""
+        return dict(zip(self.ma_periods, self.ma[:, i].tolist()))
+
+    def daily_rolling_max(self, i):
+        """第 i 只股票的N日最高价 {周期: 值}"""
+        return dict(zip(self.max_periods, self.rolling_max[:, i].tolist()))
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in (
+            self.avg_vol_per_min_5d, self.avg_volume_10d, self.limit_up, self.limit_down,
+            self.ma, self.rolling_max, self.has_daily, self.buy_cond1, self.listing
+        ))
+
+
+def _day_row(frame, date, stocks):
+    """
+    读取宽表某日的截面并按 stocks 对齐
+
+    Returns:
+        tuple: (float64 数组，缺失为NaN, 股票是否在宽表列中的布尔数组)
+    """
+    row = frame.row(date) if hasattr(frame, 'row') else frame.loc[date]
+    indexer = row.index.get_indexer(stocks)
+    found = indexer >= 0
+    values = np.full(len(stocks), np.nan)
+    values[found] = row.to_numpy(dtype=np.float64, na_value=np.nan)[indexer[found]]
+    return values, found
+
+
+def day_flags(frame, date, stocks, default):
+    """
+    读取布尔宽表某日的截面并按 stocks 对齐（取值按真值判断，NaN 视为 True，与逐只判断一致）
+
+    Returns:
+        np.ndarray: bool，宽表为None、日期或股票不存在时为 default
+    """
+    flags = np.full(len(stocks), default, dtype=bool)
+    if frame is None or date not in frame.index:
+        return flags
+    row = frame.row(date) if hasattr(frame, 'row') else frame.loc[date]
+    indexer = row.index.get_indexer(stocks)
+    found = indexer >= 0
+    flags[found] = row.to_numpy().astype(bool)[indexer[found]]
+    return flags
@@ -0,0 +1,134 @@
+# coding: utf-8
+"""
+动量策略的日频因子依赖图
+
+输入节点: close / open / high / volume / amount（来自宽表或 MarketPanel，按需导出）、listing_filter
+计算节点:
+    ma, rolling_max                 均线、N日最高价（未平移，供全量评分使用）
+    ma_prev, rolling_max_prev       平移一日后的均线、N日最高价（盘中评分使用截至前一日的值）
+    buy_cond1                       买入条件1（平移一日）
+    avg_vol_per_min_5d              5日平均每分钟成交量（平移一日）
+    avg_volume_10d                  10日平均日成交量（平移一日）
+    limit_prices, limit_up, limit_down  涨跌停价
+    uptrend_score                   日线上涨趋势得分（复用 ma / rolling_max 节点）
+"""
+import hashlib
+from factors import kernels, backends, factor_calculator
+from factors.graph import FactorGraph
+from factors.kernels import MINUTE_MA_PERIODS, UPTREND_HIGH_PERIODS
+from data.market_panel import MarketPanel
+from utils import helpers, market_rules
+from utils.helpers import calc_daily_avg_volume_per_minute
+from utils.market_rules import calculate_limit_prices
+from config.strategy_config import (
+    BUY_CONDITION_1, DAILY_AVG_VOLUME_WINDOW_5D, DAILY_AVG_VOLUME_WINDOW_10D, TRADING_MINUTES_PER_DAY
+)
+
+
+PRICE_FIELDS = ('close', 'open', 'high', 'volume', 'amount')
+
+# 因子计算代码所在的源文件：任一文件改动（如涨跌停比例、均线算法）都会使 FactorStore 中的旧条目失效
+FACTOR_SOURCE_MODULES = (kernels, backends, factor_calculator, helpers, market_rules)
+
+_code_version = None
+
+
+def build_factor_graph(factor_calc, frames=None, panel=None, stock_list=None, listing_filter_df=None):
+    """
+    构建动量策略的日频因子图
+
+    Args:
+        factor_calc: FactorCalculator
+        frames: {字段: 宽表DataFrame}，如 {'close': close_df, ...}，缺失字段从 panel 导出
+        panel: MarketPanel（可选）
+        stock_list: 股票列表（用于涨跌停价计算）
+        listing_filter_df: 上市日期过滤DataFrame（可选）
+
+    Returns:
+        FactorGraph
+    """
+    frames = frames or {}
+    graph = FactorGraph()
+
+    for field in PRICE_FIELDS:
+        frame = frames.get(field)
+        if frame is None and isinstance(panel, MarketPanel):
+            graph.add_input(field, loader=lambda field=field: panel.to_frame(field))
+        else:
+            graph.add_input(field, frame)
+    graph.add_input('listing_filter', listing_filter_df)
+
+    graph.add('ma', ['close'], lambda close: factor_calc.calc_ma(close, list(MINUTE_MA_PERIODS)))
+    graph.add('rolling_max', ['high'],
+              lambda high: factor_calc.calc_rolling_max(high, list(UPTREND_HIGH_PERIODS)))
+    graph.add('ma_prev', ['ma'], _shift_dict)
+    graph.add('rolling_max_prev', ['rolling_max'], _shift_dict)
+
+    graph.add('buy_cond1', ['close'], lambda close: factor_calc.calc_buy_condition_1(
+        close,
+        consecutive_days=BUY_CONDITION_1['consecutive_up_days'],
+        or_days=BUY_CONDITION_1['or_days'],
+        or_pct_change=BUY_CONDITION_1['or_pct_change']
+    ).shift(1))
+
+    graph.add('avg_vol_per_min_5d', ['volume'], lambda volume: calc_daily_avg_volume_per_minute(
+        volume, window=DAILY_AVG_VOLUME_WINDOW_5D
+    ).shift(1))
+    graph.add('avg_volume_10d', ['volume'], lambda volume: factor_calc.calc_rolling_mean(
+        volume, DAILY_AVG_VOLUME_WINDOW_10D
+    ).shift(1))
+
+    graph.add('limit_prices', ['close'], lambda close: calculate_limit_prices(
+        close, stock_list or close.columns.tolist()
+    ))
+    graph.add('limit_up', ['limit_prices'], lambda limits: limits[0])
+    graph.add('limit_down', ['limit_prices'], lambda limits: limits[1])
+
+    graph.add('uptrend_score', ['close', 'high', 'volume', 'ma', 'rolling_max'],
+              lambda close, high, volume, ma, rolling_max: factor_calc.calc_uptrend_score(
+                  close, high, volume, ma, max_dict=rolling_max
+              ))
+    return graph
+
+
+def factor_config(backend_name):
+    """
+    影响因子图计算结果的参数（用于 FactorStore 的存储键）
+
+    Args:
+        backend_name: 滚动因子计算后端名称（各后端的均线末位可能不同）
+
+    Returns:
+        dict
+    """
+    return {
+        'ma_periods': list(MINUTE_MA_PERIODS),
+        'uptrend_high_periods': list(UPTREND_HIGH_PERIODS),
+        'buy_condition_1': BUY_CONDITION_1,
+        'avg_volume_window_5d': DAILY_AVG_VOLUME_WINDOW_5D,
+        'avg_volume_window_10d': DAILY_AVG_VOLUME_WINDOW_10D,
+        'trading_minutes_per_day': TRADING_MINUTES_PER_DAY,
+        'backend': backend_name,
+        'code_version': factor_code_version()
+    }
+
+
+def factor_code_version():
+    """
+    因子计算代码的版本（本模块及 FACTOR_SOURCE_MODULES 源文件内容的哈希，进程内只计算一次）
+
+    Returns:
+        str
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1()
+        for path in [__file__] + [module.__file__ for module in FACTOR_SOURCE_MODULES]:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def _shift_dict(factor_dict):
+    return {period: df.shift(1) for period, df in factor_dict.items()}
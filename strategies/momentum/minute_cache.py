@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+分钟级盘中状态（全市场数组）
+
+当日累计成交量/成交额、最新的买入条件2、得分和子条件位掩码都按股票序号存成数组，
+每个分钟截面用少量 NumPy 运算整体更新；按股票代码查询的字典视图在读取时才生成。
+"""
+import numpy as np
+from data.minute_cube import MinuteBar
+
+
+class MinuteCache:
+    """
+    单日分钟级状态（按 stocks 顺序对齐）
+
+    Attributes:
+        stocks: 股票代码列表
+        stock_idx: {股票代码: 序号}
+        cum_volume / cum_amount: 当日累计成交量/成交额
+        buy_cond2 / has_cond2: 最新的买入条件2，及是否已计算过
+        score / score_mask / has_score: 最新的得分、子条件位掩码，及是否已计算过
+    """
+
+    def __init__(self, stocks=()):
+        self.stocks = list(stocks)
+        self.stock_idx = {stock: i for i, stock in enumerate(self.stocks)}
+        n = len(self.stocks)
+        self.cum_volume = np.zeros(n)
+        self.cum_amount = np.zeros(n)
+        self.buy_cond2 = np.zeros(n, dtype=bool)
+        self.has_cond2 = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int8)
+        self.score_mask = np.zeros(n, dtype=np.uint32)
+        self.has_score = np.zeros(n, dtype=bool)
+        self._bar_stocks = None
+        self._bar_rows = None
+        self._bar_idx = None
+        self._views = {}
+
+    def __len__(self):
+        return len(self.stocks)
+
+    def __contains__(self, stock_code):
+        return stock_code in self.stock_idx
+
+    def align(self, minute_data):
+        """
+        把分钟截面对齐到股票序号（不在 stocks 中的股票被丢弃）
+
+        Args:
+            minute_data: MinuteBar 或 {stock_code: {close, volume, amount, ...}}
+
+        Returns:
+            tuple: (序号, 价格, 成交量, 成交额)，均为 ndarray
+        """
+        if isinstance(minute_data, MinuteBar):
+            # 同一 MinuteCube 的各分钟截面共用同一个股票数组，对齐结果可以复用；
+            # 之后每分钟只取出 stocks 中股票所在的行，计算量与 stocks 的规模成正比
+            if minute_data.stocks is not self._bar_stocks:
+                self._bar_stocks = minute_data.stocks
+                indexer = np.fromiter(
+                    (self.stock_idx.get(stock, -1) for stock in minute_data.stocks.tolist()),
+                    dtype=np.int64, count=len(minute_data.stocks)
+                )
+                self._bar_rows = np.flatnonzero(indexer >= 0)
+                self._bar_idx = indexer[self._bar_rows]
+            values = minute_data.values[self._bar_rows]
+            field_ids = minute_data.field_ids
+            return (
+                self._bar_idx,
+                values[:, field_ids['close']],
+                values[:, field_ids['volume']],
+                values[:, field_ids['amount']]
+            )
+
+        rows = [
+            (self.stock_idx[stock_code], stock_data.get('close', np.nan),
+             stock_data.get('volume', 0), stock_data.get('amount', 0))
+            for stock_code, stock_data in minute_data.items()
+            if stock_code in self.stock_idx
+        ]
+        if not rows:
+            empty = np.zeros(0)
+            return np.zeros(0, dtype=np.int64), empty, empty, empty
+        idx, price, volume, amount = zip(*rows)
+        return (np.array(idx, dtype=np.int64), np.array(price, dtype=np.float64),
+                np.array(volume, dtype=np.float64), np.array(amount, dtype=np.float64))
+
+    def accumulate(self, idx, volume, amount):
+        """
+        累加成交量和成交额
+
+        Returns:
+            tuple: (累计成交量, 累计成交额)，按 idx 顺序
+        """
+        self.cum_volume[idx] += volume
+        self.cum_amount[idx] += amount
+        return self.cum_volume[idx], self.cum_amount[idx]
+
+    def set_buy_cond2(self, idx, buy_cond2):
+        self.buy_cond2[idx] = buy_cond2
+        self.has_cond2[idx] = True
+        self._views.clear()
+
+    def set_score(self, idx, score, score_mask):
+        self.score[idx] = score
+        self.score_mask[idx] = score_mask
+        self.has_score[idx] = True
+        self._views.clear()
+
+    def score_dict(self):
+        """{stock_code: 得分}（只含已计算过得分的股票）"""
+        return self._view('score', self.score, self.has_score)
+
+    def score_mask_dict(self):
+        """{stock_code: 子条件位掩码}"""
+        return self._view('score_mask', self.score_mask, self.has_score)
+
+    def buy_cond2_dict(self):
+        """{stock_code: 买入条件2}"""
+        return self._view('buy_cond2', self.buy_cond2, self.has_cond2)
+
+    def get(self, stock_code):
+        """
+        单只股票的累计成交量/成交额
+
+        Returns:
+            dict: {'cum_volume', 'cum_amount'}，股票不存在时返回None
+        """
+        i = self.stock_idx.get(stock_code)
+        if i is None:
+            return None
+        return {'cum_volume': float(self.cum_volume[i]), 'cum_amount': float(self.cum_amount[i])}
+
+    def _view(self, name, values, has_value):
+        view = self._views.get(name)
+        if view is None:
+            idx = np.flatnonzero(has_value)
+            view = dict(zip([self.stocks[i] for i in idx.tolist()], values[idx].tolist()))
+            self._views[name] = view
+        return view
@@ -19,7 +19,7 @@ class PositionMetadata:
         return TARGET_PROFIT_MAP.get(score, DEFAULT_TARGET_PROFIT)
     
     def add_metadata(self, stock_code, date, score, buy_time=None, buy_price=None, 
-                    buy_volume=None, buy_amount=None, buy_fee=None, score_detail=None):
+                    buy_volume=None, buy_amount=None, buy_fee=None, score_mask=None):
         self.metadata[stock_code] = {
             'buy_date': date,
             'buy_time': buy_time,
@@ -28,7 +28,7 @@ class PositionMetadata:
             'buy_amount': buy_amount,
             'buy_fee': buy_fee,
             'score': score,
-            'score_detail': score_detail or {},
+            'score_mask': None if score_mask is None else int(score_mask),
             'target_profit': self.calc_target_profit(score)
         }
     
@@ -3,36 +3,67 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from factors.factor_calculator import FactorCalculator
+from factors.compact import compact_values, compact_flags, factor_nbytes
+from factors.score_mask import decode_score_mask
+from .factor_graph import build_factor_graph, factor_config
+from .day_snapshot import DayFactorSnapshot, day_flags
+from .minute_cache import MinuteCache
+from data.market_panel import MarketPanel
 from .position_metadata import PositionMetadata
 from core.position_data_wrapper import PositionDataWrapper
-from utils.helpers import (
-    filter_st_stocks, calc_minutes_since_open, 
-    calc_daily_avg_volume_per_minute
-)
+from utils.helpers import filter_st_stocks, calc_minutes_since_open
 from utils.logger import get_logger
 from utils import trade_logger
 from config.strategy_config import (
-    BUY_CONDITION_1, BUY_CONDITION_2, MIN_LISTING_DAYS,
+    BUY_CONDITION_2, MIN_LISTING_DAYS,
     DAILY_AVG_VOLUME_WINDOW_5D, DAILY_AVG_VOLUME_WINDOW_10D,
-    STOP_LOSS, MAX_HOLD_DAYS, MIN_SCORE_THRESHOLD, DEFAULT_TARGET_PROFIT
+    STOP_LOSS, MAX_HOLD_DAYS, MIN_SCORE_THRESHOLD, DEFAULT_TARGET_PROFIT,
+    FACTOR_PRECISION, FACTOR_WORKERS, FACTOR_BACKEND, TRADING_MINUTES_PER_DAY, INTRADAY_UNIVERSE_FILTER
+)
+
+
+# prepare_daily_factors 需要的因子图节点（见 factor_graph.py）
+REQUIRED_FACTORS = (
+    'ma_prev', 'rolling_max_prev', 'buy_cond1', 'avg_vol_per_min_5d', 'avg_volume_10d',
+    'limit_up', 'limit_down'
 )
 
 
+# 盘前估算的涨停价与交易所实际涨停价之间的最大误差（前复权价格下四舍五入口径不同）
+LIMIT_PRICE_TOLERANCE = 0.01
+
+
+def _score_detail(score_mask):
+    """子条件位掩码解码为交易日志使用的分项得分字典，无评分时为空字典"""
+    return {} if score_mask is None else decode_score_mask(score_mask)
+
+
 class MomentumStrategy:
     """短期强势股策略"""
     
-    def __init__(self, account=None, strategy_name='', trade_executor=None, logger=None):
+    def __init__(self, account=None, strategy_name='', trade_executor=None, logger=None,
+                 precision=FACTOR_PRECISION, factor_workers=FACTOR_WORKERS, factor_store=None,
+                 universe_filter=INTRADAY_UNIVERSE_FILTER, factor_backend=FACTOR_BACKEND):
         self.account = account
         self.strategy_name = strategy_name
         self.trade_executor = trade_executor
         self.logger = logger or get_logger('momentum')
         
-        self.factor_calc = FactorCalculator()
+        # 滚动因子计算后端，见 config.strategy_config.FACTOR_BACKEND
+        self.factor_calc = FactorCalculator(backend=factor_backend, n_workers=factor_workers)
+        # 日频因子存储精度，见 config.strategy_config.FACTOR_PRECISION
+        self.precision = precision
+        # 预计算因子的磁盘存储（factors.factor_store.FactorStore），None表示每次重新计算
+        self.factor_store = factor_store
+        # 盘前缩小分钟级计算的股票范围，见 config.strategy_config.INTRADAY_UNIVERSE_FILTER
+        self.universe_filter = universe_filter
         self.metadata_mgr = PositionMetadata()
         self.position_wrapper = PositionDataWrapper(account, strategy_name) if account else None
         
         # 日频因子（用于分钟级评分的基础数据）
-        self.open_df = None
+        self.factor_graph = None
+        self.required_factors = list(REQUIRED_FACTORS)
+        self.daily_panel = None
         self.ma_dict = None
         self.rolling_max_dict = None
         self.buy_cond1_df = None
@@ -46,10 +77,8 @@ class MomentumStrategy:
         self.daily_avg_volume_10d = None
         
         # 分钟级因子
-        self.minute_cache = {}
-        self.minute_scores = {}
-        self.minute_score_details = {}
-        self.minute_buy_cond2 = {}
+        self.day_snapshot = None
+        self.minute_cache = MinuteCache()
         
         # 过滤器
         self.his_st_dict = {}
@@ -62,11 +91,14 @@ class MomentumStrategy:
         # 用于计算当日盈亏
         self.previous_day_assets = None
     
-    def prepare_daily_factors(self, close_df, open_df, high_df, volume_df, amount_df, 
-                             stock_list=None, listing_filter_df=None):
+    def prepare_daily_factors(self, close_df=None, open_df=None, high_df=None, volume_df=None,
+                             amount_df=None, stock_list=None, listing_filter_df=None, panel=None):
         """
         预先计算所有日频因子（每日盘前调用一次）
         
+        可以传入五个宽表DataFrame，也可以直接传入 MarketPanel
+        （panel=... 或作为第一个位置参数），未显式给出的字段从面板中按需导出。
+        
         Args:
             close_df: 收盘价DataFrame
             open_df: 开盘价DataFrame
@@ -75,71 +107,200 @@ class MomentumStrategy:
             amount_df: 成交金额DataFrame
             stock_list: 股票列表（用于上市日期过滤）
             listing_filter_df: 上市日期过滤DataFrame（可选）
+            panel: MarketPanel 日线面板（可选）
         """
-        # 保留开盘价用于持仓市值估算
-        self.open_df = open_df
-        
-        # 计算均线（用于分钟级评分）
-        self.ma_dict = self.factor_calc.calc_ma(close_df, [5, 10, 20, 30, 60, 120])
-        for period in self.ma_dict:
-            self.ma_dict[period] = self.ma_dict[period].shift(1)
-        
-        # 计算滚动最高价（用于分钟级评分）
-        self.rolling_max_dict = self.factor_calc.calc_rolling_max(
-            high_df, [20, 40, 60, 80, 100]
-        )
-        for period in self.rolling_max_dict:
-            self.rolling_max_dict[period] = self.rolling_max_dict[period].shift(1)
-        
-        # 计算买入条件1（日频）
-        self.buy_cond1_df = self.factor_calc.calc_buy_condition_1(
-            close_df,
-            consecutive_days=BUY_CONDITION_1['consecutive_up_days'],
-            or_days=BUY_CONDITION_1['or_days'],
-            or_pct_change=BUY_CONDITION_1['or_pct_change']
-        ).shift(1)
-        
-        # 计算5日平均每分钟成交量（用于分钟级量比计算）
-        self.daily_avg_vol_per_min_5d = calc_daily_avg_volume_per_minute(
-            volume_df, window=DAILY_AVG_VOLUME_WINDOW_5D
-        ).shift(1)
-        
-        # 计算10日平均日成交量（用于分钟级成交量放大判断）
-        self.daily_avg_volume_10d = volume_df.rolling(
-            window=DAILY_AVG_VOLUME_WINDOW_10D, min_periods=DAILY_AVG_VOLUME_WINDOW_10D
-        ).mean().shift(1)
-        
-        from utils.market_rules import calculate_limit_prices
-        self.limit_up_df, self.limit_down_df = calculate_limit_prices(
-            close_df, 
-            stock_list or close_df.columns.tolist()
+        if isinstance(close_df, MarketPanel):
+            panel, close_df = close_df, None
+        
+        # 声明式因子图：只计算 required_factors 及其上游节点，开盘价等未被依赖的字段不会导出
+        self.daily_panel = panel
+        self.factor_graph = build_factor_graph(
+            self.factor_calc,
+            frames={'close': close_df, 'open': open_df, 'high': high_df,
+                    'volume': volume_df, 'amount': amount_df},
+            panel=panel, stock_list=stock_list, listing_filter_df=listing_filter_df
         )
+        factors = self._load_or_compute_factors(stock_list)
+        # 盘前因子只计算一次，算完即释放并行计算的进程池和中间结果（如未平移的均线）
+        self.factor_calc.close()
+        self.factor_graph.release(keep=['close', 'listing_filter'])
+        
+        self.ma_dict = factors['ma_prev']
+        self.rolling_max_dict = factors['rolling_max_prev']
+        self.buy_cond1_df = factors['buy_cond1']
+        self.daily_avg_vol_per_min_5d = factors['avg_vol_per_min_5d']
+        self.daily_avg_volume_10d = factors['avg_volume_10d']
+        self.limit_up_df = factors['limit_up']
+        self.limit_down_df = factors['limit_down']
         
         # 保存上市日期过滤器
         if listing_filter_df is not None:
             self.listing_filter_df = listing_filter_df
         
         # 构建交易日期索引（用于计算持仓天数）
+        close_df = self.factor_graph.get('close')
         self.trading_dates = [pd.to_datetime(d).strftime('%Y%m%d') for d in close_df.index]
         self.trading_date_to_idx = {date: idx for idx, date in enumerate(self.trading_dates)}
+        
+        if self.precision != 'float64':
+            self._compact_daily_factors()
+    
+    def _load_or_compute_factors(self, stock_list=None):
+        """
+        计算 required_factors；配置了 factor_store 时按因子配置和数据版本读取已存储的结果，
+        未命中则计算后写入
+
+        Returns:
+            dict: {因子名: 取值}
+        """
+        if self.factor_store is None:
+            return self.factor_graph.require(self.required_factors)
+
+        inputs = [self.factor_graph.get(name) for name in ('close', 'high', 'volume', 'listing_filter')]
+        data_version = self.factor_store.data_version(
+            inputs, labels=sorted(stock_list) if stock_list is not None else None
+        )
+        config = dict(factor_config(self.factor_calc.backend.name), required_factors=self.required_factors)
+        key = self.factor_store.make_key(config, data_version)
+
+        factors = self.factor_store.load(key)
+        if factors is not None and all(name in factors for name in self.required_factors):
+            self.logger.info(f"Loaded daily factors from store: {key}")
+            return {name: factors[name] for name in self.required_factors}
+
+        factors = self.factor_graph.require(self.required_factors)
+        try:
+            self.factor_store.save(key, factors, config=config, data_version=data_version)
+            self.logger.info(f"Saved daily factors to store: {key}")
+        except OSError as e:
+            self.logger.warning(f"Failed to save daily factors to store: {e}")
+        return factors
+    
+    def _compact_daily_factors(self):
+        """
+        按 self.precision 压缩日频因子
+        
+        最高价、涨跌停价、成交量均值在能逐位还原时按定点存储；均线等其余数值因子
+        以不小于原值的 float32 存储，价格恰好比均线高出不到 1 个 float32 ulp 时
+        突破判断会由 True 变为 False。布尔因子按位压缩，见 factors.compact
+        """
+        precision = self.precision
+        self.ma_dict = {p: compact_values(df, precision) for p, df in self.ma_dict.items()}
+        self.rolling_max_dict = {
+            p: compact_values(df, precision, scale=100) for p, df in self.rolling_max_dict.items()
+        }
+        self.limit_up_df = compact_values(self.limit_up_df, precision, scale=100)
+        self.limit_down_df = compact_values(self.limit_down_df, precision, scale=100)
+        self.daily_avg_vol_per_min_5d = compact_values(
+            self.daily_avg_vol_per_min_5d, precision,
+            scale=DAILY_AVG_VOLUME_WINDOW_5D * TRADING_MINUTES_PER_DAY
+        )
+        self.daily_avg_volume_10d = compact_values(
+            self.daily_avg_volume_10d, precision, scale=DAILY_AVG_VOLUME_WINDOW_10D
+        )
+        self.buy_cond1_df = compact_flags(self.buy_cond1_df, precision)
+        self.listing_filter_df = compact_flags(self.listing_filter_df, precision)
+        
+        self.logger.info(f"Daily factors stored as {precision}: "
+                         f"{self.get_factor_memory()['total'] / 1024 ** 2:.1f} MB")
+    
+    def get_factor_memory(self):
+        """
+        统计日频因子占用的内存
+        
+        Returns:
+            dict: {因子名: 字节数, 'total': 合计}
+        """
+        usage = {
+            'ma': factor_nbytes(self.ma_dict),
+            'rolling_max': factor_nbytes(self.rolling_max_dict),
+            'limit_up': factor_nbytes(self.limit_up_df),
+            'limit_down': factor_nbytes(self.limit_down_df),
+            'avg_vol_per_min_5d': factor_nbytes(self.daily_avg_vol_per_min_5d),
+            'avg_volume_10d': factor_nbytes(self.daily_avg_volume_10d),
+            'buy_cond1': factor_nbytes(self.buy_cond1_df),
+            'listing_filter': factor_nbytes(self.listing_filter_df),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+    
+    @property
+    def open_df(self):
+        """开盘价DataFrame（用于持仓市值估算，首次访问时才从因子图导出）"""
+        if self.factor_graph is None:
+            return None
+        return self.factor_graph.get('open')
+    
+    def get_factor(self, name):
+        """
+        按名称获取日频因子（未计算的节点此时才计算），可用节点见 factor_graph.py
+        
+        Args:
+            name: 因子图节点名称，如 'uptrend_score'
+            
+        Returns:
+            因子取值
+        """
+        if self.factor_graph is None:
+            raise RuntimeError("prepare_daily_factors must be called before get_factor")
+        return self.factor_graph.get(name)
     
-    def init_minute_cache(self, date, stock_list):
+    def init_minute_cache(self, date, stock_list, holdings=None):
         """
         初始化分钟级缓存（每日开盘时调用）
         
         Args:
             date: 日期
             stock_list: 股票代码列表
+            holdings: 当前持仓股票代码（启用 universe_filter 时保留其分钟级得分用于卖出判断），
+                None表示从 trade_executor 查询
+        """
+        date_str = date if isinstance(date, str) else pd.to_datetime(date).strftime('%Y%m%d')
+        self.day_snapshot = None
+        
+        if self.universe_filter and self.buy_cond1_df is not None:
+            if holdings is None and self.trade_executor is not None:
+                holdings = self.trade_executor.get_holdings(self.account).keys()
+            holdings = set(holdings or ())
+            universe = self.select_intraday_universe(date_str, stock_list, holdings)
+            self.minute_cache = MinuteCache(universe)
+            snapshot = self._get_day_snapshot(date_str)
+            if snapshot is not None:
+                # 当日最高得分（价格不超过涨停价、成交量不设上限）也达不到阈值的股票不可能买入
+                max_score = snapshot.score_table.max_score(snapshot.limit_up + LIMIT_PRICE_TOLERANCE)
+                keep = (max_score >= MIN_SCORE_THRESHOLD) & snapshot.has_daily
+                keep |= np.array([stock in holdings for stock in snapshot.stocks], dtype=bool)
+                self.day_snapshot = snapshot.take(keep)
+                universe = self.day_snapshot.stocks
+            self.logger.info(f"[{date_str}] 分钟级计算股票数: {len(universe)}/{len(stock_list)}")
+            stock_list = universe
+        
+        self.minute_cache = MinuteCache(stock_list)
+        
+        # 当日日频因子截面只取一次，分钟循环按股票序号读取
+        if self.day_snapshot is None and self.daily_avg_vol_per_min_5d is not None:
+            self._get_day_snapshot(date_str)
+    
+    def select_intraday_universe(self, date, stock_list, holdings=None):
         """
-        self.minute_cache = {}
-        self.minute_scores = {}
-        self.minute_buy_cond2 = {}
+        盘前筛选当日需要做分钟级计算的股票
         
-        for stock_code in stock_list:
-            self.minute_cache[stock_code] = {
-                'cum_volume': 0,
-                'cum_amount': 0
-            }
+        买入条件1和上市日期过滤在盘前已知，不满足的股票当日不可能产生买入信号；
+        持仓股票无论是否满足都保留（卖出判断使用其分钟级得分）。
+        
+        Args:
+            date: 日期字符串
+            stock_list: 股票代码列表
+            holdings: 当前持仓股票代码（可选）
+            
+        Returns:
+            list: 筛选后的股票代码（保持 stock_list 中的顺序）
+        """
+        stock_list = list(stock_list)
+        keep = (day_flags(self.buy_cond1_df, date, stock_list, default=False)
+                & day_flags(self.listing_filter_df, date, stock_list, default=True))
+        held = set(holdings or ())
+        return [stock for stock, flag in zip(stock_list, keep.tolist()) if flag or stock in held]
     
     def update_minute_factors(self, date, minute_timestamp, minute_data):
         """
@@ -148,106 +309,98 @@ class MomentumStrategy:
         Args:
             date: 日期（字符串或datetime对象）
             minute_timestamp: 分钟时间戳（datetime）
-            minute_data: 当前时刻的分钟K线数据字典 {stock_code: {open, high, low, close, volume, amount, ...}}
+            minute_data: 当前时刻的分钟K线截面，MinuteBar（推荐）或
+                字典 {stock_code: {open, high, low, close, volume, amount, ...}}
         """
         if isinstance(date, str):
             date_str = date
         else:
             date_str = pd.to_datetime(date).strftime('%Y%m%d')
         
-        if date_str not in self.daily_avg_vol_per_min_5d.index:
-            return
-        
         minutes_since_open = calc_minutes_since_open(minute_timestamp)
         if minutes_since_open <= 0:
             return
         
-        # 预提取当天所有因子数据并转换为字典（避免循环内重复Series索引）
-        day_avg_vol_5d = self.daily_avg_vol_per_min_5d.loc[date_str].to_dict()
-        day_avg_vol_10d = self.daily_avg_volume_10d.loc[date_str].to_dict()
+        snapshot = self._get_day_snapshot(date_str)
+        if snapshot is None:
+            return
         
-        day_limit_up = self.limit_up_df.loc[date_str].to_dict()
-        day_limit_down = self.limit_down_df.loc[date_str].to_dict()
+        # 全市场数组计算：对齐到股票序号后，每一步都只保留满足前置条件的股票
+        cache = self.minute_cache
+        idx, price, volume, amount = cache.align(minute_data)
+        valid = price > 0
+        idx, price = idx[valid], price[valid]
         
-        day_ma = {}
-        for period in [5, 10, 20, 30, 60, 120]:
-            if period in self.ma_dict and date_str in self.ma_dict[period].index:
-                day_ma[period] = self.ma_dict[period].loc[date_str].to_dict()
+        # 累加成交量和成交额
+        cum_volume, cum_amount = cache.accumulate(idx, volume[valid], amount[valid])
         
-        day_rolling_max = {}
-        for period in [20, 40, 60, 80, 100]:
-            if period in self.rolling_max_dict and date_str in self.rolling_max_dict[period].index:
-                day_rolling_max[period] = self.rolling_max_dict[period].loc[date_str].to_dict()
+        avg_vol_per_min_5d = snapshot.avg_vol_per_min_5d[idx]
+        has_avg = avg_vol_per_min_5d > 0
+        idx, price = idx[has_avg], price[has_avg]
+        cum_volume, cum_amount = cum_volume[has_avg], cum_amount[has_avg]
         
-        for stock_code, stock_data in minute_data.items():
-            if stock_code not in self.minute_cache:
-                continue
-            
-            price = stock_data.get('close', np.nan)
-            volume = stock_data.get('volume', 0)
-            amount = stock_data.get('amount', 0)
-            
-            if pd.isna(price) or price <= 0:
-                continue
-            
-            # 累加成交量和成交额
-            self.minute_cache[stock_code]['cum_volume'] += volume
-            self.minute_cache[stock_code]['cum_amount'] += amount
-            
-            cum_volume = self.minute_cache[stock_code]['cum_volume']
-            cum_amount = self.minute_cache[stock_code]['cum_amount']
-            
-            avg_vol_per_min_5d = day_avg_vol_5d.get(stock_code)
-            if avg_vol_per_min_5d is None or pd.isna(avg_vol_per_min_5d) or avg_vol_per_min_5d <= 0:
-                continue
-            
-            volume_ratio = self.factor_calc.calc_intraday_volume_ratio(
-                cum_volume, minutes_since_open, avg_vol_per_min_5d
-            )
-            
-            buy_cond2 = self.factor_calc.calc_buy_condition_2_intraday(
-                volume_ratio, cum_amount, minutes_since_open,
-                early_minutes=BUY_CONDITION_2['early_minutes'],
-                early_volume_ratio=BUY_CONDITION_2['early_volume_ratio'],
-                early_amount=BUY_CONDITION_2['early_amount'],
-                late_volume_ratio=BUY_CONDITION_2['late_volume_ratio'],
-                late_amount=BUY_CONDITION_2['late_amount']
-            )
-            self.minute_buy_cond2[stock_code] = buy_cond2
-            
-            daily_ma = {}
-            for period in [5, 10, 20, 30, 60, 120]:
-                if period in day_ma:
-                    val = day_ma[period].get(stock_code)
-                    if val is not None:
-                        daily_ma[period] = val
-            
-            daily_rolling_max = {}
-            for period in [20, 40, 60, 80, 100]:
-                if period in day_rolling_max:
-                    val = day_rolling_max[period].get(stock_code)
-                    if val is not None:
-                        daily_rolling_max[period] = val
-            
-            if not daily_ma or not daily_rolling_max:
-                continue
-            
-            avg_volume_10d = day_avg_vol_10d.get(stock_code, 1)
-            if pd.isna(avg_volume_10d) or avg_volume_10d <= 0:
-                avg_volume_10d = 1
-            
-            score, score_detail = self.factor_calc.calc_minute_score(
-                price, cum_volume, daily_ma, daily_rolling_max, avg_volume_10d
+        volume_ratio = self.factor_calc.calc_intraday_volume_ratio(
+            cum_volume, minutes_since_open, avg_vol_per_min_5d[has_avg]
+        )
+        
+        buy_cond2 = self.factor_calc.calc_buy_condition_2_intraday(
+            volume_ratio, cum_amount, minutes_since_open,
+            early_minutes=BUY_CONDITION_2['early_minutes'],
+            early_volume_ratio=BUY_CONDITION_2['early_volume_ratio'],
+            early_amount=BUY_CONDITION_2['early_amount'],
+            late_volume_ratio=BUY_CONDITION_2['late_volume_ratio'],
+            late_amount=BUY_CONDITION_2['late_amount']
+        )
+        cache.set_buy_cond2(idx, buy_cond2)
+        
+        scored = snapshot.has_daily[idx]
+        idx = idx[scored]
+        # 阈值表逐行二分查找，结果与 calc_minute_score_array 一致
+        score, score_mask = snapshot.score_table.score(idx, price[scored], cum_volume[scored])
+        cache.set_score(idx, score, score_mask)
+    
+    @property
+    def minute_scores(self):
+        """当日各股票最新的分钟级得分 {stock_code: score}"""
+        return self.minute_cache.score_dict()
+    
+    @property
+    def minute_score_masks(self):
+        """当日各股票最新的子条件位掩码 {stock_code: score_mask}"""
+        return self.minute_cache.score_mask_dict()
+    
+    @property
+    def minute_buy_cond2(self):
+        """当日各股票最新的买入条件2 {stock_code: bool}"""
+        return self.minute_cache.buy_cond2_dict()
+    
+    def _get_day_snapshot(self, date_str):
+        """
+        获取当日因子快照（init_minute_cache 中已构建；日期不同或未初始化时按需构建）
+        
+        Returns:
+            DayFactorSnapshot，日期不在因子范围内时返回None
+        """
+        if self.day_snapshot is None or self.day_snapshot.date != date_str:
+            stocks = self.minute_cache.stocks
+            self.day_snapshot = DayFactorSnapshot.build(
+                date_str, stocks, self.ma_dict, self.rolling_max_dict,
+                self.daily_avg_vol_per_min_5d, self.daily_avg_volume_10d,
+                self.limit_up_df, self.limit_down_df,
+                buy_cond1_df=self.buy_cond1_df, listing_filter_df=self.listing_filter_df
             )
-            self.minute_scores[stock_code] = score
-            self.minute_score_details[stock_code] = score_detail
+        return self.day_snapshot
     
-    def generate_buy_signals_minute(self, date):
+    def generate_buy_signals_minute(self, date, top_k=None):
         """
         生成买入信号（分钟级）
         
+        买入条件1、买入条件2、得分阈值和上市日期过滤分别是全市场布尔掩码，
+        逐级相与后统计各级通过数量；同分股票按股票池顺序排列。
+        
         Args:
             date: 日期（字符串或datetime对象）
+            top_k: 只返回得分最高的前K只股票，None表示全部，<=0 时返回空Series（漏斗统计照常计算）
             
         Returns:
             tuple: (买入信号Series, 漏斗统计字典)
@@ -259,8 +412,9 @@ class MomentumStrategy:
         else:
             date_str = pd.to_datetime(date).strftime('%Y%m%d')
         
+        cache = self.minute_cache
         funnel_stats = {
-            'total': len(self.minute_scores),
+            'total': int(np.count_nonzero(cache.has_score)),
             'cond1': 0,
             'cond2': 0,
             'score': 0,
@@ -268,42 +422,36 @@ class MomentumStrategy:
             'min_score': MIN_SCORE_THRESHOLD
         }
         
-        if date_str not in self.buy_cond1_df.index:
+        snapshot = self._get_day_snapshot(date_str)
+        if snapshot is None:
             return pd.Series(dtype=float), funnel_stats
         
-        cond1 = self.buy_cond1_df.loc[date_str]
-        
-        result_scores = pd.Series(dtype=float)
-        
-        for stock_code in self.minute_scores.keys():
-            if stock_code not in cond1.index:
-                continue
-            
-            if not cond1[stock_code]:
-                continue
-            
-            funnel_stats['cond1'] += 1
-            
-            cond2 = self.minute_buy_cond2.get(stock_code, False)
-            if not cond2:
-                continue
-            
-            funnel_stats['cond2'] += 1
-            
-            score = self.minute_scores[stock_code]
-            if score >= MIN_SCORE_THRESHOLD:
-                funnel_stats['score'] += 1
-                
-                if self.listing_filter_df is not None and date_str in self.listing_filter_df.index:
-                    if stock_code in self.listing_filter_df.columns:
-                        if not self.listing_filter_df.loc[date_str, stock_code]:
-                            continue
-                
-                result_scores[stock_code] = score
-                funnel_stats['listing'] += 1
+        mask = cache.has_score & snapshot.buy_cond1
+        funnel_stats['cond1'] = int(np.count_nonzero(mask))
+        mask &= cache.has_cond2 & cache.buy_cond2
+        funnel_stats['cond2'] = int(np.count_nonzero(mask))
+        mask &= cache.score >= MIN_SCORE_THRESHOLD
+        funnel_stats['score'] = int(np.count_nonzero(mask))
+        mask &= snapshot.listing
+        funnel_stats['listing'] = int(np.count_nonzero(mask))
+        if top_k is not None and top_k <= 0:
+            return pd.Series(dtype=float), funnel_stats
         
-        return result_scores.sort_values(ascending=False), funnel_stats
-    
+        candidates = np.flatnonzero(mask)
+        scores = cache.score[candidates]
+        if top_k is not None and top_k < len(candidates):
+            # 先按得分取出前K名（含与第K名同分的股票），再在小集合内排序
+            kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores.astype(np.int16), kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        
+        return pd.Series(
+            scores[order].astype(float),
+            index=[cache.stocks[i] for i in candidates[order].tolist()]
+        ), funnel_stats
     
     def check_exit_conditions(self, stock_code, holding_dict, current_price, current_date):
         metadata = self.metadata_mgr.get_metadata(stock_code)
@@ -469,15 +617,15 @@ class MomentumStrategy:
             }
             
             old_score = metadata['score'] if metadata else 0
-            old_score_detail = metadata.get('score_detail', {}) if metadata else {}
+            old_score_mask = metadata.get('score_mask') if metadata else None
             new_score = self.minute_scores.get(stock_code, 0)
-            new_score_detail = self.minute_score_details.get(stock_code, {})
+            new_score_mask = self.minute_score_masks.get(stock_code)
             
             score_change = {
                 'old_score': old_score,
-                'old_detail': old_score_detail,
+                'old_detail': _score_detail(old_score_mask),
                 'new_score': new_score,
-                'new_detail': new_score_detail
+                'new_detail': _score_detail(new_score_mask)
             }
             
             trade_logger.log_sell_trade(
@@ -519,8 +667,13 @@ class MomentumStrategy:
         if current_cash < 10000:
             return 0
         
+        current_holdings = self.trade_executor.get_holdings(self.account)
+        existing_codes = set(current_holdings.keys())
+        
+        # 每笔买入至少需要 10000 元，只取已持仓数加上可买数量的候选，候选不足时再补取
         current_date = current_datetime.strftime('%Y%m%d')
-        buy_scores, funnel_stats = self.generate_buy_signals_minute(current_date)
+        top_k = len(existing_codes) + int(current_cash // 10000)
+        buy_scores, funnel_stats = self.generate_buy_signals_minute(current_date, top_k=top_k)
         
         current_time_str = current_datetime.strftime('%Y%m%d %H:%M')
         
@@ -536,14 +689,11 @@ class MomentumStrategy:
             )
             return 0
         
-        current_holdings = self.trade_executor.get_holdings(self.account)
-        existing_codes = set(current_holdings.keys())
-        
         total_capital = self.trade_executor.get_total_asset(self.account)
         
         buy_count = 0
         
-        for stock_code in buy_scores.index:
+        for stock_code in self._iter_buy_candidates(current_date, buy_scores, funnel_stats):
             if stock_code in existing_codes:
                 continue
             
@@ -573,7 +723,7 @@ class MomentumStrategy:
                     self.strategy_name, f'buy_score_{score}'
                 )
                 
-                score_detail = self.minute_score_details.get(stock_code, {})
+                score_mask = self.minute_score_masks.get(stock_code)
                 
                 limit_prices = None
                 limit_up = day_limit_up.get(stock_code)
@@ -586,13 +736,13 @@ class MomentumStrategy:
                 
                 trade_logger.log_buy_trade(
                     self.logger, current_time_str, stock_code, open_price, 
-                    volume, actual_amount, fee, score, score_detail, limit_prices
+                    volume, actual_amount, fee, score, _score_detail(score_mask), limit_prices
                 )
                 
                 self.on_buy(
                     stock_code, current_date, score, buy_time=current_datetime,
                     buy_price=open_price, buy_volume=volume, buy_amount=actual_amount,
-                    buy_fee=fee, score_detail=score_detail
+                    buy_fee=fee, score_mask=score_mask
                 )
                 
                 current_cash = self.trade_executor.get_cash(self.account)
@@ -608,6 +758,26 @@ class MomentumStrategy:
         
         return buy_count
     
+    def _iter_buy_candidates(self, current_date, buy_scores, funnel_stats):
+        """
+        按得分顺序逐个给出买入候选
+
+        buy_scores 是按 top_k 截取的前若干名；遍历完仍有未取出的候选时（前面的股票因已持仓、
+        无开盘价或金额不足被跳过）重新生成完整排序，从截断处继续，顺序与不截取时一致
+
+        Args:
+            current_date: 日期字符串
+            buy_scores: generate_buy_signals_minute 返回的得分Series
+            funnel_stats: 同时返回的漏斗统计
+
+        Yields:
+            str: 股票代码
+        """
+        yield from buy_scores.index
+        if len(buy_scores) < funnel_stats['listing']:
+            all_scores, _ = self.generate_buy_signals_minute(current_date)
+            yield from all_scores.index[len(buy_scores):]
+    
     def calc_buy_amount(self, stock_code, total_capital):
         """
         计算买入金额（分钟级回测使用分钟级评分）
@@ -637,7 +807,7 @@ class MomentumStrategy:
         return amount, score
     
     def on_buy(self, stock_code, date, score, buy_time=None, buy_price=None, 
-              buy_volume=None, buy_amount=None, buy_fee=None, score_detail=None):
+              buy_volume=None, buy_amount=None, buy_fee=None, score_mask=None):
         """
         买入成功回调
         
@@ -650,11 +820,11 @@ class MomentumStrategy:
             buy_volume: 买入数量
             buy_amount: 买入金额
             buy_fee: 手续费
-            score_detail: 评分明细
+            score_mask: 评分子条件位掩码
         """
         self.metadata_mgr.add_metadata(
             stock_code, date, score, buy_time, buy_price, 
-            buy_volume, buy_amount, buy_fee, score_detail
+            buy_volume, buy_amount, buy_fee, score_mask
         )
     
     def on_sell(self, stock_code):
@@ -794,11 +964,11 @@ class MomentumStrategy:
                     days = 0
                 
                 score = self.minute_scores.get(stock_code, metadata.get('score', 0))
-                score_detail = self.minute_score_details.get(stock_code, metadata.get('score_detail', {}))
+                score_mask = self.minute_score_masks.get(stock_code, metadata.get('score_mask'))
             else:
                 days = 0
                 score = 0
-                score_detail = {}
+                score_mask = None
             
             volume = holding.get('volume', 0)
             amount = volume * current_price
@@ -812,7 +982,7 @@ class MomentumStrategy:
                 'amount': amount,
                 'pnl_pct': pnl_pct,
                 'score': score,
-                'score_detail': score_detail
+                'score_detail': _score_detail(score_mask)
             })
         
         trade_logger.log_daily_position_snapshot(
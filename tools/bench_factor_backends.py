@@ -0,0 +1,178 @@
+#coding: utf-8
+"""
+滚动因子计算后端的一致性校验与性能对比
+
+在随机生成（价格保留2位小数、含停牌NaN）的 (日期×股票) 矩阵上：
+1. 以 pandas rolling 为基准，校验各后端的 rolling_max / rolling_mean / 连续上涨 结果：
+   exact 后端要求逐位一致；其余后端要求数值接近，并统计“价格(分) > 均线”判断翻转的个数
+   （均线末位相差 1ulp 时，恰好等于均线的价格会被判为突破或未突破）
+2. 统计各后端的耗时（numba 后端先预热一次，不计入编译时间）
+3. 指定 --workers 时，对比按股票列分片的多进程计算（factors.parallel）与单进程的耗时和结果
+
+用法: python tools/bench_factor_backends.py --days 750 --stocks 5000 [--workers 4]
+"""
+import sys
+import os
+import time
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import numpy as np
+import pandas as pd
+from factors.backends import available_backends, get_backend
+from factors.parallel import ShardedFactorRunner
+
+
+MA_WINDOWS = (5, 10, 20, 30, 60, 120)
+MAX_WINDOWS = (20, 40, 60, 80, 100)
+STREAK_DAYS = 5
+
+
+def make_prices(days, stocks, nan_ratio, seed):
+    """生成随机游走价格（保留2位小数），按比例随机置NaN模拟停牌"""
+    rng = np.random.default_rng(seed)
+    prices = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(days, stocks)), axis=0)), 2)
+    prices[rng.random((days, stocks)) < nan_ratio] = np.nan
+    return prices
+
+
+def reference(prices):
+    """pandas 基准结果"""
+    df = pd.DataFrame(prices)
+    expected = {}
+    for window in MA_WINDOWS:
+        expected[('mean', window)] = df.rolling(window=window, min_periods=window).mean().to_numpy()
+    for window in MAX_WINDOWS:
+        expected[('max', window)] = df.rolling(window=window, min_periods=window).max().to_numpy()
+    is_up = (df > df.shift(1)).astype(int)
+    expected[('streak', STREAK_DAYS)] = (
+        is_up.rolling(window=STREAK_DAYS, min_periods=STREAK_DAYS).sum() == STREAK_DAYS
+    ).to_numpy()
+    return expected
+
+
+def run_backend(backend, prices):
+    """运行一个后端的全部计算"""
+    result = {}
+    for window in MA_WINDOWS:
+        result[('mean', window)] = backend.rolling_mean(prices, window)
+    for window in MAX_WINDOWS:
+        result[('max', window)] = backend.rolling_max(prices, window)
+    result[('streak', STREAK_DAYS)] = backend.up_streak(prices) >= STREAK_DAYS
+    return result
+
+
+def decision_flips(got, want):
+    """
+    以基准均线四舍五入到分的价格做严格比较，统计 (价格 > 均线) 判断与基准不一致的个数
+
+    价格恰好等于基准均线（如均线 5.57、价格 5.57）时，均线末位的差异会直接翻转判断结果。
+    """
+    valid = ~np.isnan(want)
+    ticks = np.round(want[valid], 2)
+    return int(np.count_nonzero((ticks > got[valid]) != (ticks > want[valid])))
+
+
+def check_parity(name, backend, result, expected):
+    """
+    与基准逐项比对，返回不一致的项目列表
+
+    exact 后端要求全部结果逐位一致（含NaN位置）；其余后端的滚动最大值、连续上涨要求逐位一致，
+    滚动均值要求数值接近，并单独报告判断翻转的个数（不计入不一致项目）。
+    """
+    mismatched = []
+    flips = 0
+    for key, want in expected.items():
+        got = result[key]
+        if key[0] != 'mean' or backend.exact:
+            ok = np.array_equal(got, want, equal_nan=key[0] != 'streak')
+        else:
+            ok = np.allclose(got, want, rtol=1e-9, atol=1e-9, equal_nan=True)
+            flips += decision_flips(got, want)
+        if not ok:
+            mismatched.append(key)
+    if mismatched:
+        status = f'MISMATCH {mismatched}'
+    elif backend.exact:
+        status = 'identical'
+    else:
+        status = f'close, {flips} price > MA decision flips vs pandas (not decision-exact)'
+    print(f"  parity [{name}]: {status}")
+    return mismatched
+
+
+def bench_sharded(prices, workers, repeat):
+    """多进程分片计算与单进程计算的结果、耗时对比"""
+    ok = True
+    for name in available_backends():
+        backend = get_backend(name)
+        start = time.perf_counter()
+        serial = {w: backend.rolling_mean(prices, w) for w in MA_WINDOWS}
+        serial_elapsed = time.perf_counter() - start
+
+        with ShardedFactorRunner(workers, backend=name) as runner:
+            # 首次调用包含进程池启动，不计入
+            runner.rolling('mean', prices[:, :runner.min_columns_per_shard * workers], MA_WINDOWS[:1])
+            elapsed = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                sharded = runner.rolling('mean', prices, MA_WINDOWS)
+                elapsed.append(time.perf_counter() - start)
+
+        same = all(np.array_equal(serial[w], sharded[w], equal_nan=True) for w in MA_WINDOWS)
+        ok &= same
+        print(f"  sharded [{name} x{workers}]: {min(elapsed):.3f}s vs single process {serial_elapsed:.3f}s, "
+              f"{'identical' if same else 'MISMATCH'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='滚动因子后端一致性校验与性能对比')
+    parser.add_argument('--days', type=int, default=750, help='交易日数')
+    parser.add_argument('--stocks', type=int, default=5000, help='股票数')
+    parser.add_argument('--nan-ratio', type=float, default=0.01, help='随机NaN比例')
+    parser.add_argument('--repeat', type=int, default=3, help='计时重复次数（取最小值）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--workers', type=int, default=0, help='多进程分片计算的进程数，0表示不测试')
+    args = parser.parse_args()
+
+    prices = make_prices(args.days, args.stocks, args.nan_ratio, args.seed)
+    print(f"Matrix: {args.days} days x {args.stocks} stocks, backends: {available_backends()}")
+
+    start = time.perf_counter()
+    expected = reference(prices)
+    print(f"  pandas reference: {time.perf_counter() - start:.3f}s")
+
+    failed = False
+    for name in available_backends():
+        backend = get_backend(name)
+        # 预热（numba 首次调用需要编译）
+        run_backend(backend, prices[:200, :10])
+
+        elapsed = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = run_backend(backend, prices)
+            elapsed.append(time.perf_counter() - start)
+        print(f"  backend [{name}]: {min(elapsed):.3f}s")
+        failed |= bool(check_parity(name, backend, result, expected))
+
+    # 边界情况：窗口大于数据长度、整列NaN、单行数据
+    edge_cases = [prices[:50, :20], np.full((30, 5), np.nan), prices[:1, :5]]
+    for name in available_backends():
+        backend = get_backend(name)
+        for values in edge_cases:
+            failed |= bool(check_parity(f"{name} {values.shape}", backend,
+                                        run_backend(backend, values), reference(values)))
+
+    if args.workers > 1:
+        failed |= not bench_sharded(prices, args.workers, args.repeat)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#coding: utf-8
+import sys
+import os
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from xtquant import xtdata
+from data.history_downloader import HistoryDownloader
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量下载历史行情（可断点续传）')
+    parser.add_argument('--sector', default='沪深A股', help='板块名称')
+    parser.add_argument('--periods', default='1d,1m', help='周期，逗号分隔')
+    parser.add_argument('--start', default='', help='开始日期，空表示增量下载')
+    parser.add_argument('--end', default='', help='结束日期，空表示至今')
+    parser.add_argument('--batch-size', type=int, default=200, help='每批股票数')
+    parser.add_argument('--workers', type=int, default=2, help='并发批次数')
+    parser.add_argument('--checkpoint', default=os.path.join(project_root, 'cache', 'download_checkpoint.json'),
+                        help='检查点文件路径')
+    parser.add_argument('--reset', action='store_true', help='忽略已有进度重新下载')
+    args = parser.parse_args()
+
+    stock_list = xtdata.get_stock_list_in_sector(args.sector)
+    periods = [p.strip() for p in args.periods.split(',') if p.strip()]
+
+    downloader = HistoryDownloader(
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        max_workers=args.workers
+    )
+    if args.reset:
+        for period in periods:
+            downloader.reset(period, args.start, args.end)
+
+    result = downloader.run(stock_list, periods, args.start, args.end)
+    for period, stocks in result['failed'].items():
+        print(f"[FAIL] {period}: {len(stocks)} stocks, e.g. {stocks[:5]}")
+
+
+if __name__ == '__main__':
+    main()
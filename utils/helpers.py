@@ -59,17 +59,93 @@ def get_df_ex(data: dict, field: str) -> pd.DataFrame:
     if not data:
         return pd.DataFrame()
     
-    _index = data[list(data.keys())[0]].index.tolist()
-    _columns = list(data.keys())
-    df = pd.DataFrame(index=_index, columns=_columns)
+    return get_df_ex_multi(data, [field])[field]
+
+
+def get_df_ex_multi(data: dict, fields: list, dtype=np.float64) -> dict:
+    """
+    从get_market_data_ex返回的dict中一次性提取多个字段，转换为宽表DataFrame
     
-    for stock_code in _columns:
-        if field in data[stock_code].columns:
-            df[stock_code] = data[stock_code][field].values
+    Args:
+        data: get_market_data_ex返回的dict {stock_code: DataFrame}
+        fields: 字段列表，如 ['close', 'open', 'high', 'volume', 'amount']
+        dtype: 数值类型，np.float64 或 np.float32
+        
+    Returns:
+        dict: {field: DataFrame}，每个DataFrame以时间为index，股票代码为columns
+    """
+    if not data:
+        return {field: pd.DataFrame() for field in fields}
+    
+    values, union_index, columns = stack_market_data(data, fields, dtype=dtype)
+    return {
+        field: pd.DataFrame(values[k], index=union_index, columns=columns, copy=False)
+        for k, field in enumerate(fields)
+    }
+
+
+def stack_market_data(data: dict, fields: list, dtype=np.float64):
+    """
+    将get_market_data_ex返回的dict堆叠为 (字段×时间×股票) 的连续数组
+    
+    所有股票、所有字段在一次遍历中写入同一个数组：
+    时间轴取全部股票索引的并集（已排序），某只股票缺失的时间点填NaN，
+    缺失的字段整列为NaN。
+    
+    Args:
+        data: get_market_data_ex返回的dict {stock_code: DataFrame}
+        fields: 字段列表
+        dtype: 数值类型，np.float64 或 np.float32
+        
+    Returns:
+        tuple: (values, date_index, stock_index)
+            - values: np.ndarray, shape=(len(fields), 时间数, 股票数)
+            - date_index: pd.Index 时间轴
+            - stock_index: pd.Index 股票代码
+    """
+    stock_codes = list(data.keys())
+    frames = [data[stock_code] for stock_code in stock_codes]
+    
+    if not frames:
+        return np.empty((len(fields), 0, 0), dtype=dtype), pd.Index([]), pd.Index([])
+    
+    # 时间轴：所有股票共用同一索引时直接复用（fill_data=True 时的常见情况），否则取并集
+    first_index = frames[0].index
+    if all(df.index is first_index or df.index.equals(first_index) for df in frames):
+        union_index = first_index
+        shared_index = True
+    else:
+        union_index = first_index
+        for df in frames[1:]:
+            union_index = union_index.union(df.index)
+        union_index = union_index.sort_values()
+        shared_index = False
+    
+    values = np.full((len(fields), len(union_index), len(stock_codes)), np.nan, dtype=dtype)
+    
+    # 各股票的列顺序通常一致，按列名元组缓存字段位置，避免逐只股票做列名查找
+    layout_cache = {}
+    
+    for j, df in enumerate(frames):
+        if df.empty:
+            continue
+        layout_key = tuple(df.columns)
+        if layout_key not in layout_cache:
+            col_pos = {col: i for i, col in enumerate(layout_key)}
+            present = [k for k, field in enumerate(fields) if field in col_pos]
+            layout_cache[layout_key] = (present, [col_pos[fields[k]] for k in present])
+        present, src_cols = layout_cache[layout_key]
+        if not present:
+            continue
+        # 先选列再转换：非数值列（如 stockcode）不参与 float 转换
+        block = df.iloc[:, src_cols].to_numpy(dtype=dtype).T
+        if shared_index:
+            values[present, :, j] = block
         else:
-            df[stock_code] = np.nan
+            rows = union_index.get_indexer(df.index)
+            values[np.ix_(present, rows, [j])] = block[:, :, np.newaxis]
     
-    return df
+    return values, union_index, pd.Index(stock_codes)
 
 
 def rank_filter(df: pd.DataFrame, N: int, axis=1, ascending=False, 
@@ -95,8 +171,30 @@ def rank_filter(df: pd.DataFrame, N: int, axis=1, ascending=False,
 
 _OPENDATE_CACHE = {}
 
+def load_opendates(stock_list: list) -> dict:
+    """
+    批量获取上市日期（进程内缓存，未缓存的股票一次 get_instrument_detail_list 请求）
+    
+    Args:
+        stock_list: 股票代码列表
+        
+    Returns:
+        dict: {stock_code: 'YYYYMMDD'}，未知上市日期为 '19700101'
+    """
+    missing = [s for s in stock_list if s not in _OPENDATE_CACHE]
+    if missing:
+        try:
+            details = xtdata.get_instrument_detail_list(missing) or {}
+        except Exception:
+            details = {}
+        for stock in missing:
+            detail = details.get(stock)
+            _OPENDATE_CACHE[stock] = (detail.get("OpenDate") if detail else None) or "19700101"
+    return {stock: _OPENDATE_CACHE[stock] for stock in stock_list}
+
+
 def filter_opendate(stock_list: list, df: pd.DataFrame, n: int, 
-                   data_source='xtdata') -> pd.DataFrame:
+                   data_source='xtdata', opendates=None) -> pd.DataFrame:
     """
     判断股票上市天数是否大于N天（向量化优化版本，带缓存）
     
@@ -105,43 +203,35 @@ def filter_opendate(stock_list: list, df: pd.DataFrame, n: int,
         df: 以时间为index，股票代码为columns的DataFrame（用于对齐）
         n: 上市天数阈值
         data_source: 'xtdata' 或 'contextinfo'
+        opendates: 预先加载的上市日期 {stock_code: 'YYYYMMDD'}（如 DataProvider 合约信息快照），
+                   None表示通过 xtdata 批量获取
         
     Returns:
         pd.DataFrame: 布尔值DataFrame，True表示上市天数>=n
     """
-    result_df = pd.DataFrame(False, index=df.index, columns=df.columns, dtype=bool)
-    
-    if data_source == 'xtdata':
-        stock_opendate = {}
-        for stock in stock_list:
-            if stock in _OPENDATE_CACHE:
-                stock_opendate[stock] = _OPENDATE_CACHE[stock]
-            else:
-                try:
-                    detail = xtdata.get_instrument_detail(stock)
-                    opendate = detail.get("OpenDate", "19700101") if detail else "19700101"
-                    stock_opendate[stock] = opendate
-                    _OPENDATE_CACHE[stock] = opendate
-                except Exception:
-                    stock_opendate[stock] = "19700101"
-                    _OPENDATE_CACHE[stock] = "19700101"
+    if opendates is not None:
+        stock_opendate = {stock: opendates.get(stock) for stock in stock_list}
+    elif data_source == 'xtdata':
+        stock_opendate = load_opendates(stock_list)
     else:
         raise ValueError("Unsupported data_source")
     
-    df_dates = pd.to_datetime(df.index)
+    # 上市日期未知（空或19700101）的股票为 NaT，结果保持 False
+    open_dates = pd.to_datetime(
+        pd.Series({
+            stock: opendate if opendate and opendate != "19700101" else None
+            for stock, opendate in stock_opendate.items()
+        }, dtype=object),
+        format='%Y%m%d', errors='coerce'
+    ).reindex(df.columns)
     
-    for stock, opendate_str in stock_opendate.items():
-        if not opendate_str or opendate_str == "19700101":
-            continue
-        
-        try:
-            open_date = pd.to_datetime(opendate_str)
-            days_since_open = (df_dates - open_date).days
-            result_df[stock] = days_since_open >= n
-        except (ValueError, TypeError):
-            continue
+    df_dates = pd.to_datetime(df.index).values.astype('datetime64[D]')
+    open_values = open_dates.values.astype('datetime64[D]')
+    days_since_open = df_dates[:, None] - open_values[None, :]
+    
+    result = ~np.isnat(days_since_open) & (days_since_open >= np.timedelta64(n, 'D'))
     
-    return result_df
+    return pd.DataFrame(result, index=df.index, columns=df.columns)
 
 
 def is_st_stock(stock_code: str, his_st_dict: dict, date: str) -> bool:
@@ -228,6 +318,10 @@ def safe_divide(a, b, default=np.nan):
     """
     if isinstance(a, pd.Series) or isinstance(a, pd.DataFrame):
         return a.divide(b).replace([np.inf, -np.inf], default)
+    elif isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.true_divide(a, b)
+        return np.where(np.asarray(b) != 0, result, default)
     else:
         return a / b if b != 0 else default
 